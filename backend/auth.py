@@ -1,14 +1,21 @@
+from dataclasses import dataclass
 from datetime import datetime, timedelta
 from typing import Optional
+import hmac
+import os
 import bcrypt
 from jose import JWTError, jwt
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, Header, HTTPException, Request, status
 from fastapi.security import OAuth2PasswordBearer
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
+from sqlalchemy import event, inspect, func
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 
 import models
 from database import get_db
+from cache import TTLCache
+from password_pool import PasswordWorkerPool, PasswordPoolSaturated
 
 # Configuration - In production, these should be environment variables
 SECRET_KEY = "your-secret-key-for-smart-ranch-development"
@@ -17,6 +24,47 @@ ACCESS_TOKEN_EXPIRE_MINUTES = 43200 # 30 days for mobile app convenience
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="farmer/token")
 
+# Authenticated farmers keyed by token subject (username), so hot endpoints
+# don't pay a SELECT on every request. Entries are detached from any session.
+PRINCIPAL_CACHE_TTL_SECONDS = float(os.getenv("PRINCIPAL_CACHE_TTL_SECONDS", "300"))
+PRINCIPAL_CACHE_MAX_SIZE = int(os.getenv("PRINCIPAL_CACHE_MAX_SIZE", "10000"))
+
+principal_cache = TTLCache(maxsize=PRINCIPAL_CACHE_MAX_SIZE, ttl=PRINCIPAL_CACHE_TTL_SECONDS)
+
+# Token versions per farmer; a short TTL bounds how long a revocation made on
+# another worker can take to be seen here.
+TOKEN_VERSION_CACHE_TTL_SECONDS = float(os.getenv("TOKEN_VERSION_CACHE_TTL_SECONDS", "30"))
+
+token_version_cache = TTLCache(maxsize=PRINCIPAL_CACHE_MAX_SIZE, ttl=TOKEN_VERSION_CACHE_TTL_SECONDS)
+
+# Version reported for a farmer that no longer exists; issued tokens carry
+# versions >= 0, so none of that farmer's tokens match it.
+DELETED_FARMER_TOKEN_VERSION = -1
+
+# Tokens issued before farmer_id/version claims can't be revoked. They are
+# accepted until this date (UTC), by which every one of them has expired
+# (ACCESS_TOKEN_EXPIRE_MINUTES after the claims were introduced).
+LEGACY_TOKENS_ACCEPTED_UNTIL = datetime.fromisoformat(os.getenv("LEGACY_TOKENS_ACCEPTED_UNTIL", "2026-11-17"))
+
+# bcrypt runs on a bounded worker pool so logins never block the event loop
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", str(min(4, os.cpu_count() or 1))))
+PASSWORD_HASH_MAX_QUEUE = int(os.getenv("PASSWORD_HASH_MAX_QUEUE", "64"))
+
+password_pool = PasswordWorkerPool(workers=PASSWORD_HASH_WORKERS, max_queue=PASSWORD_HASH_MAX_QUEUE)
+
+# Operator token for the /admin endpoints, sent as X-Admin-Token. Unset
+# disables them; a farmer's access token never grants access.
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN")
+
+@dataclass(frozen=True)
+class Principal:
+    """
+    The authenticated caller as carried in the access token claims.
+    """
+    farmer_id: int
+    username: str
+    token_version: int = 0
+
 def verify_password(plain_password: str, hashed_password: str):
     """
     Verifies a plain password against a hashed password using bcrypt.
@@ -40,6 +88,29 @@ def get_password_hash(password: str):
     # Return as a string for database storage
     return hashed_password.decode('utf-8')
 
+async def _run_password_work(fn, *args):
+    try:
+        return await password_pool.run(fn, *args)
+    except PasswordPoolSaturated:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Login service is busy, please retry shortly",
+            headers={"Retry-After": "1"},
+        )
+
+async def verify_password_async(plain_password: str, hashed_password: str):
+    """
+    Runs verify_password on the password worker pool. Sheds load with a 503
+    when the pool's queue is full.
+    """
+    return await _run_password_work(verify_password, plain_password, hashed_password)
+
+async def get_password_hash_async(password: str):
+    """
+    Runs get_password_hash on the password worker pool.
+    """
+    return await _run_password_work(get_password_hash, password)
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     to_encode = data.copy()
     if expires_delta:
@@ -50,22 +121,150 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
-async def get_current_user(token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_db)):
-    credentials_exception = HTTPException(
+def _credentials_exception():
+    return HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
+
+def decode_access_token(token: str) -> dict:
+    """
+    Verifies the JWT signature/expiry and returns its claims.
+    """
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        username: str = payload.get("sub")
-        if username is None:
-            raise credentials_exception
     except JWTError:
-        raise credentials_exception
-    
+        raise _credentials_exception()
+    if payload.get("sub") is None:
+        raise _credentials_exception()
+    return payload
+
+def claims_from_request(request: Request) -> Optional[dict]:
+    """
+    Verified bearer token claims, without touching the DB.
+    Returns None for missing or invalid tokens.
+    """
+    scheme, _, token = request.headers.get("Authorization", "").partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        return None
+    try:
+        return jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+    except JWTError:
+        return None
+
+def farmer_id_from_request(request: Request) -> Optional[int]:
+    """
+    Best-effort farmer_id from the bearer token claims, without touching the DB.
+    Returns None for missing, invalid or legacy (pre-fid) tokens.
+    """
+    claims = claims_from_request(request)
+    return claims.get("fid") if claims else None
+
+async def get_token_version(db: AsyncSession, farmer_id: int) -> int:
+    """
+    Current token version for a farmer, served from the in-memory cache.
+    Farmers without a revocation row are on version 0; deleted farmers on
+    DELETED_FARMER_TOKEN_VERSION.
+    """
+    version = token_version_cache.get(farmer_id)
+    if version is not None:
+        return version
+    result = await db.execute(
+        select(func.coalesce(models.TokenRevocation.token_version, 0))
+        .select_from(models.Farmer)
+        .outerjoin(models.TokenRevocation, models.TokenRevocation.farmer_id == models.Farmer.farmer_id)
+        .where(models.Farmer.farmer_id == farmer_id)
+    )
+    version = result.scalar()
+    if version is None:
+        version = DELETED_FARMER_TOKEN_VERSION
+    token_version_cache.set(farmer_id, version)
+    return version
+
+async def revoke_tokens(db: AsyncSession, farmer_id: int) -> int:
+    """
+    Bumps the farmer's token version so every previously issued token is rejected.
+    """
+    stmt = pg_insert(models.TokenRevocation).values(farmer_id=farmer_id, token_version=1)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[models.TokenRevocation.farmer_id],
+        set_={
+            "token_version": models.TokenRevocation.token_version + 1,
+            "revoked_at": func.now(),
+        },
+    ).returning(models.TokenRevocation.token_version)
+    result = await db.execute(stmt)
+    version = result.scalar_one()
+    await db.commit()
+    token_version_cache.set(farmer_id, version)
+    return version
+
+async def _check_token_version(db: AsyncSession, payload: dict):
+    farmer_id = payload.get("fid")
+    if farmer_id is None:
+        # Legacy token: only its subject can be checked, and only until the cutoff
+        if datetime.utcnow() >= LEGACY_TOKENS_ACCEPTED_UNTIL:
+            raise _credentials_exception()
+        return
+    if payload.get("ver", 0) != await get_token_version(db, farmer_id):
+        raise _credentials_exception()
+
+async def _load_user(db: AsyncSession, username: str):
+    user = principal_cache.get(username)
+    if user is not None:
+        return user
+
     result = await db.execute(select(models.Farmer).where(models.Farmer.username == username))
     user = result.scalars().first()
     if user is None:
-        raise credentials_exception
+        raise _credentials_exception()
+    # Detach so the cached instance is never expired by a later commit
+    db.expunge(user)
+    principal_cache.set(username, user)
     return user
+
+async def get_current_user(token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_db)):
+    payload = decode_access_token(token)
+    await _check_token_version(db, payload)
+    return await _load_user(db, payload["sub"])
+
+async def get_current_principal(token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_db)) -> Principal:
+    """
+    Authorizes from verified token claims alone. Use this instead of
+    get_current_user when the route only needs the caller's farmer_id.
+    """
+    payload = decode_access_token(token)
+    # Also rejects tokens of deleted farmers and, after the cutoff, legacy tokens
+    await _check_token_version(db, payload)
+    farmer_id = payload.get("fid")
+    if farmer_id is None:
+        # Legacy token without claims: resolve through the principal cache
+        user = await _load_user(db, payload["sub"])
+        return Principal(farmer_id=user.farmer_id, username=user.username)
+
+    return Principal(farmer_id=farmer_id, username=payload["sub"], token_version=payload.get("ver", 0))
+
+async def require_operator(x_admin_token: Optional[str] = Header(None)):
+    """
+    Route dependency for operator-only endpoints: requires X-Admin-Token to
+    match ADMIN_TOKEN.
+    """
+    if not ADMIN_TOKEN or x_admin_token is None or not hmac.compare_digest(x_admin_token, ADMIN_TOKEN):
+        raise HTTPException(status_code=403, detail="Not authorized")
+
+def invalidate_principal(username: str):
+    principal_cache.pop(username)
+
+@event.listens_for(models.Farmer, "after_update")
+@event.listens_for(models.Farmer, "after_delete")
+def _invalidate_farmer_principal(mapper, connection, target):
+    # Drop the current and any previous username (covers renames)
+    invalidate_principal(target.username)
+    for old_username in inspect(target).attrs.username.history.deleted:
+        invalidate_principal(old_username)
+
+@event.listens_for(models.Farmer, "after_delete")
+def _invalidate_farmer_tokens(mapper, connection, target):
+    # Other workers see the deletion once their cached version expires
+    token_version_cache.set(target.farmer_id, DELETED_FARMER_TOKEN_VERSION)
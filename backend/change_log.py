@@ -0,0 +1,79 @@
+import base64
+from typing import Optional, Tuple
+
+from fastapi import HTTPException
+from sqlalchemy import func, literal, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+import models
+
+# A place in a farmer's change_log: (txid, seq). An entry's seq is allocated
+# when its row is written, but its transaction's txid at the first write, so
+# neither alone follows commit order and a lower seq can commit after a
+# higher one. Readers only take entries whose txid is below the snapshot
+# xmin: those transactions have all finished, and anything committing later
+# has a txid at or past that point, so it sorts after every position handed
+# out. A long-running write transaction anywhere holds the horizon back; its
+# entries and those after it wait for the next read.
+Position = Tuple[int, int]
+START: Position = (0, 0)
+
+
+def commit_horizon():
+    """Lowest txid that may still be in progress, in the statement's snapshot."""
+    return func.pg_snapshot_xmin(func.pg_current_snapshot())
+
+
+def position_of(position: Position):
+    """A position as a row value comparable with entries' (txid, seq)."""
+    Log = models.ChangeLog
+    return tuple_(literal(position[0], Log.txid.type), literal(position[1], Log.seq.type))
+
+
+def entry_position():
+    return tuple_(models.ChangeLog.txid, models.ChangeLog.seq)
+
+
+def settled_after(farmer_id: int, after: Position):
+    """
+    Where clauses for the farmer's entries past `after` whose transactions
+    have finished. Evaluate them in one statement: the horizon must come
+    from the same snapshot as the rows.
+    """
+    Log = models.ChangeLog
+    return (
+        Log.farmer_id == farmer_id,
+        entry_position() > position_of(after),
+        Log.txid < commit_horizon(),
+    )
+
+
+async def latest_settled(db: AsyncSession, farmer_id: int, after: Position) -> Optional[Position]:
+    """
+    The farmer's last settled entry past `after`, or None when there is none
+    yet. Entries up to it can no longer change, whichever snapshot reads them.
+    """
+    Log = models.ChangeLog
+    latest = (await db.execute(
+        select(Log.txid, Log.seq)
+        .where(*settled_after(farmer_id, after))
+        .order_by(Log.txid.desc(), Log.seq.desc())
+        .limit(1)
+    )).first()
+    return (latest.txid, latest.seq) if latest else None
+
+
+def encode_position(position: Position) -> str:
+    return base64.urlsafe_b64encode(f"{position[0]}|{position[1]}".encode()).decode().rstrip("=")
+
+
+def decode_position(cursor: str) -> Position:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        txid, seq = (int(part) for part in base64.urlsafe_b64decode(padded.encode()).decode().split("|"))
+    except (ValueError, UnicodeDecodeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if txid < 0 or seq < 0:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return txid, seq
@@ -0,0 +1,93 @@
+import hashlib
+from datetime import date
+from typing import Dict, Iterable
+
+from fastapi import Depends, HTTPException, Request, Response
+from sqlalchemy import func
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+import models
+from auth import get_current_principal, Principal
+from database import get_db
+
+# Datasets with their own change counter. A write bumps every dataset whose
+# GET responses it can change; a GET's ETag covers every dataset it reads.
+ANIMALS = "animals"
+PENS = "pens"
+MILK = "milk"
+WEIGHT = "weight"
+BREEDING = "breeding"
+HEALTH = "health"
+FEED = "feed"
+LABOR = "labor"
+FINANCE = "finance"
+
+
+async def bump_versions(db: AsyncSession, farmer_id: int, *datasets: str):
+    """
+    Increments the farmer's change version for each dataset. Runs in the
+    caller's transaction, so call it before commit.
+    """
+    stmt = pg_insert(models.ChangeVersion).values(
+        [{"farmer_id": farmer_id, "dataset": dataset, "version": 1} for dataset in sorted(set(datasets))]
+    )
+    await db.execute(stmt.on_conflict_do_update(
+        index_elements=[models.ChangeVersion.farmer_id, models.ChangeVersion.dataset],
+        set_={"version": models.ChangeVersion.version + 1, "updated_at": func.now()}
+    ))
+
+
+async def get_versions(db: AsyncSession, farmer_id: int, datasets: Iterable[str]) -> Dict[str, int]:
+    datasets = list(datasets)
+    result = await db.execute(
+        select(models.ChangeVersion.dataset, models.ChangeVersion.version).where(
+            models.ChangeVersion.farmer_id == farmer_id,
+            models.ChangeVersion.dataset.in_(datasets)
+        )
+    )
+    versions = dict(result.all())
+    return {dataset: versions.get(dataset, 0) for dataset in datasets}
+
+
+def _etag(farmer_id: int, request: Request, versions: Dict[str, int]) -> str:
+    # The query string is part of the tag (?from=/&cursor= select different
+    # rows), and so is today's date for "due soon"/"sick > 3 days" style lists
+    state = ",".join(f"{dataset}:{version}" for dataset, version in sorted(versions.items()))
+    key = f"{farmer_id}|{request.url.path}?{request.url.query}|{state}|{date.today().isoformat()}"
+    return f'W/"{hashlib.sha1(key.encode()).hexdigest()[:20]}"'
+
+
+def _matches(if_none_match: str, etag: str) -> bool:
+    if if_none_match.strip() == "*":
+        return True
+    # Weak comparison: W/"x" and "x" are the same validator
+    bare = etag.removeprefix("W/")
+    return any(tag.strip().removeprefix("W/") == bare for tag in if_none_match.split(","))
+
+
+def conditional_get(*datasets: str, db_dependency=get_db):
+    """
+    Route dependency that tags the response with an ETag built from the
+    caller's change versions and answers a matching If-None-Match with 304
+    before the endpoint runs its query. Pass the same session dependency as
+    the endpoint so versions and rows are read from the same database.
+
+        @router.get("/farmer/{farmer_id}", dependencies=[Depends(conditional_get(LABOR))])
+    """
+    async def check_etag(
+        request: Request,
+        response: Response,
+        db: AsyncSession = Depends(db_dependency),
+        current_user: Principal = Depends(get_current_principal)
+    ):
+        versions = await get_versions(db, current_user.farmer_id, datasets)
+        etag = _etag(current_user.farmer_id, request, versions)
+        headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+        if_none_match = request.headers.get("if-none-match")
+        if if_none_match and _matches(if_none_match, etag):
+            raise HTTPException(status_code=304, headers=headers)
+        response.headers.update(headers)
+
+    return check_etag
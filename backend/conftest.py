@@ -0,0 +1,80 @@
+"""
+Shared fixtures for the in-process API tests. They drive the app through an
+httpx ASGITransport against the database in DATABASE_URL (migrated on first
+use) and run on anyio's pytest plugin, which ships with Starlette.
+
+    cd backend && DATABASE_URL=postgresql+asyncpg://... python -m pytest -q
+"""
+import uuid
+from dataclasses import dataclass
+
+import httpx
+import pytest
+
+from database import engine, read_engine
+from main import app
+from migrate import run_migrations
+
+# Script against a running server (python test_api.py), not a pytest module
+collect_ignore = ["test_api.py"]
+
+
+@dataclass
+class FarmerAccount:
+    farmer_id: int
+    pen_id: int
+    headers: dict
+
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
+
+
+@pytest.fixture
+async def client():
+    await run_migrations(engine)
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as c:
+        yield c
+    # Pooled connections belong to this test's event loop
+    await engine.dispose()
+    if read_engine is not None:
+        await read_engine.dispose()
+
+
+async def create_farmer(client: httpx.AsyncClient) -> FarmerAccount:
+    username = f"test_{uuid.uuid4().hex[:12]}"
+    response = await client.post("/farmers/", json={
+        "username": username, "password": "password123", "full_name": "Test Farmer", "farm_type": "Dairy",
+    })
+    assert response.status_code == 201, response.text
+    farmer_id = response.json()["farmer_id"]
+    token = (await client.post("/farmers/token", data={"username": username, "password": "password123"})).json()["access_token"]
+    headers = {"Authorization": f"Bearer {token}"}
+    pens = await client.get(f"/animals/pens/farmer/{farmer_id}", headers=headers)
+    return FarmerAccount(farmer_id, pens.json()[0]["pen_id"], headers)
+
+
+async def create_animal(client: httpx.AsyncClient, farmer: FarmerAccount, pen_id: int = None, **fields) -> int:
+    response = await client.post("/animals/", headers=farmer.headers, json={
+        "farmer_id": farmer.farmer_id, "pen_id": pen_id or farmer.pen_id, "tag_number": uuid.uuid4().hex[:10],
+        "animal_type": "Dairy", "gender": "Female", "breed": "Holstein", "acquisition_type": "Purchased",
+        **fields,
+    })
+    assert response.status_code == 201, response.text
+    return response.json()["animal_id"]
+
+
+@pytest.fixture
+def make_farmer(client):
+    return lambda: create_farmer(client)
+
+
+@pytest.fixture
+def make_animal(client):
+    return lambda farmer, **fields: create_animal(client, farmer, **fields)
+
+
+@pytest.fixture
+async def farmer(client):
+    return await create_farmer(client)
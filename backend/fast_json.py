@@ -0,0 +1,70 @@
+from decimal import Decimal
+from typing import Sequence, Type
+
+import orjson
+from fastapi import Response
+from pydantic import BaseModel
+from sqlalchemy import Numeric, Text, cast
+from sqlalchemy.future import select
+
+# Matches FastAPI/pydantic JSON output: compact, UTF-8, UTC datetimes with "Z"
+ORJSON_OPTIONS = orjson.OPT_UTC_Z
+
+
+def _default(value):
+    # pydantic emits Decimal as its exact string form, e.g. "12.50"
+    if isinstance(value, Decimal):
+        return str(value)
+    raise TypeError(f"Type is not JSON serializable: {type(value).__name__}")
+
+
+def dumps(content) -> bytes:
+    return orjson.dumps(content, default=_default, option=ORJSON_OPTIONS)
+
+
+class FastJSONResponse(Response):
+    media_type = "application/json"
+
+    def render(self, content) -> bytes:
+        # Already-encoded bodies (see ListSerializer) pass straight through
+        if isinstance(content, bytes):
+            return content
+        return dumps(content)
+
+
+class ListSerializer:
+    """
+    Precompiled encoder for read-only lists of one response schema. Selects
+    the model's columns in the schema's field order as Core rows, so each
+    row becomes a JSON object without building ORM entities or revalidating
+    through pydantic.
+    """
+
+    def __init__(self, schema: Type[BaseModel], model):
+        self.schema = schema
+        self.fields = tuple(schema.model_fields)
+        self.columns = [self._column(model.__table__.c[name]) for name in self.fields]
+
+    @staticmethod
+    def _column(column):
+        # numeric::text is exactly str(Decimal), and skips building Decimals per row
+        if isinstance(column.type, Numeric):
+            return cast(column, Text).label(column.name)
+        return column
+
+    def select(self):
+        return select(*self.columns)
+
+    def dumps(self, rows: Sequence) -> bytes:
+        fields = self.fields
+        return dumps([dict(zip(fields, row)) for row in rows])
+
+    def response(self, rows: Sequence, response: Response = None) -> FastJSONResponse:
+        """
+        Encoded list response. Headers already set on the endpoint's injected
+        Response (ETag, X-Next-Cursor) are carried over, as FastAPI would.
+        """
+        fast_response = FastJSONResponse(content=self.dumps(rows))
+        if response is not None:
+            fast_response.headers.raw.extend(response.headers.raw)
+        return fast_response
@@ -0,0 +1,177 @@
+import hashlib
+import os
+import time
+from datetime import timedelta
+
+from fastapi import Request, Response
+from fastapi.responses import JSONResponse
+from sqlalchemy import and_, delete, func, or_, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.future import select
+
+import models
+from auth import claims_from_request, get_token_version
+from database import SessionLocal, engine
+
+IDEMPOTENCY_KEY_HEADER = "Idempotency-Key"
+REPLAYED_HEADER = "Idempotent-Replayed"
+IDEMPOTENCY_KEY_MAX_LENGTH = 255
+IDEMPOTENT_METHODS = {"POST"}
+# Responses carrying credentials or creating accounts are never stored
+IDEMPOTENCY_EXEMPT_PATHS = {"/farmers", "/farmers/", "/farmers/token"}
+
+# How long a stored response is replayed for retries with the same key
+IDEMPOTENCY_KEY_TTL_SECONDS = int(os.getenv("IDEMPOTENCY_KEY_TTL_SECONDS", "86400"))
+# Lease on a pending key: if its request hasn't finished by then (e.g. the
+# worker died) the next retry takes the key over and runs the request again
+IDEMPOTENCY_LEASE_SECONDS = int(os.getenv("IDEMPOTENCY_LEASE_SECONDS", "120"))
+IDEMPOTENCY_PURGE_INTERVAL_SECONDS = float(os.getenv("IDEMPOTENCY_PURGE_INTERVAL_SECONDS", "300"))
+
+_last_purge = {"at": 0.0}
+
+Key = models.IdempotencyKey
+
+
+def _request_hash(request: Request, body: bytes) -> str:
+    digest = hashlib.sha256()
+    for part in (request.method, request.url.path, request.url.query):
+        digest.update(part.encode())
+        digest.update(b"\0")
+    digest.update(body)
+    return digest.hexdigest()
+
+
+async def _purge_expired(conn):
+    # At most once per interval per worker; expired keys are ignored anyway
+    if time.monotonic() - _last_purge["at"] < IDEMPOTENCY_PURGE_INTERVAL_SECONDS:
+        return
+    _last_purge["at"] = time.monotonic()
+    await conn.execute(delete(Key).where(Key.expires_at < func.now()))
+
+
+async def _authenticated_farmer_id(request: Request):
+    """
+    farmer_id of a bearer token with current farmer claims, else None.
+    Legacy, revoked or missing tokens don't get idempotency: the request
+    passes straight through and the route's own auth answers it.
+    """
+    claims = claims_from_request(request)
+    if not claims or claims.get("fid") is None:
+        return None
+    async with SessionLocal() as db:
+        if claims.get("ver", 0) != await get_token_version(db, claims["fid"]):
+            return None
+    return claims["fid"]
+
+
+async def _claim(conn, farmer_id: int, key: str, request_hash: str) -> bool:
+    """
+    Reserves the key for this request. Returns False when a live entry
+    already holds it; expired entries and pending ones whose lease ran out
+    are taken over.
+    """
+    stmt = pg_insert(Key).values(
+        farmer_id=farmer_id,
+        idempotency_key=key,
+        request_hash=request_hash,
+        expires_at=func.now() + timedelta(seconds=IDEMPOTENCY_KEY_TTL_SECONDS),
+        lease_expires_at=func.now() + timedelta(seconds=IDEMPOTENCY_LEASE_SECONDS)
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[Key.farmer_id, Key.idempotency_key],
+        set_={
+            "request_hash": stmt.excluded.request_hash,
+            "status_code": None,
+            "response_body": None,
+            "response_headers": None,
+            "created_at": func.now(),
+            "expires_at": stmt.excluded.expires_at,
+            "lease_expires_at": stmt.excluded.lease_expires_at,
+        },
+        where=or_(
+            Key.expires_at < func.now(),
+            and_(Key.status_code.is_(None), Key.lease_expires_at < func.now())
+        )
+    )
+    return (await conn.execute(stmt.returning(Key.farmer_id))).first() is not None
+
+
+def _replay(stored) -> Response:
+    response = Response(content=stored.response_body, status_code=stored.status_code)
+    response.raw_headers = [(name.encode("latin-1"), value.encode("latin-1")) for name, value in stored.response_headers]
+    response.headers[REPLAYED_HEADER] = "true"
+    return response
+
+
+async def honor_idempotency_keys(request: Request, call_next):
+    """
+    Authenticated POSTs carrying an Idempotency-Key run once per key (per
+    farmer); retries get the stored response back without touching the
+    write path. Responses with a 5xx status are not stored, so those
+    requests can be retried.
+
+    Claiming the key, the route's own commit and storing the response are
+    separate transactions. If the worker dies after the route committed but
+    before the response was stored, the key stays pending until its lease
+    runs out and the next retry then runs the request a second time: keys
+    narrow duplicate writes to that window, they don't rule them out.
+    """
+    key = request.headers.get(IDEMPOTENCY_KEY_HEADER)
+    if request.method not in IDEMPOTENT_METHODS or key is None or request.url.path in IDEMPOTENCY_EXEMPT_PATHS:
+        return await call_next(request)
+    if not 0 < len(key) <= IDEMPOTENCY_KEY_MAX_LENGTH:
+        return JSONResponse(status_code=400, content={"detail": f"{IDEMPOTENCY_KEY_HEADER} must be 1-{IDEMPOTENCY_KEY_MAX_LENGTH} characters"})
+
+    farmer_id = await _authenticated_farmer_id(request)
+    if farmer_id is None:
+        return await call_next(request)
+    request_hash = _request_hash(request, await request.body())
+    key_filter = (Key.farmer_id == farmer_id, Key.idempotency_key == key)
+
+    async with engine.begin() as conn:
+        await _purge_expired(conn)
+        claimed = await _claim(conn, farmer_id, key, request_hash)
+        stored = None
+        if not claimed:
+            stored = (await conn.execute(
+                select(
+                    Key.request_hash, Key.status_code, Key.response_body, Key.response_headers,
+                    func.ceil(func.extract("epoch", Key.lease_expires_at - func.now())).label("lease_left")
+                ).where(*key_filter)
+            )).first()
+
+    if not claimed:
+        if stored is not None and stored.request_hash != request_hash:
+            return JSONResponse(status_code=422, content={"detail": f"{IDEMPOTENCY_KEY_HEADER} was already used for a different request"})
+        if stored is None or stored.status_code is None:
+            retry_after = max(int(stored.lease_left or 1), 1) if stored is not None else 1
+            return JSONResponse(
+                status_code=409,
+                content={"detail": f"A request with this {IDEMPOTENCY_KEY_HEADER} is still in progress"},
+                headers={"Retry-After": str(retry_after)}
+            )
+        return _replay(stored)
+
+    try:
+        response = await call_next(request)
+        body = b"".join([chunk async for chunk in response.body_iterator])
+    except Exception:
+        async with engine.begin() as conn:
+            await conn.execute(delete(Key).where(*key_filter))
+        raise
+
+    async with engine.begin() as conn:
+        if response.status_code >= 500:
+            await conn.execute(delete(Key).where(*key_filter))
+        else:
+            await conn.execute(
+                update(Key).where(*key_filter).values(
+                    status_code=response.status_code,
+                    response_body=body,
+                    response_headers=[[name.decode("latin-1"), value.decode("latin-1")] for name, value in response.raw_headers]
+                )
+            )
+
+    buffered = Response(content=body, status_code=response.status_code)
+    buffered.raw_headers = list(response.raw_headers)
+    return buffered
@@ -0,0 +1,150 @@
+from datetime import date
+from typing import List, Optional
+
+import numpy as np
+from sqlalchemy import Float, cast, func
+from sqlalchemy.dialects.postgresql import aggregate_order_by
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+import models
+
+STANDARD_LACTATION_DAYS = 305
+# Persistency: fitted yield this many days after the peak, as % of the peak
+PERSISTENCY_DAYS_AFTER_PEAK = 100
+# The Wood fit has three parameters; fewer usable days can't determine it
+MIN_FIT_RECORDS = 3
+
+
+def lactation_query(farmer_id: int, animal_id: Optional[int] = None):
+    """
+    One row per active cow with a recorded calving: her current lactation's
+    days in milk and daily yields as parallel arrays, ordered by date.
+    """
+    B, A, M = models.BreedingRecord, models.Animal, models.MilkProduction
+    calvings = (
+        select(B.female_id, func.max(B.actual_calving_date).label("calved_on"))
+        .join(A, A.animal_id == B.female_id)
+        .where(A.farmer_id == farmer_id, A.status == "Active", B.actual_calving_date.is_not(None))
+        .group_by(B.female_id)
+    )
+    if animal_id is not None:
+        calvings = calvings.where(B.female_id == animal_id)
+    calvings = calvings.subquery()
+
+    # Aggregate first so the animal details are joined once per cow, not per day
+    dim = M.date - calvings.c.calved_on
+    lactations = (
+        select(
+            calvings.c.female_id,
+            calvings.c.calved_on,
+            func.array_agg(aggregate_order_by(dim, M.date)).label("days"),
+            func.array_agg(aggregate_order_by(cast(M.total_yield, Float), M.date)).label("yields"),
+        )
+        .join(M, (M.animal_id == calvings.c.female_id) & (M.date >= calvings.c.calved_on))
+        .group_by(calvings.c.female_id, calvings.c.calved_on)
+        .subquery()
+    )
+    return (
+        select(A.animal_id, A.tag_number, A.name, lactations.c.calved_on, lactations.c.days, lactations.c.yields)
+        .join(lactations, lactations.c.female_id == A.animal_id)
+        .order_by(A.animal_id)
+    )
+
+
+def _fit_wood(cow: np.ndarray, days: np.ndarray, yields: np.ndarray, herd_size: int):
+    """
+    Least-squares fit of Wood's curve y = a * t^b * e^(-c*t) for every cow at
+    once, on its log-linear form ln y = ln a + b ln t - c t. The 3x3 normal
+    equations are summed per cow with bincount and solved as one batch.
+    Returns (a, b, c) arrays, NaN where a cow's data can't determine a fit.
+    """
+    usable = (days > 0) & (yields > 0)
+    cow, t, ln_y = cow[usable], days[usable].astype(float), np.log(yields[usable])
+    ln_t = np.log(t)
+
+    def per_cow(values):
+        return np.bincount(cow, weights=values, minlength=herd_size)
+
+    n = np.bincount(cow, minlength=herd_size).astype(float)
+    s_lt, s_t = per_cow(ln_t), per_cow(t)
+    normal = np.empty((herd_size, 3, 3))
+    normal[:, 0] = np.stack([n, s_lt, -s_t], axis=1)
+    normal[:, 1] = np.stack([s_lt, per_cow(ln_t * ln_t), -per_cow(ln_t * t)], axis=1)
+    normal[:, 2] = np.stack([-s_t, -per_cow(ln_t * t), per_cow(t * t)], axis=1)
+    rhs = np.stack([per_cow(ln_y), per_cow(ln_t * ln_y), -per_cow(t * ln_y)], axis=1)
+
+    params = np.full((herd_size, 3), np.nan)
+    solvable = (n >= MIN_FIT_RECORDS) & (np.abs(np.linalg.det(normal)) > 1e-9)
+    if solvable.any():
+        params[solvable] = np.linalg.solve(normal[solvable], rhs[solvable][..., None])[..., 0]
+    ln_a, b, c = params.T
+    return np.exp(ln_a), b, c
+
+
+def lactation_curves(rows, today: Optional[date] = None) -> List[dict]:
+    """
+    Days in milk, observed peak, Wood-curve parameters, fitted peak,
+    persistency and projected 305-day yield for each row of lactation_query.
+    All cows are computed together on flat arrays indexed by cow.
+    """
+    today = today or date.today()
+    herd_size = len(rows)
+    if herd_size == 0:
+        return []
+
+    counts = np.fromiter((len(row.days) for row in rows), dtype=np.int64, count=herd_size)
+    cow = np.repeat(np.arange(herd_size), counts)
+    days = np.concatenate([np.asarray(row.days, dtype=np.int64) for row in rows])
+    yields = np.concatenate([np.asarray(row.yields, dtype=float) for row in rows])
+    starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+
+    # Observed peak: the highest daily yield of each cow and the day it fell on
+    peak_yield = np.maximum.reduceat(yields, starts)
+    at_peak = yields == peak_yield[cow]
+    peak_day = np.full(herd_size, np.iinfo(np.int64).max)
+    np.minimum.at(peak_day, cow[at_peak], days[at_peak])
+
+    a, b, c = _fit_wood(cow, days, yields, herd_size)
+    # A rising-then-falling curve (b, c > 0) has a peak at t = b / c
+    typical = (b > 0) & (c > 0)
+    with np.errstate(divide="ignore", invalid="ignore", over="ignore"):
+        fitted_peak_day = np.where(typical, b / c, np.nan)
+        later = fitted_peak_day + PERSISTENCY_DAYS_AFTER_PEAK
+        persistency = np.where(typical, (later / fitted_peak_day) ** b * np.exp(-c * PERSISTENCY_DAYS_AFTER_PEAK) * 100, np.nan)
+
+        # 305-day yield: recorded days as recorded, every other day from the curve
+        t = np.arange(1, STANDARD_LACTATION_DAYS + 1, dtype=float)
+        curve = a[:, None] * t ** b[:, None] * np.exp(-c[:, None] * t)
+    in_window = (days >= 1) & (days <= STANDARD_LACTATION_DAYS)
+    curve[cow[in_window], days[in_window] - 1] = yields[in_window]
+    projected = np.where(c > 0, curve.sum(axis=1), np.nan)
+
+    def number(value, digits=2):
+        return round(float(value), digits) if np.isfinite(value) else None
+
+    return [
+        {
+            "animal_id": row.animal_id,
+            "tag_number": row.tag_number,
+            "name": row.name,
+            "calving_date": row.calved_on,
+            "days_in_milk": (today - row.calved_on).days,
+            "records": int(counts[i]),
+            "peak_yield": number(peak_yield[i]),
+            "peak_day": int(peak_day[i]),
+            "wood": (
+                {"a": number(a[i], 4), "b": number(b[i], 4), "c": number(c[i], 5)}
+                if np.isfinite(a[i]) else None
+            ),
+            "fitted_peak_day": number(fitted_peak_day[i], 1),
+            "persistency": number(persistency[i], 1),
+            "projected_305_day_yield": number(projected[i], 1),
+        }
+        for i, row in enumerate(rows)
+    ]
+
+
+async def herd_lactations(db: AsyncSession, farmer_id: int, animal_id: Optional[int] = None) -> List[dict]:
+    result = await db.execute(lactation_query(farmer_id, animal_id))
+    return lactation_curves(result.all())
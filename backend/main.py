@@ -1,20 +1,39 @@
 from fastapi import FastAPI
-from database import engine, Base
-from routers import animals, health, feed, finance, farmer, production, labor, pens, alerts, reports
+import os
+from database import engine, read_engine
+from migrate import run_migrations
+from routers import animals, health, feed, finance, farmer, production, labor, pens, alerts, reports, admin, export, sync, batch, dashboard
 import asyncio
+from read_routing import track_farmer_writes
+from idempotency import honor_idempotency_keys, REPLAYED_HEADER
+from query_stats import instrument_engine, record_query_stats
+from metrics import METRICS_STALE_HEADER
 
 from fastapi.middleware.cors import CORSMiddleware
 
 app = FastAPI(title="Smart Ranch Management System API")
 
+# Innermost, so replayed responses still count as writes and get Server-Timing
+app.middleware("http")(honor_idempotency_keys)
+app.middleware("http")(track_farmer_writes)
+app.middleware("http")(record_query_stats)
+
+# Registered last so it wraps everything: responses produced by the
+# middlewares above (replays, idempotency errors) get CORS headers too
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
     allow_credentials=False, # Changed to False to allow "*" wildcard for development
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "Server-Timing", REPLAYED_HEADER, METRICS_STALE_HEADER, "Retry-After"],
 )
 
+# Per-request statement count and DB time, reported in the Server-Timing header
+instrument_engine(engine)
+if read_engine is not None:
+    instrument_engine(read_engine)
+
 # Include Routers
 app.include_router(farmer.router)
 app.include_router(animals.router)
@@ -26,12 +45,19 @@ app.include_router(finance.router)
 app.include_router(pens.router)
 app.include_router(alerts.router)
 app.include_router(reports.router)
+app.include_router(admin.router)
+app.include_router(export.router)
+app.include_router(sync.router)
+app.include_router(batch.router)
+app.include_router(dashboard.router)
+
+RUN_MIGRATIONS_ON_STARTUP = os.getenv("RUN_MIGRATIONS_ON_STARTUP", "true").lower() in ("1", "true", "yes", "on")
 
 @app.on_event("startup")
 async def startup():
-    # Create tables if they don't exist (for development convenience)
-    async with engine.begin() as conn:
-        await conn.run_sync(Base.metadata.create_all)
+    # Apply pending schema migrations; a no-op single query when up to date
+    if RUN_MIGRATIONS_ON_STARTUP:
+        await run_migrations(engine)
 
 @app.get("/")
 async def root():
@@ -0,0 +1,453 @@
+import asyncio
+from datetime import date, timedelta
+from typing import Dict, List, Optional, Set
+
+from sqlalchemy import Date, Integer, Numeric, String, case, cast, delete, exists, func, literal, literal_column, or_, tuple_, union_all, any_, bindparam
+from sqlalchemy.dialects.postgresql import ARRAY, insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+import models
+from change_log import START, Position, entry_position, latest_settled, position_of
+from database import SessionLocal
+
+# performance_cache.period_type -> date_trunc unit
+PERIOD_UNITS = {"Daily": "day", "Weekly": "week", "Monthly": "month"}
+# FCR and ADG need two weighings of an animal inside the period
+GAIN_PERIOD_TYPES = ("Weekly", "Monthly")
+
+# Metric catalog. Rows with related_animal_id set are per animal, rows with
+# related_pen_id set are per pen (by the animal's current pen) and rows with
+# neither are farm totals.
+#   milk_yield   litres               animal, pen, farm
+#   feed_cost    pen + individual     pen, farm
+#   health_cost  treatment costs      animal, farm
+#   labor_hours  hours logged         farm
+#   fcr          pen feed kg / gain   pen, farm   (Weekly, Monthly)
+#   adg          kg gained per day    animal, pen, farm   (Weekly, Monthly)
+#   feed_kg, gain_kg, gain_days, animals_gaining
+#                the /reports/fcr inputs      pen   (Weekly, Monthly)
+#   income:<category>, expense:<category>
+#                /reports/financial-summary totals      farm
+# fcr and adg follow /reports/fcr: pen feed logs only, and only animals that
+# gained weight count towards pen and farm figures.
+METRIC_NAMES = (
+    "milk_yield", "feed_cost", "health_cost", "labor_hours", "fcr", "adg",
+    "feed_kg", "gain_kg", "gain_days", "animals_gaining",
+)
+INCOME_PREFIX = "income:"
+EXPENSE_PREFIX = "expense:"
+
+# Tables whose change_log entries carry the row date of a metric input
+METRIC_SOURCE_TABLES = (
+    "milk_production", "weight_record", "feed_log", "individual_feed_log", "health_record", "labor_activity",
+    "financial_transaction", "breeding_record", "animal",
+)
+# Changes that can affect any period, after which the farmer's metrics are
+# rebuilt from scratch: deleting an animal or pen cascades to its records
+# without logging them, updating an animal may move it (and all its records)
+# to another pen, and deleting a ledger entry brings back the health or
+# acquisition cost it stood for, on that record's own date.
+FULL_REBUILD_CHANGES = (("animal", "U"), ("animal", "D"), ("animal_pen", "D"), ("financial_transaction", "D"))
+
+METRICS_LOCK_ID = 72610003
+# Response header marking metrics served while a refresh is pending
+METRICS_STALE_HEADER = "X-Metrics-Stale"
+
+
+def period_start(period_type: str, day: date) -> date:
+    if period_type == "Weekly":
+        return day - timedelta(days=day.weekday())
+    if period_type == "Monthly":
+        return day.replace(day=1)
+    return day
+
+
+def period_end(period_type: str, start: date) -> date:
+    if period_type == "Weekly":
+        return start + timedelta(days=6)
+    if period_type == "Monthly":
+        return (start.replace(day=28) + timedelta(days=4)).replace(day=1) - timedelta(days=1)
+    return start
+
+
+def _metric(name, value, start, animal_id=None, pen_id=None):
+    return (
+        (literal(name, String) if isinstance(name, str) else name).label("metric_name"),
+        func.coalesce(value, 0).label("metric_value"),
+        start.label("period_start"),
+        (animal_id if animal_id is not None else literal(None, Integer)).label("related_animal_id"),
+        (pen_id if pen_id is not None else literal(None, Integer)).label("related_pen_id"),
+    )
+
+
+def money_entries(farmer_id: int, date_from: Optional[date], date_to: Optional[date]):
+    """
+    Every income and expense of the farmer as (type, category, date, amount)
+    rows: the ledger plus operational costs that never reach it. Health
+    costs and acquisition costs that were posted to the ledger are taken
+    from the ledger only.
+    """
+    ledger = models.FinancialTransaction
+
+    def in_window(query, date_column):
+        if date_from:
+            query = query.where(date_column >= date_from)
+        if date_to:
+            query = query.where(date_column <= date_to)
+        return query
+
+    def posted_to_ledger(source_table, source_id):
+        return exists().where(ledger.source_table == source_table, ledger.source_id == source_id)
+
+    acquired_on = cast(models.Animal.created_at, Date)
+    return union_all(
+        in_window(
+            select(ledger.type.label("type"), ledger.category.label("category"), ledger.date.label("date"), ledger.amount.label("amount"))
+            .where(ledger.farmer_id == farmer_id),
+            ledger.date
+        ),
+        in_window(
+            select(literal("Expense"), literal("Feeding"), models.FeedLog.date, models.FeedLog.total_cost)
+            .join(models.AnimalPen)
+            .where(models.AnimalPen.farmer_id == farmer_id),
+            models.FeedLog.date
+        ),
+        in_window(
+            select(literal("Expense"), literal("Labor"), models.LaborActivity.date, models.LaborActivity.labor_cost)
+            .where(models.LaborActivity.farmer_id == farmer_id),
+            models.LaborActivity.date
+        ),
+        in_window(
+            select(literal("Expense"), literal("Medical"), models.HealthRecord.date, models.HealthRecord.cost)
+            .join(models.Animal)
+            .where(models.Animal.farmer_id == farmer_id, ~posted_to_ledger("health_record", models.HealthRecord.record_id)),
+            models.HealthRecord.date
+        ),
+        in_window(
+            select(literal("Expense"), literal("Breeding"), models.BreedingRecord.breeding_date, models.BreedingRecord.cost)
+            .join(models.Animal, models.BreedingRecord.female_id == models.Animal.animal_id)
+            .where(models.Animal.farmer_id == farmer_id),
+            models.BreedingRecord.breeding_date
+        ),
+        # Animals carry no purchase date; the day they were recorded stands in for it
+        in_window(
+            select(literal("Expense"), literal("Acquisition"), acquired_on, models.Animal.acquisition_cost)
+            .where(models.Animal.farmer_id == farmer_id, ~posted_to_ledger("animal", models.Animal.animal_id)),
+            acquired_on
+        ),
+    ).subquery()
+
+
+def _metric_rows(farmer_id: int, period_type: str, starts: Optional[List[date]]):
+    """
+    Every metric of one period type as a single UNION ALL. With starts, only
+    source rows falling in those periods are read; the periods are always
+    whole, so their rows can replace the cached ones outright.
+    """
+    unit = PERIOD_UNITS[period_type]
+    starts_param = bindparam("period_starts", starts, type_=ARRAY(Date))
+
+    def period_of(column):
+        return cast(func.date_trunc(unit, column), Date)
+
+    def in_periods(column):
+        if starts is None:
+            return ()
+        # The range lets the date indexes narrow the scan before the exact match
+        return (
+            column >= min(starts),
+            column <= period_end(period_type, max(starts)),
+            period_of(column) == any_(starts_param),
+        )
+
+    A, P = models.Animal, models.AnimalPen
+    M, W = models.MilkProduction, models.WeightRecord
+    F, I = models.FeedLog, models.IndividualFeedLog
+    H, L = models.HealthRecord, models.LaborActivity
+
+    milk = (
+        select(M.animal_id, A.pen_id, period_of(M.date).label("period_start"), M.total_yield)
+        .join(A, A.animal_id == M.animal_id)
+        .where(A.farmer_id == farmer_id, *in_periods(M.date))
+        .cte("milk")
+    )
+    feed = union_all(
+        select(F.pen_id, period_of(F.date).label("period_start"), F.total_cost.label("cost"), F.quantity_kg.label("pen_feed_kg"))
+        .join(P, P.pen_id == F.pen_id)
+        .where(P.farmer_id == farmer_id, *in_periods(F.date)),
+        select(A.pen_id, period_of(I.date), I.total_cost, literal(None, Numeric))
+        .join(A, A.animal_id == I.animal_id)
+        .where(A.farmer_id == farmer_id, *in_periods(I.date)),
+    ).cte("feed")
+    pen_feed = (
+        select(
+            feed.c.pen_id,
+            feed.c.period_start,
+            func.sum(feed.c.cost).label("cost"),
+            func.sum(feed.c.pen_feed_kg).label("pen_feed_kg"),
+        )
+        .group_by(feed.c.pen_id, feed.c.period_start)
+        .cte("pen_feed")
+    )
+    health = (
+        select(H.animal_id, period_of(H.date).label("period_start"), H.cost)
+        .join(A, A.animal_id == H.animal_id)
+        .where(A.farmer_id == farmer_id, H.cost > 0, *in_periods(H.date))
+        .cte("health")
+    )
+    labor = (
+        select(period_of(L.date).label("period_start"), L.hours_spent)
+        .where(L.farmer_id == farmer_id, *in_periods(L.date))
+        .cte("labor")
+    )
+    entries = money_entries(farmer_id, None, None)
+    # Entries without an amount are left out, as the live summary skips them
+    money = (
+        select(
+            case((entries.c.type == "Income", INCOME_PREFIX), else_=EXPENSE_PREFIX).concat(entries.c.category).label("metric_name"),
+            period_of(entries.c.date).label("period_start"),
+            entries.c.amount,
+        )
+        .where(entries.c.amount.is_not(None), *in_periods(entries.c.date))
+        .cte("money")
+    )
+
+    queries = [
+        select(*_metric("milk_yield", func.sum(milk.c.total_yield), milk.c.period_start, animal_id=milk.c.animal_id))
+        .group_by(milk.c.period_start, milk.c.animal_id),
+        select(*_metric("milk_yield", func.sum(milk.c.total_yield), milk.c.period_start, pen_id=milk.c.pen_id))
+        .group_by(milk.c.period_start, milk.c.pen_id),
+        select(*_metric("milk_yield", func.sum(milk.c.total_yield), milk.c.period_start))
+        .group_by(milk.c.period_start),
+        select(*_metric("feed_cost", pen_feed.c.cost, pen_feed.c.period_start, pen_id=pen_feed.c.pen_id)),
+        select(*_metric("feed_cost", func.sum(pen_feed.c.cost), pen_feed.c.period_start))
+        .group_by(pen_feed.c.period_start),
+        select(*_metric("health_cost", func.sum(health.c.cost), health.c.period_start, animal_id=health.c.animal_id))
+        .group_by(health.c.period_start, health.c.animal_id),
+        select(*_metric("health_cost", func.sum(health.c.cost), health.c.period_start))
+        .group_by(health.c.period_start),
+        select(*_metric("labor_hours", func.sum(labor.c.hours_spent), labor.c.period_start))
+        .group_by(labor.c.period_start),
+        select(*_metric(money.c.metric_name, func.sum(money.c.amount), money.c.period_start))
+        .group_by(money.c.metric_name, money.c.period_start),
+    ]
+
+    if period_type in GAIN_PERIOD_TYPES:
+        weigh_order = {
+            "partition_by": (W.animal_id, period_of(W.date)),
+            "order_by": (W.date, W.weight_id),
+            "rows": (None, None),
+        }
+        weighings = (
+            select(
+                W.animal_id,
+                A.pen_id,
+                period_of(W.date).label("period_start"),
+                func.first_value(W.weight_kg).over(**weigh_order).label("first_kg"),
+                func.last_value(W.weight_kg).over(**weigh_order).label("last_kg"),
+                func.first_value(W.date).over(**weigh_order).label("first_date"),
+                func.last_value(W.date).over(**weigh_order).label("last_date"),
+            )
+            .join(A, A.animal_id == W.animal_id)
+            .where(A.farmer_id == farmer_id, *in_periods(W.date))
+            .distinct()
+            .cte("weighings")
+        )
+        gain = weighings.c.last_kg - weighings.c.first_kg
+        days = weighings.c.last_date - weighings.c.first_date
+        pen_gain = (
+            select(
+                weighings.c.pen_id,
+                weighings.c.period_start,
+                func.coalesce(func.sum(gain).filter(gain > 0), 0).label("gain_kg"),
+                func.coalesce(func.sum(days).filter(gain > 0), 0).label("gain_days"),
+                func.count().filter(gain > 0).label("animals_gaining"),
+            )
+            .group_by(weighings.c.pen_id, weighings.c.period_start)
+            .cte("pen_gain")
+        )
+        farm_gain = (
+            select(
+                pen_gain.c.period_start,
+                func.sum(pen_gain.c.gain_kg).label("gain_kg"),
+                func.sum(pen_gain.c.gain_days).label("gain_days"),
+            )
+            .group_by(pen_gain.c.period_start)
+            .cte("farm_gain")
+        )
+        farm_feed = (
+            select(pen_feed.c.period_start, func.sum(pen_feed.c.pen_feed_kg).label("pen_feed_kg"))
+            .group_by(pen_feed.c.period_start)
+            .cte("farm_feed")
+        )
+        queries += [
+            select(*_metric("adg", gain / days, weighings.c.period_start, animal_id=weighings.c.animal_id))
+            .where(days > 0),
+            select(*_metric("adg", pen_gain.c.gain_kg / pen_gain.c.gain_days, pen_gain.c.period_start, pen_id=pen_gain.c.pen_id))
+            .where(pen_gain.c.gain_days > 0),
+            select(*_metric("adg", farm_gain.c.gain_kg / farm_gain.c.gain_days, farm_gain.c.period_start))
+            .where(farm_gain.c.gain_days > 0),
+            select(*_metric("fcr", pen_feed.c.pen_feed_kg / pen_gain.c.gain_kg, pen_gain.c.period_start, pen_id=pen_gain.c.pen_id))
+            .join(pen_feed, (pen_feed.c.pen_id == pen_gain.c.pen_id) & (pen_feed.c.period_start == pen_gain.c.period_start))
+            .where(pen_gain.c.gain_kg > 0, pen_feed.c.pen_feed_kg > 0),
+            select(*_metric("fcr", farm_feed.c.pen_feed_kg / farm_gain.c.gain_kg, farm_gain.c.period_start))
+            .join(farm_feed, farm_feed.c.period_start == farm_gain.c.period_start)
+            .where(farm_gain.c.gain_kg > 0, farm_feed.c.pen_feed_kg > 0),
+            select(*_metric("feed_kg", pen_feed.c.pen_feed_kg, pen_feed.c.period_start, pen_id=pen_feed.c.pen_id)),
+            select(*_metric("gain_kg", pen_gain.c.gain_kg, pen_gain.c.period_start, pen_id=pen_gain.c.pen_id)),
+            select(*_metric("gain_days", pen_gain.c.gain_days, pen_gain.c.period_start, pen_id=pen_gain.c.pen_id)),
+            select(*_metric("animals_gaining", pen_gain.c.animals_gaining, pen_gain.c.period_start, pen_id=pen_gain.c.pen_id)),
+        ]
+
+    return union_all(*queries).subquery("metric_rows")
+
+
+async def _rebuild(db: AsyncSession, farmer_id: int, period_type: str, starts: Optional[List[date]]):
+    Cache = models.PerformanceCache
+    stale = delete(Cache).where(Cache.farmer_id == farmer_id, Cache.period_type == period_type)
+    if starts is not None:
+        stale = stale.where(Cache.period_start.in_(starts))
+    await db.execute(stale)
+
+    rows = _metric_rows(farmer_id, period_type, starts)
+    unit = PERIOD_UNITS[period_type]
+    await db.execute(
+        pg_insert(Cache).from_select(
+            ["farmer_id", "metric_name", "metric_value", "period_type", "period_start", "period_end", "related_animal_id", "related_pen_id"],
+            select(
+                literal(farmer_id),
+                rows.c.metric_name,
+                rows.c.metric_value,
+                literal(period_type),
+                rows.c.period_start,
+                cast(rows.c.period_start + literal_column(f"interval '1 {unit}' - interval '1 day'"), Date),
+                rows.c.related_animal_id,
+                rows.c.related_pen_id,
+            )
+        )
+    )
+
+
+async def _pending_periods(db: AsyncSession, farmer_id: int, after: Position, upto: Position) -> Optional[Dict[str, Set[date]]]:
+    """
+    Periods touched by changes in (after, upto], by period type.
+    None means the changes can't be narrowed down and everything is rebuilt.
+    """
+    Log = models.ChangeLog
+    rebuild = tuple_(Log.table_name, Log.op).in_(FULL_REBUILD_CHANGES)
+    result = await db.execute(
+        select(rebuild.label("rebuild"), Log.row_date, Log.prev_row_date)
+        .where(
+            Log.farmer_id == farmer_id,
+            entry_position() > position_of(after),
+            entry_position() <= position_of(upto),
+            or_(Log.table_name.in_(METRIC_SOURCE_TABLES), rebuild),
+        )
+        .distinct()
+    )
+    days = set()
+    for row in result.all():
+        if row.rebuild or row.row_date is None:
+            return None
+        days.add(row.row_date)
+        if row.prev_row_date is not None:
+            days.add(row.prev_row_date)
+    return {period_type: {period_start(period_type, day) for day in days} for period_type in PERIOD_UNITS}
+
+
+async def _refreshed_position(db: AsyncSession, farmer_id: int) -> Optional[Position]:
+    State = models.MetricRefreshState
+    refreshed = (await db.execute(
+        select(State.last_txid, State.last_seq).where(State.farmer_id == farmer_id)
+    )).first()
+    return (refreshed.last_txid, refreshed.last_seq) if refreshed else None
+
+
+async def metrics_are_fresh(db: AsyncSession, farmer_id: int) -> bool:
+    """True when performance_cache reflects every change logged for the farmer."""
+    refreshed = await _refreshed_position(db, farmer_id)
+    if refreshed is None:
+        return False
+    Log = models.ChangeLog
+    # Entries committing later always sort past the recorded position
+    return not await db.scalar(
+        select(exists().where(Log.farmer_id == farmer_id, entry_position() > position_of(refreshed)))
+    )
+
+
+async def refresh_metrics(db: AsyncSession, farmer_id: int) -> bool:
+    """
+    Brings the farmer's performance_cache up to date with change_log,
+    recomputing only the day/week/month periods whose source rows changed
+    (or everything on the first run and after an animal or pen delete).
+    Runs in the caller's transaction; returns False when nothing needed
+    refreshing, otherwise the caller commits.
+    """
+    if await metrics_are_fresh(db, farmer_id):
+        return False
+
+    # One refresher per farmer; the rows it deletes and re-inserts would
+    # otherwise interleave with a concurrent refresh of the same periods
+    await db.execute(select(func.pg_advisory_xact_lock(METRICS_LOCK_ID, farmer_id)))
+    State = models.MetricRefreshState
+    refreshed = await _refreshed_position(db, farmer_id)
+    # Only up to entries whose transactions have finished; later ones are
+    # picked up by the next refresh
+    upto = await latest_settled(db, farmer_id, refreshed or START)
+    if upto is None and refreshed is not None:
+        return False
+
+    periods = None
+    if refreshed is not None:
+        periods = await _pending_periods(db, farmer_id, refreshed, upto)
+    for period_type in PERIOD_UNITS:
+        if periods is None:
+            await _rebuild(db, farmer_id, period_type, None)
+        elif periods[period_type]:
+            await _rebuild(db, farmer_id, period_type, sorted(periods[period_type]))
+
+    last_txid, last_seq = upto or START
+    stmt = pg_insert(State).values(farmer_id=farmer_id, last_txid=last_txid, last_seq=last_seq)
+    await db.execute(stmt.on_conflict_do_update(
+        index_elements=[State.farmer_id],
+        set_={"last_txid": stmt.excluded.last_txid, "last_seq": stmt.excluded.last_seq, "refreshed_at": func.now()}
+    ))
+    return True
+
+
+_refreshing = set()
+
+
+async def refresh_metrics_in_background(farmer_id: int):
+    """
+    Refresh on its own session, for BackgroundTasks: requests serve what is
+    cached (or compute live) and never wait for a rebuild. At most one
+    refresh per farmer runs in this worker at a time.
+    """
+    if farmer_id in _refreshing:
+        return
+    _refreshing.add(farmer_id)
+    try:
+        async with SessionLocal() as db:
+            if await refresh_metrics(db, farmer_id):
+                await db.commit()
+    except Exception as e:
+        print(f"Metrics refresh failed for farmer {farmer_id}: {e}")
+    finally:
+        _refreshing.discard(farmer_id)
+
+
+async def main():
+    """Refreshes every farmer with pending changes, e.g. from a nightly cron."""
+    async with SessionLocal() as db:
+        farmer_ids = (await db.execute(select(models.Farmer.farmer_id).order_by(models.Farmer.farmer_id))).scalars().all()
+        for farmer_id in farmer_ids:
+            refreshed = await refresh_metrics(db, farmer_id)
+            await db.commit()
+            if refreshed:
+                print(f"Refreshed metrics for farmer {farmer_id}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,162 @@
+import asyncio
+import hashlib
+import re
+import sys
+from dataclasses import dataclass
+from pathlib import Path
+from typing import List
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncEngine
+
+MIGRATIONS_DIR = Path(__file__).parent / "migrations"
+MIGRATION_FILE_PATTERN = re.compile(r"^(\d{4})_(\w+)\.sql$")
+
+# Arbitrary, app-wide key for pg_advisory_lock so only one worker migrates at a time
+MIGRATION_LOCK_ID = 7261_0001
+
+
+class MigrationError(Exception):
+    pass
+
+
+@dataclass(frozen=True)
+class Migration:
+    version: int
+    name: str
+    path: Path
+    checksum: str
+
+    @property
+    def sql(self) -> str:
+        return self.path.read_text(encoding="utf-8")
+
+
+def discover_migrations() -> List[Migration]:
+    """
+    Ordered migrations from MIGRATIONS_DIR, named NNNN_description.sql.
+    """
+    migrations = []
+    for path in sorted(MIGRATIONS_DIR.iterdir()):
+        match = MIGRATION_FILE_PATTERN.match(path.name)
+        if not match:
+            continue
+        checksum = hashlib.sha256(path.read_bytes()).hexdigest()
+        migrations.append(Migration(int(match.group(1)), match.group(2), path, checksum))
+
+    versions = [m.version for m in migrations]
+    if len(versions) != len(set(versions)):
+        raise MigrationError("Duplicate migration version numbers in migrations/")
+    return migrations
+
+
+async def current_schema_version(conn: AsyncConnection):
+    """
+    Highest applied migration version, or None on a database that was never migrated.
+    """
+    exists = (await conn.execute(text("SELECT to_regclass('schema_migrations')"))).scalar()
+    if exists is None:
+        return None
+    return (await conn.execute(text("SELECT max(version) FROM schema_migrations"))).scalar()
+
+
+async def _applied_checksums(conn: AsyncConnection):
+    await conn.execute(text("""
+        CREATE TABLE IF NOT EXISTS schema_migrations (
+            version INT PRIMARY KEY,
+            name VARCHAR(255) NOT NULL,
+            checksum CHAR(64) NOT NULL,
+            applied_at TIMESTAMPTZ NOT NULL DEFAULT CURRENT_TIMESTAMP
+        )
+    """))
+    result = await conn.execute(text("SELECT version, checksum FROM schema_migrations"))
+    return {row.version: row.checksum.strip() for row in result}
+
+
+async def _apply(conn: AsyncConnection, migration: Migration):
+    # Driver-level transaction: asyncpg's simple-query protocol runs
+    # multi-statement scripts (incl. $$ function bodies) that SQLAlchemy can't
+    raw = await conn.get_raw_connection()
+    pg = raw.driver_connection
+    async with pg.transaction():
+        await pg.execute(migration.sql)
+        await pg.execute(
+            "INSERT INTO schema_migrations (version, name, checksum) VALUES ($1, $2, $3)",
+            migration.version, migration.name, migration.checksum
+        )
+
+
+async def run_migrations(engine: AsyncEngine) -> List[Migration]:
+    """
+    Applies pending migrations and returns them. When the recorded schema
+    version already matches the newest migration this costs a single query.
+    """
+    migrations = discover_migrations()
+    if not migrations:
+        return []
+    latest = migrations[-1].version
+
+    async with engine.connect() as conn:
+        if await current_schema_version(conn) == latest:
+            return []
+
+    applied_now = []
+    async with engine.connect() as conn:
+        await conn.execute(text("SELECT pg_advisory_lock(:lock_id)"), {"lock_id": MIGRATION_LOCK_ID})
+        # DDL on large tables can outlive the app's per-statement timeout
+        await conn.execute(text("SET statement_timeout = 0"))
+        await conn.commit()
+        try:
+            # Re-read under the lock: another worker may have just migrated
+            applied = await _applied_checksums(conn)
+            await conn.commit()
+
+            for migration in migrations:
+                recorded = applied.get(migration.version)
+                if recorded is not None:
+                    if recorded != migration.checksum:
+                        raise MigrationError(
+                            f"Checksum mismatch for applied migration {migration.path.name}; "
+                            "applied migrations must not be edited, add a new one instead"
+                        )
+                    continue
+
+                print(f"Applying migration {migration.path.name}")
+                await _apply(conn, migration)
+                applied_now.append(migration)
+        finally:
+            await conn.rollback()
+            await conn.execute(text("RESET statement_timeout"))
+            await conn.execute(text("SELECT pg_advisory_unlock(:lock_id)"), {"lock_id": MIGRATION_LOCK_ID})
+            await conn.commit()
+
+    return applied_now
+
+
+async def print_status(engine: AsyncEngine):
+    async with engine.connect() as conn:
+        version = await current_schema_version(conn)
+        applied = await _applied_checksums(conn) if version is not None else {}
+    for migration in discover_migrations():
+        if migration.version not in applied:
+            state = "pending"
+        elif applied[migration.version] != migration.checksum:
+            state = "CHECKSUM MISMATCH"
+        else:
+            state = "applied"
+        print(f"{migration.path.name}: {state}")
+
+
+async def main(command: str):
+    from database import engine
+
+    if command == "status":
+        await print_status(engine)
+    else:
+        applied = await run_migrations(engine)
+        print(f"Applied {len(applied)} migration(s)." if applied else "Schema is up to date.")
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main(sys.argv[1] if len(sys.argv) > 1 else "upgrade"))
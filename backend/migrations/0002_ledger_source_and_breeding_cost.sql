@@ -0,0 +1,6 @@
+-- Ledger sync bookkeeping and breeding costs (was manual_migrate.py)
+
+ALTER TABLE financial_transaction ADD COLUMN IF NOT EXISTS source_table VARCHAR(50);
+ALTER TABLE financial_transaction ADD COLUMN IF NOT EXISTS source_id INT;
+
+ALTER TABLE breeding_record ADD COLUMN IF NOT EXISTS cost NUMERIC(10, 2) DEFAULT 0;
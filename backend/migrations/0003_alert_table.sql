@@ -0,0 +1,14 @@
+-- Alerts (was manual_migrate_alerts.py)
+
+CREATE TABLE IF NOT EXISTS alert (
+    id SERIAL PRIMARY KEY,
+    farmer_id INT NOT NULL REFERENCES farmer(farmer_id) ON DELETE CASCADE,
+    type VARCHAR(20) NOT NULL,
+    title VARCHAR(100) NOT NULL,
+    message TEXT NOT NULL,
+    severity VARCHAR(20) NOT NULL,
+    related_animal_id INT REFERENCES animal(animal_id) ON DELETE SET NULL,
+    is_active INT DEFAULT 1,
+    is_dismissed INT DEFAULT 0,
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
+);
@@ -0,0 +1,7 @@
+-- Columns added after the first alert/health releases (was fix_db_schema.py)
+
+ALTER TABLE health_record ADD COLUMN IF NOT EXISTS outcome VARCHAR(50);
+
+ALTER TABLE alert ADD COLUMN IF NOT EXISTS is_dismissed INTEGER DEFAULT 0;
+ALTER TABLE alert ADD COLUMN IF NOT EXISTS severity VARCHAR(20) DEFAULT 'Info';
+ALTER TABLE alert ADD COLUMN IF NOT EXISTS type VARCHAR(20) DEFAULT 'INFO';
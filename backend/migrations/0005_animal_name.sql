@@ -0,0 +1,5 @@
+-- Animal display names (was migrate_name.py and migrate_existing_names.py)
+
+ALTER TABLE animal ADD COLUMN IF NOT EXISTS name VARCHAR(100);
+
+UPDATE animal SET name = tag_number WHERE name IS NULL;
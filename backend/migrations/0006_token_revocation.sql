@@ -0,0 +1,7 @@
+-- Per-farmer token versions; bumping a version revokes older access tokens
+
+CREATE TABLE IF NOT EXISTS token_revocation (
+    farmer_id INT PRIMARY KEY REFERENCES farmer(farmer_id) ON DELETE CASCADE,
+    token_version INT NOT NULL DEFAULT 0,
+    revoked_at TIMESTAMPTZ DEFAULT CURRENT_TIMESTAMP
+);
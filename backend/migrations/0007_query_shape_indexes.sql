@@ -0,0 +1,27 @@
+-- Composite and partial indexes matching the routers' query shapes (see models.py)
+
+CREATE INDEX IF NOT EXISTS ix_milk_production_animal_date ON milk_production (animal_id, date);
+CREATE INDEX IF NOT EXISTS ix_weight_record_animal_date ON weight_record (animal_id, date);
+
+CREATE INDEX IF NOT EXISTS ix_breeding_record_female_status_calving
+    ON breeding_record (female_id, pregnancy_status, expected_calving_date);
+CREATE INDEX IF NOT EXISTS ix_breeding_record_open_pregnancies
+    ON breeding_record (female_id, expected_calving_date)
+    WHERE pregnancy_status = 'Pregnant' AND actual_calving_date IS NULL;
+
+CREATE INDEX IF NOT EXISTS ix_health_record_animal_checkup ON health_record (animal_id, next_checkup_date);
+CREATE INDEX IF NOT EXISTS ix_health_record_open_cases
+    ON health_record (animal_id, date)
+    WHERE next_checkup_date IS NULL;
+
+CREATE INDEX IF NOT EXISTS ix_financial_transaction_source
+    ON financial_transaction (source_table, source_id)
+    WHERE source_table IS NOT NULL;
+
+CREATE INDEX IF NOT EXISTS ix_alert_farmer_dismissed_created ON alert (farmer_id, is_dismissed, created_at);
+
+-- Single-column indexes from the baseline that are now prefixes of the composites above
+DROP INDEX IF EXISTS idx_milk_production_animal_id;
+DROP INDEX IF EXISTS idx_weight_record_animal_id;
+DROP INDEX IF EXISTS idx_breeding_female_id;
+DROP INDEX IF EXISTS idx_health_record_animal_id;
@@ -0,0 +1,10 @@
+-- Per-farmer, per-dataset change counters backing ETags on GET endpoints.
+-- Write paths bump the counter in the same transaction as the data change.
+
+CREATE TABLE IF NOT EXISTS change_version (
+    farmer_id INT NOT NULL REFERENCES farmer(farmer_id) ON DELETE CASCADE,
+    dataset VARCHAR(30) NOT NULL,
+    version BIGINT NOT NULL DEFAULT 0,
+    updated_at TIMESTAMPTZ DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (farmer_id, dataset)
+);
@@ -0,0 +1,118 @@
+-- Row-level change log for delta sync (/sync/changes). Every insert, update
+-- and delete on a farmer-scoped table appends (farmer_id, table, row id, op);
+-- clients keep the last seq they saw and ask for everything after it.
+
+CREATE TABLE IF NOT EXISTS change_log (
+    seq BIGSERIAL PRIMARY KEY,
+    farmer_id INT NOT NULL REFERENCES farmer(farmer_id) ON DELETE CASCADE,
+    table_name VARCHAR(50) NOT NULL,
+    row_id INT NOT NULL,
+    op CHAR(1) NOT NULL CHECK (op IN ('I', 'U', 'D')),
+    changed_at TIMESTAMPTZ DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE INDEX IF NOT EXISTS ix_change_log_farmer_seq ON change_log (farmer_id, seq);
+
+-- TG_ARGV[0]: primary key column of the audited table
+-- TG_ARGV[1]: how the row reaches its farmer: 'farmer', 'animal' or 'pen'
+-- TG_ARGV[2]: column holding that farmer / animal / pen id
+CREATE OR REPLACE FUNCTION log_row_change()
+RETURNS TRIGGER AS $$
+DECLARE
+    rec JSONB;
+    owner_id INT;
+    owner_farmer_id INT;
+BEGIN
+    IF TG_OP = 'DELETE' THEN
+        rec := to_jsonb(OLD);
+    ELSE
+        rec := to_jsonb(NEW);
+    END IF;
+    owner_id := (rec ->> TG_ARGV[2])::INT;
+
+    IF TG_ARGV[1] = 'farmer' THEN
+        owner_farmer_id := owner_id;
+    ELSIF TG_ARGV[1] = 'animal' THEN
+        SELECT farmer_id INTO owner_farmer_id FROM animal WHERE animal_id = owner_id;
+    ELSE
+        SELECT farmer_id INTO owner_farmer_id FROM animal_pen WHERE pen_id = owner_id;
+    END IF;
+
+    -- Children removed by an ON DELETE CASCADE from their animal/pen can no
+    -- longer be traced to a farmer; the parent's tombstone covers them
+    IF owner_farmer_id IS NULL THEN
+        RETURN NULL;
+    END IF;
+
+    -- seq is allocated before commit, so concurrent transactions could commit
+    -- out of seq order and a client could skip a row. Serialising change-log
+    -- writes per farmer makes seq order match commit order for each farmer.
+    PERFORM pg_advisory_xact_lock(72610002, owner_farmer_id);
+
+    INSERT INTO change_log (farmer_id, table_name, row_id, op)
+    VALUES (owner_farmer_id, TG_TABLE_NAME, (rec ->> TG_ARGV[0])::INT, LEFT(TG_OP, 1));
+    RETURN NULL;
+END;
+$$ language 'plpgsql';
+
+DROP TRIGGER IF EXISTS log_change ON animal_pen;
+CREATE TRIGGER log_change AFTER INSERT OR UPDATE OR DELETE ON animal_pen
+    FOR EACH ROW EXECUTE FUNCTION log_row_change('pen_id', 'farmer', 'farmer_id');
+
+DROP TRIGGER IF EXISTS log_change ON animal;
+CREATE TRIGGER log_change AFTER INSERT OR UPDATE OR DELETE ON animal
+    FOR EACH ROW EXECUTE FUNCTION log_row_change('animal_id', 'farmer', 'farmer_id');
+
+DROP TRIGGER IF EXISTS log_change ON milk_production;
+CREATE TRIGGER log_change AFTER INSERT OR UPDATE OR DELETE ON milk_production
+    FOR EACH ROW EXECUTE FUNCTION log_row_change('production_id', 'animal', 'animal_id');
+
+DROP TRIGGER IF EXISTS log_change ON weight_record;
+CREATE TRIGGER log_change AFTER INSERT OR UPDATE OR DELETE ON weight_record
+    FOR EACH ROW EXECUTE FUNCTION log_row_change('weight_id', 'animal', 'animal_id');
+
+DROP TRIGGER IF EXISTS log_change ON breeding_record;
+CREATE TRIGGER log_change AFTER INSERT OR UPDATE OR DELETE ON breeding_record
+    FOR EACH ROW EXECUTE FUNCTION log_row_change('breeding_id', 'animal', 'female_id');
+
+DROP TRIGGER IF EXISTS log_change ON health_record;
+CREATE TRIGGER log_change AFTER INSERT OR UPDATE OR DELETE ON health_record
+    FOR EACH ROW EXECUTE FUNCTION log_row_change('record_id', 'animal', 'animal_id');
+
+DROP TRIGGER IF EXISTS log_change ON feed_log;
+CREATE TRIGGER log_change AFTER INSERT OR UPDATE OR DELETE ON feed_log
+    FOR EACH ROW EXECUTE FUNCTION log_row_change('log_id', 'pen', 'pen_id');
+
+DROP TRIGGER IF EXISTS log_change ON individual_feed_log;
+CREATE TRIGGER log_change AFTER INSERT OR UPDATE OR DELETE ON individual_feed_log
+    FOR EACH ROW EXECUTE FUNCTION log_row_change('individual_feed_id', 'animal', 'animal_id');
+
+DROP TRIGGER IF EXISTS log_change ON labor_activity;
+CREATE TRIGGER log_change AFTER INSERT OR UPDATE OR DELETE ON labor_activity
+    FOR EACH ROW EXECUTE FUNCTION log_row_change('activity_id', 'farmer', 'farmer_id');
+
+DROP TRIGGER IF EXISTS log_change ON financial_transaction;
+CREATE TRIGGER log_change AFTER INSERT OR UPDATE OR DELETE ON financial_transaction
+    FOR EACH ROW EXECUTE FUNCTION log_row_change('transaction_id', 'farmer', 'farmer_id');
+
+-- Seed the log with existing rows so a client starting from since=0 gets everything
+INSERT INTO change_log (farmer_id, table_name, row_id, op)
+SELECT farmer_id, 'animal_pen', pen_id, 'I' FROM animal_pen
+UNION ALL
+SELECT farmer_id, 'animal', animal_id, 'I' FROM animal
+UNION ALL
+SELECT a.farmer_id, 'milk_production', m.production_id, 'I' FROM milk_production m JOIN animal a ON a.animal_id = m.animal_id
+UNION ALL
+SELECT a.farmer_id, 'weight_record', w.weight_id, 'I' FROM weight_record w JOIN animal a ON a.animal_id = w.animal_id
+UNION ALL
+SELECT a.farmer_id, 'breeding_record', b.breeding_id, 'I' FROM breeding_record b JOIN animal a ON a.animal_id = b.female_id
+UNION ALL
+SELECT a.farmer_id, 'health_record', h.record_id, 'I' FROM health_record h JOIN animal a ON a.animal_id = h.animal_id
+UNION ALL
+SELECT p.farmer_id, 'feed_log', f.log_id, 'I' FROM feed_log f JOIN animal_pen p ON p.pen_id = f.pen_id
+UNION ALL
+SELECT a.farmer_id, 'individual_feed_log', i.individual_feed_id, 'I' FROM individual_feed_log i JOIN animal a ON a.animal_id = i.animal_id
+UNION ALL
+SELECT farmer_id, 'labor_activity', activity_id, 'I' FROM labor_activity
+UNION ALL
+SELECT farmer_id, 'financial_transaction', transaction_id, 'I' FROM financial_transaction;
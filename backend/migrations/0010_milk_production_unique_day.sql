@@ -0,0 +1,58 @@
+-- One milk_production row per animal per day. Morning and evening sessions
+-- (and repeated submissions) now upsert into the same row.
+
+-- Every row of a duplicated (animal_id, date) is archived as it was before
+-- the merge, so values the merge overwrites or drops can still be recovered
+CREATE TABLE IF NOT EXISTS milk_production_duplicate_archive (
+    LIKE milk_production,
+    merged_into INT NOT NULL,
+    archived_at TIMESTAMPTZ NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+
+INSERT INTO milk_production_duplicate_archive
+SELECT m.*, dup.keep_id, CURRENT_TIMESTAMP
+FROM milk_production m
+JOIN (
+    SELECT animal_id, date, MIN(production_id) AS keep_id
+    FROM milk_production
+    GROUP BY animal_id, date
+    HAVING COUNT(*) > 1
+) dup ON dup.animal_id = m.animal_id AND dup.date = m.date;
+
+-- Fold existing duplicates into the oldest row: for each field the most
+-- recently recorded non-null value wins, matching the upsert semantics
+WITH merged AS (
+    SELECT
+        animal_id,
+        date,
+        MIN(production_id) AS keep_id,
+        (ARRAY_AGG(morning_yield ORDER BY production_id DESC) FILTER (WHERE morning_yield IS NOT NULL))[1] AS morning_yield,
+        (ARRAY_AGG(evening_yield ORDER BY production_id DESC) FILTER (WHERE evening_yield IS NOT NULL))[1] AS evening_yield,
+        (ARRAY_AGG(fat_content ORDER BY production_id DESC) FILTER (WHERE fat_content IS NOT NULL))[1] AS fat_content,
+        (ARRAY_AGG(protein_content ORDER BY production_id DESC) FILTER (WHERE protein_content IS NOT NULL))[1] AS protein_content,
+        (ARRAY_AGG(somatic_cell_count ORDER BY production_id DESC) FILTER (WHERE somatic_cell_count IS NOT NULL))[1] AS somatic_cell_count,
+        (ARRAY_AGG(quality_notes ORDER BY production_id DESC) FILTER (WHERE quality_notes IS NOT NULL))[1] AS quality_notes
+    FROM milk_production
+    GROUP BY animal_id, date
+    HAVING COUNT(*) > 1
+)
+UPDATE milk_production m SET
+    morning_yield = merged.morning_yield,
+    evening_yield = merged.evening_yield,
+    fat_content = merged.fat_content,
+    protein_content = merged.protein_content,
+    somatic_cell_count = merged.somatic_cell_count,
+    quality_notes = merged.quality_notes
+FROM merged
+WHERE m.production_id = merged.keep_id;
+
+DELETE FROM milk_production dup
+USING milk_production keep
+WHERE dup.animal_id = keep.animal_id
+  AND dup.date = keep.date
+  AND dup.production_id > keep.production_id;
+
+-- The unique index serves the same (animal_id, date) lookups as the old one
+DROP INDEX IF EXISTS ix_milk_production_animal_date;
+ALTER TABLE milk_production
+    ADD CONSTRAINT uq_milk_production_animal_date UNIQUE (animal_id, date);
@@ -0,0 +1,11 @@
+-- Ledger category for acquisition costs posted by the bulk animal import
+-- (source_table = 'animal')
+
+ALTER TABLE financial_transaction DROP CONSTRAINT IF EXISTS financial_transaction_category_check;
+ALTER TABLE financial_transaction ADD CONSTRAINT financial_transaction_category_check CHECK (category IN (
+    -- Income categories
+    'Milk Sales', 'Animal Sales', 'Manure Sales', 'Breeding Services',
+    -- Expense categories
+    'Feed', 'Veterinary', 'Labor', 'Medication', 'Transport',
+    'Breeding Costs', 'Equipment', 'Utilities', 'Other', 'Animal Purchases'
+));
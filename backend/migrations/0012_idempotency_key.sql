@@ -0,0 +1,17 @@
+-- Stored responses for POSTs sent with an Idempotency-Key header, so a
+-- retried request is answered from here instead of writing twice.
+-- farmer_id 0 scopes keys sent without a (valid) bearer token.
+
+CREATE TABLE IF NOT EXISTS idempotency_key (
+    farmer_id INT NOT NULL,
+    idempotency_key VARCHAR(255) NOT NULL,
+    request_hash CHAR(64) NOT NULL,
+    status_code INT,
+    response_body BYTEA,
+    response_headers JSONB,
+    created_at TIMESTAMPTZ NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    expires_at TIMESTAMPTZ NOT NULL,
+    PRIMARY KEY (farmer_id, idempotency_key)
+);
+
+CREATE INDEX IF NOT EXISTS ix_idempotency_key_expires_at ON idempotency_key (expires_at);
@@ -0,0 +1,93 @@
+-- Incremental refresh of performance_cache. change_log entries for tables
+-- that feed a metric now carry the row's date (and its previous date when an
+-- update moved it), so a refresh only recomputes the periods that changed.
+
+ALTER TABLE change_log ADD COLUMN IF NOT EXISTS row_date DATE;
+ALTER TABLE change_log ADD COLUMN IF NOT EXISTS prev_row_date DATE;
+
+-- TG_ARGV[0]: primary key column of the audited table
+-- TG_ARGV[1]: how the row reaches its farmer: 'farmer', 'animal' or 'pen'
+-- TG_ARGV[2]: column holding that farmer / animal / pen id
+-- TG_ARGV[3]: optional date column recorded as row_date
+CREATE OR REPLACE FUNCTION log_row_change()
+RETURNS TRIGGER AS $$
+DECLARE
+    rec JSONB;
+    owner_id INT;
+    owner_farmer_id INT;
+    changed_date DATE;
+    previous_date DATE;
+BEGIN
+    IF TG_OP = 'DELETE' THEN
+        rec := to_jsonb(OLD);
+    ELSE
+        rec := to_jsonb(NEW);
+    END IF;
+    owner_id := (rec ->> TG_ARGV[2])::INT;
+
+    IF TG_ARGV[1] = 'farmer' THEN
+        owner_farmer_id := owner_id;
+    ELSIF TG_ARGV[1] = 'animal' THEN
+        SELECT farmer_id INTO owner_farmer_id FROM animal WHERE animal_id = owner_id;
+    ELSE
+        SELECT farmer_id INTO owner_farmer_id FROM animal_pen WHERE pen_id = owner_id;
+    END IF;
+
+    -- Children removed by an ON DELETE CASCADE from their animal/pen can no
+    -- longer be traced to a farmer; the parent's tombstone covers them
+    IF owner_farmer_id IS NULL THEN
+        RETURN NULL;
+    END IF;
+
+    IF TG_NARGS > 3 THEN
+        changed_date := (rec ->> TG_ARGV[3])::DATE;
+        IF TG_OP = 'UPDATE' THEN
+            previous_date := NULLIF((to_jsonb(OLD) ->> TG_ARGV[3])::DATE, changed_date);
+        END IF;
+    END IF;
+
+    -- seq is allocated before commit, so concurrent transactions could commit
+    -- out of seq order and a client could skip a row. Serialising change-log
+    -- writes per farmer makes seq order match commit order for each farmer.
+    PERFORM pg_advisory_xact_lock(72610002, owner_farmer_id);
+
+    INSERT INTO change_log (farmer_id, table_name, row_id, op, row_date, prev_row_date)
+    VALUES (owner_farmer_id, TG_TABLE_NAME, (rec ->> TG_ARGV[0])::INT, LEFT(TG_OP, 1), changed_date, previous_date);
+    RETURN NULL;
+END;
+$$ language 'plpgsql';
+
+DROP TRIGGER IF EXISTS log_change ON milk_production;
+CREATE TRIGGER log_change AFTER INSERT OR UPDATE OR DELETE ON milk_production
+    FOR EACH ROW EXECUTE FUNCTION log_row_change('production_id', 'animal', 'animal_id', 'date');
+
+DROP TRIGGER IF EXISTS log_change ON weight_record;
+CREATE TRIGGER log_change AFTER INSERT OR UPDATE OR DELETE ON weight_record
+    FOR EACH ROW EXECUTE FUNCTION log_row_change('weight_id', 'animal', 'animal_id', 'date');
+
+DROP TRIGGER IF EXISTS log_change ON health_record;
+CREATE TRIGGER log_change AFTER INSERT OR UPDATE OR DELETE ON health_record
+    FOR EACH ROW EXECUTE FUNCTION log_row_change('record_id', 'animal', 'animal_id', 'date');
+
+DROP TRIGGER IF EXISTS log_change ON feed_log;
+CREATE TRIGGER log_change AFTER INSERT OR UPDATE OR DELETE ON feed_log
+    FOR EACH ROW EXECUTE FUNCTION log_row_change('log_id', 'pen', 'pen_id', 'date');
+
+DROP TRIGGER IF EXISTS log_change ON individual_feed_log;
+CREATE TRIGGER log_change AFTER INSERT OR UPDATE OR DELETE ON individual_feed_log
+    FOR EACH ROW EXECUTE FUNCTION log_row_change('individual_feed_id', 'animal', 'animal_id', 'date');
+
+DROP TRIGGER IF EXISTS log_change ON labor_activity;
+CREATE TRIGGER log_change AFTER INSERT OR UPDATE OR DELETE ON labor_activity
+    FOR EACH ROW EXECUTE FUNCTION log_row_change('activity_id', 'farmer', 'farmer_id', 'date');
+
+-- How far into change_log each farmer's performance_cache has been brought.
+-- Farmers without a row get a full rebuild on their first refresh.
+CREATE TABLE IF NOT EXISTS metric_refresh_state (
+    farmer_id INT PRIMARY KEY REFERENCES farmer(farmer_id) ON DELETE CASCADE,
+    last_seq BIGINT NOT NULL,
+    refreshed_at TIMESTAMPTZ DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE INDEX IF NOT EXISTS ix_performance_cache_lookup
+    ON performance_cache (farmer_id, period_type, metric_name, period_start);
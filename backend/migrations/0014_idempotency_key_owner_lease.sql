@@ -0,0 +1,17 @@
+-- Idempotency keys are only honored for requests authenticated with farmer
+-- claims: drop the shared farmer_id 0 scope (it could replay one client's
+-- response, token issuance included, to anyone sending the same key) and tie
+-- keys to their farmer.
+DELETE FROM idempotency_key
+WHERE farmer_id NOT IN (SELECT farmer_id FROM farmer);
+
+ALTER TABLE idempotency_key DROP CONSTRAINT IF EXISTS idempotency_key_farmer_id_fkey;
+ALTER TABLE idempotency_key
+    ADD CONSTRAINT idempotency_key_farmer_id_fkey
+    FOREIGN KEY (farmer_id) REFERENCES farmer (farmer_id) ON DELETE CASCADE;
+
+-- A pending key (status_code NULL) is leased to the request running it until
+-- lease_expires_at; after that a retry may take it over and run again.
+ALTER TABLE idempotency_key ADD COLUMN IF NOT EXISTS lease_expires_at TIMESTAMPTZ;
+UPDATE idempotency_key SET lease_expires_at = created_at WHERE lease_expires_at IS NULL;
+ALTER TABLE idempotency_key ALTER COLUMN lease_expires_at SET NOT NULL;
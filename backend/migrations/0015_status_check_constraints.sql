@@ -0,0 +1,11 @@
+-- Align the baseline CHECK constraints with the values the API writes:
+-- disposing of an animal sets status 'Disposed', and breeding records move
+-- through 'Pregnant' (confirmed) and 'Calved' as well as the original values.
+
+ALTER TABLE animal DROP CONSTRAINT IF EXISTS animal_status_check;
+ALTER TABLE animal ADD CONSTRAINT animal_status_check
+    CHECK (status IN ('Active', 'Sold', 'Dead', 'Culled', 'Disposed'));
+
+ALTER TABLE breeding_record DROP CONSTRAINT IF EXISTS breeding_record_pregnancy_status_check;
+ALTER TABLE breeding_record ADD CONSTRAINT breeding_record_pregnancy_status_check
+    CHECK (pregnancy_status IN ('Unknown', 'Confirmed', 'Pregnant', 'Failed', 'Calved'));
@@ -0,0 +1,59 @@
+-- change_log ordering without the per-farmer advisory lock. seq is allocated
+-- before commit, so concurrent transactions can commit out of seq order; the
+-- lock made them wait for each other on every row. Each entry now records the
+-- transaction that wrote it, and readers only go up to the first entry whose
+-- transaction may still be in progress (txid at or past the snapshot xmin),
+-- so no entry can commit behind a cursor that was already handed out.
+
+-- Existing entries keep NULL: their transactions are long committed
+ALTER TABLE change_log ADD COLUMN IF NOT EXISTS txid XID8;
+ALTER TABLE change_log ALTER COLUMN txid SET DEFAULT pg_current_xact_id();
+
+CREATE INDEX IF NOT EXISTS ix_change_log_farmer_txid ON change_log (farmer_id, txid);
+
+-- TG_ARGV[0]: primary key column of the audited table
+-- TG_ARGV[1]: how the row reaches its farmer: 'farmer', 'animal' or 'pen'
+-- TG_ARGV[2]: column holding that farmer / animal / pen id
+-- TG_ARGV[3]: optional date column recorded as row_date
+CREATE OR REPLACE FUNCTION log_row_change()
+RETURNS TRIGGER AS $$
+DECLARE
+    rec JSONB;
+    owner_id INT;
+    owner_farmer_id INT;
+    changed_date DATE;
+    previous_date DATE;
+BEGIN
+    IF TG_OP = 'DELETE' THEN
+        rec := to_jsonb(OLD);
+    ELSE
+        rec := to_jsonb(NEW);
+    END IF;
+    owner_id := (rec ->> TG_ARGV[2])::INT;
+
+    IF TG_ARGV[1] = 'farmer' THEN
+        owner_farmer_id := owner_id;
+    ELSIF TG_ARGV[1] = 'animal' THEN
+        SELECT farmer_id INTO owner_farmer_id FROM animal WHERE animal_id = owner_id;
+    ELSE
+        SELECT farmer_id INTO owner_farmer_id FROM animal_pen WHERE pen_id = owner_id;
+    END IF;
+
+    -- Children removed by an ON DELETE CASCADE from their animal/pen can no
+    -- longer be traced to a farmer; the parent's tombstone covers them
+    IF owner_farmer_id IS NULL THEN
+        RETURN NULL;
+    END IF;
+
+    IF TG_NARGS > 3 THEN
+        changed_date := (rec ->> TG_ARGV[3])::DATE;
+        IF TG_OP = 'UPDATE' THEN
+            previous_date := NULLIF((to_jsonb(OLD) ->> TG_ARGV[3])::DATE, changed_date);
+        END IF;
+    END IF;
+
+    INSERT INTO change_log (farmer_id, table_name, row_id, op, row_date, prev_row_date)
+    VALUES (owner_farmer_id, TG_TABLE_NAME, (rec ->> TG_ARGV[0])::INT, LEFT(TG_OP, 1), changed_date, previous_date);
+    RETURN NULL;
+END;
+$$ language 'plpgsql';
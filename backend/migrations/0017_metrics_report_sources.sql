@@ -0,0 +1,18 @@
+-- performance_cache now also backs /reports/financial-summary and
+-- /reports/fcr, so the ledger, breeding records and animals (acquisition
+-- costs) become metric sources and their change_log entries carry a date.
+
+DROP TRIGGER IF EXISTS log_change ON financial_transaction;
+CREATE TRIGGER log_change AFTER INSERT OR UPDATE OR DELETE ON financial_transaction
+    FOR EACH ROW EXECUTE FUNCTION log_row_change('transaction_id', 'farmer', 'farmer_id', 'date');
+
+DROP TRIGGER IF EXISTS log_change ON breeding_record;
+CREATE TRIGGER log_change AFTER INSERT OR UPDATE OR DELETE ON breeding_record
+    FOR EACH ROW EXECUTE FUNCTION log_row_change('breeding_id', 'animal', 'female_id', 'breeding_date');
+
+DROP TRIGGER IF EXISTS log_change ON animal;
+CREATE TRIGGER log_change AFTER INSERT OR UPDATE OR DELETE ON animal
+    FOR EACH ROW EXECUTE FUNCTION log_row_change('animal_id', 'farmer', 'farmer_id', 'created_at');
+
+-- New metrics: every farmer gets a full rebuild on the next refresh
+DELETE FROM metric_refresh_state;
@@ -0,0 +1,14 @@
+-- change_log is read in (txid, seq) order instead of seq order. A transaction
+-- gets its txid at its first write but its seq only when it logs a row, so
+-- seq order is not commit order: a later seq can commit first. Readers stop
+-- at the snapshot xmin (every txid below it has finished), and anything that
+-- commits afterwards has a txid at or past that point, so it always sorts
+-- after a cursor that was handed out.
+
+-- Entries from before 0016 were serialized by the advisory lock, so their seq
+-- order is their commit order; txid 0 sorts them ahead of everything since
+UPDATE change_log SET txid = '0' WHERE txid IS NULL;
+ALTER TABLE change_log ALTER COLUMN txid SET NOT NULL;
+
+DROP INDEX IF EXISTS ix_change_log_farmer_txid;
+CREATE INDEX IF NOT EXISTS ix_change_log_farmer_txid_seq ON change_log (farmer_id, txid, seq);
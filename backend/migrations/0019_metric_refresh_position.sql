@@ -0,0 +1,7 @@
+-- Metric refreshes track the same (txid, seq) change_log position as sync
+-- cursors (see 0018). A last_seq recorded by the old seq-based horizon can
+-- sit past a change that committed after it was taken; that change would
+-- never be folded in, so every farmer is rebuilt from scratch.
+ALTER TABLE metric_refresh_state ADD COLUMN IF NOT EXISTS last_txid XID8 NOT NULL DEFAULT '0';
+
+DELETE FROM metric_refresh_state;
@@ -1,8 +1,17 @@
-from sqlalchemy import Column, Integer, String, Date, Numeric, ForeignKey, Text, TIMESTAMP, CheckConstraint, UniqueConstraint
+from sqlalchemy import Column, Integer, BigInteger, String, Date, Numeric, ForeignKey, Text, TIMESTAMP, CheckConstraint, UniqueConstraint, Index, LargeBinary, text
+from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
+from sqlalchemy.types import UserDefinedType
 from database import Base
 
+class XID8(UserDefinedType):
+    """Postgres 64-bit transaction id; asyncpg reads and binds it as an int."""
+    cache_ok = True
+
+    def get_col_spec(self, **kw):
+        return "XID8"
+
 class Farmer(Base):
     __tablename__ = "farmer"
 
@@ -24,6 +33,73 @@ class Farmer(Base):
     performance_caches = relationship("PerformanceCache", back_populates="farmer", cascade="all, delete-orphan")
     alerts = relationship("Alert", back_populates="farmer", cascade="all, delete-orphan")
 
+class TokenRevocation(Base):
+    __tablename__ = "token_revocation"
+
+    # Bumping token_version invalidates every token issued with an older version
+    farmer_id = Column(Integer, ForeignKey("farmer.farmer_id", ondelete="CASCADE"), primary_key=True)
+    token_version = Column(Integer, nullable=False, default=0)
+    revoked_at = Column(TIMESTAMP(timezone=True), server_default=func.now(), onupdate=func.now())
+
+class ChangeVersion(Base):
+    __tablename__ = "change_version"
+
+    # Bumped by every write to a farmer's dataset; GET endpoints derive ETags from it
+    farmer_id = Column(Integer, ForeignKey("farmer.farmer_id", ondelete="CASCADE"), primary_key=True)
+    dataset = Column(String(30), primary_key=True)
+    version = Column(BigInteger, nullable=False, default=0)
+    updated_at = Column(TIMESTAMP(timezone=True), server_default=func.now(), onupdate=func.now())
+
+class ChangeLog(Base):
+    __tablename__ = "change_log"
+
+    # Appended by the log_row_change() trigger on every farmer-scoped table.
+    # Read in (txid, seq) order, see change_log.py
+    seq = Column(BigInteger, primary_key=True)
+    txid = Column(XID8, nullable=False, server_default=func.pg_current_xact_id())
+    farmer_id = Column(Integer, ForeignKey("farmer.farmer_id", ondelete="CASCADE"), nullable=False)
+    table_name = Column(String(50), nullable=False)
+    row_id = Column(Integer, nullable=False)
+    op = Column(String(1), nullable=False)
+    changed_at = Column(TIMESTAMP(timezone=True), server_default=func.now())
+    # Date of rows that feed performance metrics; prev_row_date when an update moved it
+    row_date = Column(Date)
+    prev_row_date = Column(Date)
+
+    __table_args__ = (
+        Index('ix_change_log_farmer_seq', 'farmer_id', 'seq'),
+        Index('ix_change_log_farmer_txid_seq', 'farmer_id', 'txid', 'seq'),
+    )
+
+class MetricRefreshState(Base):
+    __tablename__ = "metric_refresh_state"
+
+    # Last change_log position (last_txid, last_seq) folded into the
+    # farmer's performance_cache rows
+    farmer_id = Column(Integer, ForeignKey("farmer.farmer_id", ondelete="CASCADE"), primary_key=True)
+    last_txid = Column(XID8, nullable=False, server_default="0")
+    last_seq = Column(BigInteger, nullable=False)
+    refreshed_at = Column(TIMESTAMP(timezone=True), server_default=func.now(), onupdate=func.now())
+
+class IdempotencyKey(Base):
+    __tablename__ = "idempotency_key"
+
+    farmer_id = Column(Integer, ForeignKey("farmer.farmer_id", ondelete="CASCADE"), primary_key=True)
+    idempotency_key = Column(String(255), primary_key=True)
+    request_hash = Column(String(64), nullable=False)
+    # NULL until the first request finishes
+    status_code = Column(Integer)
+    response_body = Column(LargeBinary)
+    response_headers = Column(JSONB)
+    created_at = Column(TIMESTAMP(timezone=True), nullable=False, server_default=func.now())
+    expires_at = Column(TIMESTAMP(timezone=True), nullable=False)
+    # While pending, the key belongs to the running request until this time
+    lease_expires_at = Column(TIMESTAMP(timezone=True), nullable=False)
+
+    __table_args__ = (
+        Index('ix_idempotency_key_expires_at', 'expires_at'),
+    )
+
 class AnimalPen(Base):
     __tablename__ = "animal_pen"
 
@@ -92,6 +168,11 @@ class MilkProduction(Base):
     quality_notes = Column(Text)
     created_at = Column(TIMESTAMP(timezone=True), server_default=func.now())
 
+    # One row per animal per day; morning and evening sessions upsert into it
+    __table_args__ = (
+        UniqueConstraint('animal_id', 'date', name='uq_milk_production_animal_date'),
+    )
+
     animal = relationship("Animal", back_populates="milk_productions")
 
 class WeightRecord(Base):
@@ -105,6 +186,10 @@ class WeightRecord(Base):
     notes = Column(Text)
     created_at = Column(TIMESTAMP(timezone=True), server_default=func.now())
 
+    __table_args__ = (
+        Index('ix_weight_record_animal_date', 'animal_id', 'date'),
+    )
+
     animal = relationship("Animal", back_populates="weight_records")
 
 class BreedingRecord(Base):
@@ -124,6 +209,13 @@ class BreedingRecord(Base):
     notes = Column(Text)
     created_at = Column(TIMESTAMP(timezone=True), server_default=func.now())
 
+    __table_args__ = (
+        # Breeding boards: pregnant / due-soon lookups per female
+        Index('ix_breeding_record_female_status_calving', 'female_id', 'pregnancy_status', 'expected_calving_date'),
+        Index('ix_breeding_record_open_pregnancies', 'female_id', 'expected_calving_date',
+              postgresql_where=text("pregnancy_status = 'Pregnant' AND actual_calving_date IS NULL")),
+    )
+
     female = relationship("Animal", foreign_keys=[female_id], back_populates="breeding_records_female")
     male = relationship("Animal", foreign_keys=[male_id], back_populates="breeding_records_male")
     offspring = relationship("Animal", foreign_keys=[offspring_id], back_populates="breeding_records_offspring")
@@ -174,6 +266,12 @@ class HealthRecord(Base):
     notes = Column(Text)
     created_at = Column(TIMESTAMP(timezone=True), server_default=func.now())
 
+    __table_args__ = (
+        Index('ix_health_record_animal_checkup', 'animal_id', 'next_checkup_date'),
+        # Open cases (no follow-up scheduled) drive the sick list and untreated-illness alerts
+        Index('ix_health_record_open_cases', 'animal_id', 'date', postgresql_where=text('next_checkup_date IS NULL')),
+    )
+
     animal = relationship("Animal", back_populates="health_records")
 
 class LaborActivity(Base):
@@ -213,6 +311,11 @@ class FinancialTransaction(Base):
     notes = Column(Text)
     created_at = Column(TIMESTAMP(timezone=True), server_default=func.now())
 
+    __table_args__ = (
+        # ledger_sync looks up the mirrored transaction of an operational record
+        Index('ix_financial_transaction_source', 'source_table', 'source_id', postgresql_where=text('source_table IS NOT NULL')),
+    )
+
     farmer = relationship("Farmer", back_populates="financial_transactions")
     related_animal = relationship("Animal", foreign_keys=[related_animal_id])
     related_pen = relationship("AnimalPen", foreign_keys=[related_pen_id])
@@ -231,7 +334,10 @@ class PerformanceCache(Base):
     related_pen_id = Column(Integer, ForeignKey("animal_pen.pen_id", ondelete="SET NULL"))
     calculated_at = Column(TIMESTAMP(timezone=True), server_default=func.now())
 
-    __table_args__ = (UniqueConstraint('farmer_id', 'metric_name', 'period_type', 'period_start', 'related_animal_id', 'related_pen_id', name='unique_performance_metric'),)
+    __table_args__ = (
+        UniqueConstraint('farmer_id', 'metric_name', 'period_type', 'period_start', 'related_animal_id', 'related_pen_id', name='unique_performance_metric'),
+        Index('ix_performance_cache_lookup', 'farmer_id', 'period_type', 'metric_name', 'period_start'),
+    )
 
     farmer = relationship("Farmer", back_populates="performance_caches")
 
@@ -251,5 +357,9 @@ class Alert(Base):
     # Actually, let's use TIMESTAMP for cleared_at or similar? No, is_dismissed is fine.
     created_at = Column(TIMESTAMP(timezone=True), server_default=func.now())
 
+    __table_args__ = (
+        Index('ix_alert_farmer_dismissed_created', 'farmer_id', 'is_dismissed', 'created_at'),
+    )
+
     farmer = relationship("Farmer", back_populates="alerts")
     related_animal = relationship("Animal")
@@ -0,0 +1,59 @@
+from typing import Iterable, Set
+
+from fastapi import HTTPException
+from sqlalchemy import any_, bindparam, Integer
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+import models
+
+
+async def _unowned_ids(db: AsyncSession, id_column, farmer_column, farmer_id: int, ids: Iterable[int]) -> Set[int]:
+    requested = set(ids)
+    if not requested:
+        return set()
+
+    # Always asked of the DB, in the write's own session: a per-process cache
+    # can't see deletes or reassignments made by other workers or Core statements.
+    # One narrow index lookup covers every id.
+    result = await db.execute(
+        select(id_column).where(
+            id_column == any_(bindparam("ids", list(requested), type_=ARRAY(Integer))),
+            farmer_column == farmer_id
+        )
+    )
+    return requested - set(result.scalars().all())
+
+
+async def unowned_animal_ids(db: AsyncSession, farmer_id: int, animal_ids: Iterable[int]) -> Set[int]:
+    """
+    Returns the subset of animal_ids that do not belong to farmer_id (or don't exist).
+    """
+    return await _unowned_ids(db, models.Animal.animal_id, models.Animal.farmer_id, farmer_id, animal_ids)
+
+
+async def unowned_pen_ids(db: AsyncSession, farmer_id: int, pen_ids: Iterable[int]) -> Set[int]:
+    """
+    Returns the subset of pen_ids that do not belong to farmer_id (or don't exist).
+    """
+    return await _unowned_ids(db, models.AnimalPen.pen_id, models.AnimalPen.farmer_id, farmer_id, pen_ids)
+
+
+async def require_animals(db: AsyncSession, farmer_id: int, animal_ids: Iterable[int], detail: str = "Not authorized"):
+    if await unowned_animal_ids(db, farmer_id, animal_ids):
+        raise HTTPException(status_code=403, detail=detail)
+
+
+async def require_pens(db: AsyncSession, farmer_id: int, pen_ids: Iterable[int], detail: str = "Not authorized"):
+    if await unowned_pen_ids(db, farmer_id, pen_ids):
+        raise HTTPException(status_code=403, detail=detail)
+
+
+async def require_animal(db: AsyncSession, farmer_id: int, animal_id: int, detail: str = "Not authorized"):
+    await require_animals(db, farmer_id, [animal_id], detail)
+
+
+async def require_pen(db: AsyncSession, farmer_id: int, pen_id: int, detail: str = "Not authorized"):
+    await require_pens(db, farmer_id, [pen_id], detail)
+
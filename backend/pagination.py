@@ -0,0 +1,77 @@
+import base64
+import os
+from dataclasses import dataclass
+from datetime import date
+from typing import Optional
+
+from fastapi import HTTPException, Query, Response
+from sqlalchemy import tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+# Upper bound for ?limit=; omitting limit keeps the old "return everything" behaviour
+MAX_PAGE_SIZE = int(os.getenv("MAX_PAGE_SIZE", "1000"))
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+@dataclass(frozen=True)
+class PageParams:
+    limit: Optional[int] = None
+    after_date: Optional[date] = None
+    after_id: Optional[int] = None
+    date_from: Optional[date] = None
+    date_to: Optional[date] = None
+
+
+def encode_cursor(row_date: date, row_id: int) -> str:
+    return base64.urlsafe_b64encode(f"{row_date.isoformat()}|{row_id}".encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str):
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        row_date, row_id = base64.urlsafe_b64decode(padded.encode()).decode().split("|")
+        return date.fromisoformat(row_date), int(row_id)
+    except (ValueError, UnicodeDecodeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def page_params(
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = Query(None, description=f"Opaque value from the {NEXT_CURSOR_HEADER} response header"),
+    date_from: Optional[date] = Query(None, alias="from"),
+    date_to: Optional[date] = Query(None, alias="to"),
+) -> PageParams:
+    """
+    Shared query parameters for history list endpoints: ?limit=&cursor=&from=&to=
+    """
+    if date_from and date_to and date_from > date_to:
+        raise HTTPException(status_code=400, detail="'from' must not be after 'to'")
+    after_date, after_id = decode_cursor(cursor) if cursor else (None, None)
+    return PageParams(limit, after_date, after_id, date_from, date_to)
+
+
+async def fetch_page(db: AsyncSession, query, date_column, id_column, page: PageParams, response: Response):
+    """
+    Runs a Core column `query` newest-first with keyset pagination on
+    (date, id) and returns its rows. When a limit is given and more rows
+    remain, the cursor for the next page is returned in the X-Next-Cursor header.
+    """
+    if page.date_from:
+        query = query.where(date_column >= page.date_from)
+    if page.date_to:
+        query = query.where(date_column <= page.date_to)
+    if page.after_date is not None:
+        query = query.where(tuple_(date_column, id_column) < tuple_(page.after_date, page.after_id))
+
+    query = query.order_by(date_column.desc(), id_column.desc())
+    if page.limit:
+        # One extra row tells us whether another page exists
+        query = query.limit(page.limit + 1)
+
+    rows = (await db.execute(query)).all()
+    if page.limit and len(rows) > page.limit:
+        rows = rows[:page.limit]
+        last = rows[-1]
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor(getattr(last, date_column.key), getattr(last, id_column.key))
+    return rows
@@ -0,0 +1,79 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from threading import Lock
+
+
+class PasswordPoolSaturated(Exception):
+    """Raised when the password work queue is full and the request is shed."""
+
+
+class PasswordWorkerPool:
+    """
+    Dedicated thread pool for CPU-heavy password work (bcrypt releases the GIL,
+    so threads give real parallelism). Requests beyond `workers + max_queue`
+    in flight are rejected instead of piling up behind the event loop.
+    """
+
+    def __init__(self, workers: int, max_queue: int):
+        self.workers = workers
+        self.max_queue = max_queue
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="password")
+        self._lock = Lock()
+        self.in_flight = 0
+        self.running = 0
+        self.completed = 0
+        self.rejected = 0
+        self.total_wait_seconds = 0.0
+        self.total_run_seconds = 0.0
+        self.max_wait_seconds = 0.0
+        self.max_run_seconds = 0.0
+
+    async def run(self, fn, *args):
+        with self._lock:
+            if self.in_flight >= self.workers + self.max_queue:
+                self.rejected += 1
+                raise PasswordPoolSaturated()
+            self.in_flight += 1
+
+        submitted_at = time.perf_counter()
+        loop = asyncio.get_running_loop()
+        try:
+            return await loop.run_in_executor(self._executor, self._timed, submitted_at, fn, *args)
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+
+    def _timed(self, submitted_at: float, fn, *args):
+        started_at = time.perf_counter()
+        with self._lock:
+            self.running += 1
+        try:
+            return fn(*args)
+        finally:
+            finished_at = time.perf_counter()
+            wait, run = started_at - submitted_at, finished_at - started_at
+            with self._lock:
+                self.running -= 1
+                self.completed += 1
+                self.total_wait_seconds += wait
+                self.total_run_seconds += run
+                self.max_wait_seconds = max(self.max_wait_seconds, wait)
+                self.max_run_seconds = max(self.max_run_seconds, run)
+
+    def stats(self):
+        with self._lock:
+            done = self.completed or 1
+            return {
+                "workers": self.workers,
+                "max_queue": self.max_queue,
+                "in_flight": self.in_flight,
+                "running": self.running,
+                "queue_depth": self.in_flight - self.running,
+                "completed": self.completed,
+                "rejected": self.rejected,
+                "avg_wait_ms": round(self.total_wait_seconds / done * 1000, 2),
+                "avg_run_ms": round(self.total_run_seconds / done * 1000, 2),
+                "max_wait_ms": round(self.max_wait_seconds * 1000, 2),
+                "max_run_ms": round(self.max_run_seconds * 1000, 2),
+            }
@@ -0,0 +1,113 @@
+import os
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Awaitable, Callable, Iterable, Optional
+
+from fastapi import Request
+from sqlalchemy import event
+
+# Requests issuing more statements than this are logged; 0 disables the warning
+QUERY_COUNT_WARN_THRESHOLD = int(os.getenv("QUERY_COUNT_WARN_THRESHOLD", "50"))
+
+
+class QueryStats:
+    """
+    Statement count and cumulative DB time for one scope (usually a request).
+    Scopes nest: a statement is counted in the current scope and all its parents.
+    """
+
+    def __init__(self, parent: Optional["QueryStats"] = None):
+        self.parent = parent
+        self.count = 0
+        self.total_seconds = 0.0
+        self.statements = []
+
+    def record(self, statement: str, seconds: float):
+        stats = self
+        while stats is not None:
+            stats.count += 1
+            stats.total_seconds += seconds
+            stats.statements.append(statement)
+            stats = stats.parent
+
+    def server_timing(self) -> str:
+        return f'db;dur={self.total_seconds * 1000:.1f};desc="{self.count} queries"'
+
+
+_current_stats: ContextVar[Optional[QueryStats]] = ContextVar("query_stats", default=None)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    context._query_started_at = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stats = _current_stats.get()
+    if stats is not None:
+        stats.record(statement, time.perf_counter() - context._query_started_at)
+
+
+def instrument_engine(engine):
+    """
+    Counts every statement run on `engine` (async or sync) into the current scope.
+    """
+    sync_engine = getattr(engine, "sync_engine", engine)
+    if not event.contains(sync_engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(sync_engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(sync_engine, "after_cursor_execute", _after_cursor_execute)
+
+
+@contextmanager
+def capture_queries():
+    """
+    Collects the statements issued inside the block, including those made by
+    requests handled in-process (e.g. through an httpx ASGITransport client).
+    """
+    stats = QueryStats(parent=_current_stats.get())
+    token = _current_stats.set(stats)
+    try:
+        yield stats
+    finally:
+        _current_stats.reset(token)
+
+
+async def record_query_stats(request: Request, call_next):
+    # The app runs in a copy of this context, so it sees the same stats object
+    with capture_queries() as stats:
+        response = await call_next(request)
+    response.headers["Server-Timing"] = stats.server_timing()
+    if QUERY_COUNT_WARN_THRESHOLD and stats.count > QUERY_COUNT_WARN_THRESHOLD:
+        print(f"{request.method} {request.url.path} issued {stats.count} queries ({stats.total_seconds * 1000:.1f} ms)")
+    return response
+
+
+async def assert_no_n_plus_one(
+    seed: Callable[[int], Awaitable[None]],
+    call: Callable[[], Awaitable[None]],
+    sizes: Iterable[int] = (2, 20),
+    label: str = "endpoint",
+):
+    """
+    Test helper: grows the dataset with `seed(n)` for each size, runs `call()`
+    and fails if the number of statements grows with the row count. Each size
+    gets one unmeasured warm-up call so cache fills don't skew the counts.
+
+        await assert_no_n_plus_one(
+            seed=lambda n: add_animals_to_pen(pen_id, n),
+            call=lambda: client.get(f"/reports/fcr/{pen_id}", headers=auth),
+            label="pen FCR",
+        )
+    """
+    counts = {}
+    for size in sizes:
+        await seed(size)
+        await call()
+        with capture_queries() as stats:
+            await call()
+        counts[size] = stats.count
+
+    if max(counts.values()) > counts[min(counts)]:
+        detail = ", ".join(f"{size} rows: {count} queries" for size, count in counts.items())
+        raise AssertionError(f"N+1 query pattern in {label}: {detail}")
+    return counts
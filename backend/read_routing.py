@@ -0,0 +1,28 @@
+from fastapi import Request
+
+from auth import farmer_id_from_request
+from database import get_read_session, mark_farmer_write
+
+WRITE_METHODS = {"POST", "PUT", "PATCH", "DELETE"}
+
+async def get_read_db(request: Request):
+    """
+    Session for read-only endpoints. Routed to the read replica unless it is
+    unset or lagging, or the caller wrote within the read-your-writes window.
+    """
+    session = await get_read_session(farmer_id_from_request(request))
+    async with session:
+        try:
+            yield session
+        finally:
+            await session.close()
+
+async def track_farmer_writes(request: Request, call_next):
+    # Successful writes pin the farmer's reads to the primary for a while.
+    # Other workers see the write through change_version (wrote_recently).
+    response = await call_next(request)
+    if request.method in WRITE_METHODS and response.status_code < 400:
+        farmer_id = farmer_id_from_request(request)
+        if farmer_id is not None:
+            mark_farmer_write(farmer_id)
+    return response
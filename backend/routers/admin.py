@@ -0,0 +1,32 @@
+from fastapi import APIRouter, Depends
+
+from auth import require_operator, principal_cache, password_pool
+from database import pool_telemetry
+
+# Operator-only: gated by ADMIN_TOKEN, not by farmer login
+router = APIRouter(
+    prefix="/admin",
+    tags=["Admin"],
+    dependencies=[Depends(require_operator)]
+)
+
+@router.get("/auth/cache")
+async def get_principal_cache_stats():
+    """
+    Hit/miss counters for the authenticated principal cache.
+    """
+    return principal_cache.stats()
+
+@router.get("/auth/password-pool")
+async def get_password_pool_stats():
+    """
+    Queue depth, rejections and latency of the bcrypt worker pool.
+    """
+    return password_pool.stats()
+
+@router.get("/db/pool")
+async def get_db_pool_stats():
+    """
+    Checked-out/overflow connections and checkout wait times for the primary pool.
+    """
+    return pool_telemetry()
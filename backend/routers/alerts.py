@@ -9,7 +9,7 @@ from database import get_db
 import models
 import schemas
 from models import Alert, Animal, HealthRecord, BreedingRecord, MilkProduction, WeightRecord
-from auth import get_current_user
+from auth import get_current_principal, Principal
 
 router = APIRouter(
     prefix="/alerts",
@@ -20,18 +20,21 @@ router = APIRouter(
 async def get_alerts(
     farmer_id: int, 
     db: AsyncSession = Depends(get_db),
-    current_user: models.Farmer = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_principal)
 ):
     if current_user.farmer_id != farmer_id:
         raise HTTPException(status_code=403, detail="Not authorized")
 
+    return await active_alerts(current_user.farmer_id, db)
+
+async def active_alerts(farmer_id: int, db: AsyncSession):
     # 1. First, dynamically generate alerts if needed
-    await generate_dynamic_alerts(current_user.farmer_id, db)
+    await generate_dynamic_alerts(farmer_id, db)
     
     # 2. Fetch active, non-dismissed alerts
     result = await db.execute(
         select(Alert)
-        .where(and_(Alert.farmer_id == current_user.farmer_id, Alert.is_dismissed == 0))
+        .where(and_(Alert.farmer_id == farmer_id, Alert.is_dismissed == 0))
         .order_by(desc(Alert.created_at))
     )
     return result.scalars().all()
@@ -40,7 +43,7 @@ async def get_alerts(
 async def dismiss_alert(
     alert_id: int, 
     db: AsyncSession = Depends(get_db),
-    current_user: models.Farmer = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_principal)
 ):
     result = await db.execute(select(Alert).where(Alert.id == alert_id))
     alert = result.scalars().first()
@@ -65,21 +68,7 @@ async def generate_dynamic_alerts(farmer_id: int, db: AsyncSession = Depends(get
             HealthRecord.date <= date.today() - timedelta(days=3)
         )
     )
-    sick_animals = await db.execute(sick_animals_query)
-    for animal, record in sick_animals.all():
-        # Check if alert already exists
-        eb_query = select(Alert).where(and_(Alert.related_animal_id == animal.animal_id, Alert.type == "CRITICAL", Alert.is_dismissed == 0))
-        exists = await db.execute(eb_query)
-        if not exists.scalars().first():
-            new_alert = Alert(
-                farmer_id=farmer_id,
-                type="CRITICAL",
-                title="Untreated Illness",
-                message=f"{animal.name or animal.tag_number} has been sick for over 3 days without a follow-up.",
-                severity="High",
-                related_animal_id=animal.animal_id
-            )
-            db.add(new_alert)
+    sick_animals = (await db.execute(sick_animals_query)).all()
 
     # Check for Breeding Due Soon
     due_soon_date = date.today() + timedelta(days=7)
@@ -91,11 +80,36 @@ async def generate_dynamic_alerts(farmer_id: int, db: AsyncSession = Depends(get
             BreedingRecord.expected_calving_date <= due_soon_date
         )
     )
-    due_soon_animals = await db.execute(due_soon_query)
-    for animal, br in due_soon_animals.all():
-        eb_query = select(Alert).where(and_(Alert.related_animal_id == animal.animal_id, Alert.title == "Calving Due Soon", Alert.is_dismissed == 0))
-        exists = await db.execute(eb_query)
-        if not exists.scalars().first():
+    due_soon_animals = (await db.execute(due_soon_query)).all()
+
+    # One lookup for the open alerts of every candidate animal, instead of one per animal
+    alerted = set()  # (animal_id, "CRITICAL" or "Calving Due Soon")
+    candidate_ids = {animal.animal_id for animal, _ in sick_animals + due_soon_animals}
+    if candidate_ids:
+        open_alerts = await db.execute(
+            select(Alert.related_animal_id, Alert.type, Alert.title)
+            .where(and_(Alert.related_animal_id.in_(candidate_ids), Alert.is_dismissed == 0))
+        )
+        for animal_id, alert_type, title in open_alerts.all():
+            alerted.add((animal_id, alert_type))
+            alerted.add((animal_id, title))
+
+    for animal, record in sick_animals:
+        if (animal.animal_id, "CRITICAL") not in alerted:
+            alerted.add((animal.animal_id, "CRITICAL"))
+            new_alert = Alert(
+                farmer_id=farmer_id,
+                type="CRITICAL",
+                title="Untreated Illness",
+                message=f"{animal.name or animal.tag_number} has been sick for over 3 days without a follow-up.",
+                severity="High",
+                related_animal_id=animal.animal_id
+            )
+            db.add(new_alert)
+
+    for animal, br in due_soon_animals:
+        if (animal.animal_id, "Calving Due Soon") not in alerted:
+            alerted.add((animal.animal_id, "Calving Due Soon"))
             new_alert = Alert(
                 farmer_id=farmer_id,
                 type="WARNING",
@@ -1,12 +1,24 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
+from sqlalchemy import (
+    Column, Date, Integer, MetaData, Numeric, String, Table, Text,
+    and_, all_, any_, bindparam, case, func, insert, literal, or_, text, update
+)
+from sqlalchemy.dialects.postgresql import ARRAY, insert as pg_insert
+from sqlalchemy.schema import CreateTable
 from typing import List, Optional
+from datetime import date
+from decimal import Decimal, InvalidOperation
+import csv
+import io
+import os
 
 from database import get_db
 import models
 import schemas
-from auth import get_current_user
+from auth import get_current_principal, Principal
+from change_versions import conditional_get, bump_versions, ANIMALS, FINANCE, PENS
 
 router = APIRouter(
     prefix="/animals",
@@ -15,17 +27,18 @@ router = APIRouter(
 
 # --- PENS ---
 @router.post("/pens", response_model=schemas.AnimalPen, status_code=status.HTTP_201_CREATED)
-async def create_pen(pen: schemas.AnimalPenCreate, current_user: models.Farmer = Depends(get_current_user), db: AsyncSession = Depends(get_db)):
+async def create_pen(pen: schemas.AnimalPenCreate, current_user: Principal = Depends(get_current_principal), db: AsyncSession = Depends(get_db)):
     if pen.farmer_id != current_user.farmer_id:
         raise HTTPException(status_code=403, detail="Cannot create pens for other farmers")
     new_pen = models.AnimalPen(**pen.dict())
     db.add(new_pen)
+    await bump_versions(db, current_user.farmer_id, PENS)
     await db.commit()
     await db.refresh(new_pen)
     return new_pen
 
-@router.get("/pens/farmer/{farmer_id}", response_model=List[schemas.AnimalPen])
-async def read_pens(farmer_id: int, current_user: models.Farmer = Depends(get_current_user), db: AsyncSession = Depends(get_db)):
+@router.get("/pens/farmer/{farmer_id}", response_model=List[schemas.AnimalPen], dependencies=[Depends(conditional_get(PENS))])
+async def read_pens(farmer_id: int, current_user: Principal = Depends(get_current_principal), db: AsyncSession = Depends(get_db)):
     if current_user.farmer_id != farmer_id:
         raise HTTPException(status_code=403, detail="Not authorized")
     result = await db.execute(select(models.AnimalPen).where(models.AnimalPen.farmer_id == farmer_id))
@@ -33,7 +46,7 @@ async def read_pens(farmer_id: int, current_user: models.Farmer = Depends(get_cu
 
 # --- ANIMALS ---
 @router.post("/", response_model=schemas.Animal, status_code=status.HTTP_201_CREATED)
-async def create_animal(animal: schemas.AnimalCreate, current_user: models.Farmer = Depends(get_current_user), db: AsyncSession = Depends(get_db)):
+async def create_animal(animal: schemas.AnimalCreate, current_user: Principal = Depends(get_current_principal), db: AsyncSession = Depends(get_db)):
     if animal.farmer_id != current_user.farmer_id:
         raise HTTPException(status_code=403, detail="Cannot create animals for other farmers")
     # Check if tag exists for this farmer
@@ -48,12 +61,262 @@ async def create_animal(animal: schemas.AnimalCreate, current_user: models.Farme
 
     new_animal = models.Animal(**animal.dict())
     db.add(new_animal)
+    await bump_versions(db, current_user.farmer_id, ANIMALS)
     await db.commit()
     await db.refresh(new_animal)
     return new_animal
 
+# --- BULK IMPORT ---
+ANIMAL_IMPORT_MAX_ROWS = int(os.getenv("ANIMAL_IMPORT_MAX_ROWS", "20000"))
+
+# Values allowed by the animal table's CHECK constraints
+ANIMAL_TYPES = ("Dairy", "Beef")
+GENDERS = ("Male", "Female")
+ACQUISITION_TYPES = ("Purchased", "Born-on-farm")
+
+ANIMAL_IMPORT_COLUMNS = {
+    "tag": "tag_number",
+    "tag_number": "tag_number",
+    "name": "name",
+    "type": "animal_type",
+    "animal_type": "animal_type",
+    "breed": "breed",
+    "sex": "gender",
+    "gender": "gender",
+    "dob": "birth_date",
+    "birth_date": "birth_date",
+    "acquisition_type": "acquisition_type",
+    "cost": "acquisition_cost",
+    "acquisition_cost": "acquisition_cost",
+    "pen": "pen_id",
+    "pen_id": "pen_id",
+    "notes": "notes",
+}
+
+# COPY target, created once per connection. Rows are cleared at commit (and
+# by rollback), so the table's OID and the cached statements using it stay valid.
+animal_import_staging = Table(
+    "animal_import_staging", MetaData(),
+    Column("row_number", Integer, primary_key=True),
+    Column("tag_number", Text),
+    Column("name", Text),
+    Column("animal_type", Text),
+    Column("breed", Text),
+    Column("gender", Text),
+    Column("birth_date", Date),
+    Column("acquisition_type", Text),
+    Column("acquisition_cost", Numeric(10, 2)),
+    Column("pen_id", Integer),
+    Column("notes", Text),
+    Column("problem", Text),
+    prefixes=["TEMPORARY"],
+    postgresql_on_commit="DELETE ROWS",
+)
+
+def _animal_import_record(row_number: int, raw: dict, default_pen_id: Optional[int]):
+    """
+    Staging tuple for one CSV row. Fields that don't parse are left empty
+    with a problem noted; everything else is validated set-wise in SQL.
+    """
+    values = {key: (raw.get(key) or "").strip() or None for key in set(ANIMAL_IMPORT_COLUMNS.values())}
+    problem = None
+
+    birth_date = None
+    if values["birth_date"]:
+        try:
+            birth_date = date.fromisoformat(values["birth_date"])
+        except ValueError:
+            problem = "Invalid birth_date, expected YYYY-MM-DD"
+
+    acquisition_cost = None
+    if values["acquisition_cost"]:
+        try:
+            acquisition_cost = Decimal(values["acquisition_cost"]).quantize(Decimal("0.01"))
+        except InvalidOperation:
+            acquisition_cost = None
+        if acquisition_cost is None or not acquisition_cost.is_finite() or not 0 <= acquisition_cost < 10 ** 8:
+            acquisition_cost = None
+            problem = problem or "Invalid acquisition_cost"
+
+    pen_id = default_pen_id
+    if values["pen_id"]:
+        try:
+            pen_id = int(values["pen_id"])
+        except ValueError:
+            pen_id = None
+            problem = problem or "Invalid pen_id"
+
+    return (
+        row_number, values["tag_number"], values["name"], values["animal_type"], values["breed"],
+        values["gender"], birth_date, values["acquisition_type"], acquisition_cost, pen_id,
+        values["notes"], problem,
+    )
+
+def _not_one_of(column, allowed):
+    return or_(column.is_(None), column.not_in(allowed))
+
+def _validate_staged_animals(farmer_id: int):
+    """
+    One UPDATE that records the first problem of every staged row still
+    considered valid: required fields, enum values, pen ownership, tags
+    repeated within the file and tags the farmer already uses.
+    """
+    staged = animal_import_staging.c
+    checked = (
+        select(
+            staged.row_number,
+            case(
+                (staged.tag_number.is_(None), "Missing tag number"),
+                (func.length(staged.tag_number) > 50, "Tag number is longer than 50 characters"),
+                (func.length(staged.name) > 100, "Name is longer than 100 characters"),
+                (staged.breed.is_(None), "Missing breed"),
+                (func.length(staged.breed) > 50, "Breed is longer than 50 characters"),
+                (_not_one_of(staged.animal_type, ANIMAL_TYPES), f"animal_type must be one of {', '.join(ANIMAL_TYPES)}"),
+                (_not_one_of(staged.gender, GENDERS), f"gender must be one of {', '.join(GENDERS)}"),
+                (_not_one_of(staged.acquisition_type, ACQUISITION_TYPES), f"acquisition_type must be one of {', '.join(ACQUISITION_TYPES)}"),
+                (staged.pen_id.is_(None), "Missing pen_id"),
+                (models.AnimalPen.pen_id.is_(None), "Pen not found or not authorized"),
+                (func.row_number().over(partition_by=staged.tag_number, order_by=staged.row_number) > 1, "Duplicate tag in import"),
+                (models.Animal.animal_id.is_not(None), "Tag number already exists for this farmer"),
+            ).label("problem")
+        )
+        .select_from(animal_import_staging)
+        .outerjoin(models.AnimalPen, and_(models.AnimalPen.pen_id == staged.pen_id, models.AnimalPen.farmer_id == farmer_id))
+        .outerjoin(models.Animal, and_(models.Animal.farmer_id == farmer_id, models.Animal.tag_number == staged.tag_number))
+        .where(staged.problem.is_(None))
+        .subquery()
+    )
+    return (
+        update(animal_import_staging)
+        .values(problem=checked.c.problem)
+        .where(staged.row_number == checked.c.row_number, checked.c.problem.is_not(None))
+    )
+
+@router.post("/import", response_model=schemas.AnimalImportResult)
+async def import_animals(
+    request: Request,
+    pen_id: Optional[int] = Query(None, description="pen for rows without a pen_id column"),
+    post_costs: bool = Query(False, description="post acquisition costs of purchased animals to the ledger"),
+    purchase_date: Optional[date] = Query(None, description="ledger date for posted costs (default today)"),
+    db: AsyncSession = Depends(get_db),
+    current_user: Principal = Depends(get_current_principal)
+):
+    """
+    Bulk onboarding from a CSV (columns tag_number, name, animal_type, breed,
+    gender, birth_date, acquisition_type, acquisition_cost, pen_id, notes).
+    Rows are COPYed into a staging table, validated in SQL and inserted in
+    one transaction; rejected rows are reported and the rest are imported.
+    """
+    try:
+        reader = csv.DictReader(io.StringIO((await request.body()).decode("utf-8-sig")))
+        raw_rows = [
+            {ANIMAL_IMPORT_COLUMNS.get(key.strip().lower(), key): value for key, value in row.items() if key}
+            for row in reader
+        ]
+    except (UnicodeDecodeError, csv.Error):
+        raise HTTPException(status_code=400, detail="Could not parse import body as CSV")
+    if not raw_rows:
+        raise HTTPException(status_code=400, detail="No rows to import")
+    if len(raw_rows) > ANIMAL_IMPORT_MAX_ROWS:
+        raise HTTPException(status_code=413, detail=f"At most {ANIMAL_IMPORT_MAX_ROWS} rows per import")
+
+    records = [_animal_import_record(row_number, raw, pen_id) for row_number, raw in enumerate(raw_rows, start=1)]
+    farmer_id = current_user.farmer_id
+    staged = animal_import_staging.c
+
+    # The first statement opens the transaction the COPY then joins
+    await db.execute(CreateTable(animal_import_staging, if_not_exists=True))
+    raw_connection = await (await db.connection()).get_raw_connection()
+    await raw_connection.driver_connection.copy_records_to_table(
+        animal_import_staging.name,
+        records=records,
+        columns=[column.name for column in animal_import_staging.columns]
+    )
+    # Fresh statistics so the validation joins are planned for the real row count
+    await db.execute(text(f"ANALYZE {animal_import_staging.name}"))
+    validated = await db.execute(_validate_staged_animals(farmer_id))
+    # Rows that passed both the Python parse and the SQL checks
+    expected = sum(1 for record in records if record[-1] is None) - validated.rowcount
+
+    animal_columns = [
+        "farmer_id", "pen_id", "tag_number", "name", "animal_type", "breed", "gender",
+        "birth_date", "acquisition_type", "acquisition_cost", "notes",
+    ]
+    inserted = await db.execute(
+        pg_insert(models.Animal)
+        .from_select(
+            animal_columns,
+            select(
+                literal(farmer_id), staged.pen_id, staged.tag_number, staged.name, staged.animal_type,
+                staged.breed, staged.gender, staged.birth_date, staged.acquisition_type,
+                func.coalesce(staged.acquisition_cost, 0), staged.notes
+            )
+            .where(staged.problem.is_(None))
+            .order_by(staged.row_number)
+        )
+        # A tag created concurrently since validation is reported, not a 500
+        .on_conflict_do_nothing(index_elements=["farmer_id", "tag_number"])
+        .returning(models.Animal.animal_id, models.Animal.tag_number)
+    )
+    inserted = inserted.all()
+    animal_ids = [row.animal_id for row in inserted]
+    if len(inserted) < expected:
+        await db.execute(
+            update(animal_import_staging)
+            .values(problem="Tag number already exists for this farmer")
+            .where(
+                staged.problem.is_(None),
+                staged.tag_number != all_(bindparam("inserted_tags", [row.tag_number for row in inserted], type_=ARRAY(String)))
+            )
+        )
+    rejected = await db.execute(
+        select(staged.row_number, staged.tag_number, staged.problem)
+        .where(staged.problem.is_not(None))
+        .order_by(staged.row_number)
+    )
+    rejected = [
+        schemas.AnimalImportRejection(row=row.row_number, tag_number=row.tag_number, detail=row.problem)
+        for row in rejected.all()
+    ]
+
+    ledger_entries = 0
+    if animal_ids and post_costs:
+        posted = await db.execute(
+            insert(models.FinancialTransaction)
+            .from_select(
+                [
+                    "farmer_id", "type", "category", "description", "amount", "date",
+                    "related_animal_id", "related_pen_id", "source_table", "source_id",
+                ],
+                select(
+                    models.Animal.farmer_id,
+                    literal("Expense"),
+                    literal("Animal Purchases"),
+                    "Purchase of " + func.coalesce(models.Animal.name, models.Animal.tag_number),
+                    models.Animal.acquisition_cost,
+                    literal(purchase_date or date.today()),
+                    models.Animal.animal_id,
+                    models.Animal.pen_id,
+                    literal("animal"),
+                    models.Animal.animal_id
+                ).where(
+                    models.Animal.animal_id == any_(bindparam("animal_ids", animal_ids, type_=ARRAY(Integer))),
+                    models.Animal.acquisition_type == "Purchased",
+                    models.Animal.acquisition_cost > 0
+                )
+            )
+            .returning(models.FinancialTransaction.transaction_id)
+        )
+        ledger_entries = len(posted.all())
+
+    if animal_ids:
+        await bump_versions(db, farmer_id, ANIMALS, *([FINANCE] if ledger_entries else []))
+        await db.commit()
+
+    return schemas.AnimalImportResult(imported=len(animal_ids), ledger_entries=ledger_entries, rejected=rejected)
+
 @router.post("/{animal_id}/dispose", response_model=schemas.Animal)
-async def dispose_animal(animal_id: int, disposal: schemas.AnimalDispose, current_user: models.Farmer = Depends(get_current_user), db: AsyncSession = Depends(get_db)):
+async def dispose_animal(animal_id: int, disposal: schemas.AnimalDispose, current_user: Principal = Depends(get_current_principal), db: AsyncSession = Depends(get_db)):
     result = await db.execute(select(models.Animal).where(models.Animal.animal_id == animal_id))
     animal = result.scalars().first()
     if not animal:
@@ -68,25 +331,26 @@ async def dispose_animal(animal_id: int, disposal: schemas.AnimalDispose, curren
     if disposal.notes:
         animal.notes = (animal.notes or "") + f"\nDisposal Notes: {disposal.notes}"
     
+    await bump_versions(db, current_user.farmer_id, ANIMALS)
     await db.commit()
     await db.refresh(animal)
     return animal
 
-@router.get("/farmer/{farmer_id}", response_model=List[schemas.Animal])
-async def read_animals_by_farmer(farmer_id: int, current_user: models.Farmer = Depends(get_current_user), db: AsyncSession = Depends(get_db)):
+@router.get("/farmer/{farmer_id}", response_model=List[schemas.Animal], dependencies=[Depends(conditional_get(ANIMALS))])
+async def read_animals_by_farmer(farmer_id: int, current_user: Principal = Depends(get_current_principal), db: AsyncSession = Depends(get_db)):
     if current_user.farmer_id != farmer_id:
         raise HTTPException(status_code=403, detail="Not authorized")
     result = await db.execute(select(models.Animal).where(models.Animal.farmer_id == farmer_id))
     return result.scalars().all()
 
-@router.get("/", response_model=List[schemas.Animal])
-async def read_animals(current_user: models.Farmer = Depends(get_current_user), db: AsyncSession = Depends(get_db)):
+@router.get("/", response_model=List[schemas.Animal], dependencies=[Depends(conditional_get(ANIMALS))])
+async def read_animals(current_user: Principal = Depends(get_current_principal), db: AsyncSession = Depends(get_db)):
     # Always scope to current user
     result = await db.execute(select(models.Animal).where(models.Animal.farmer_id == current_user.farmer_id))
     return result.scalars().all()
 
 @router.put("/{animal_id}", response_model=schemas.Animal)
-async def update_animal(animal_id: int, animal_update: schemas.AnimalUpdate, current_user: models.Farmer = Depends(get_current_user), db: AsyncSession = Depends(get_db)):
+async def update_animal(animal_id: int, animal_update: schemas.AnimalUpdate, current_user: Principal = Depends(get_current_principal), db: AsyncSession = Depends(get_db)):
     result = await db.execute(select(models.Animal).where(models.Animal.animal_id == animal_id))
     db_animal = result.scalars().first()
     if db_animal is None:
@@ -95,15 +359,19 @@ async def update_animal(animal_id: int, animal_update: schemas.AnimalUpdate, cur
         raise HTTPException(status_code=403, detail="Not authorized")
     
     update_data = animal_update.dict(exclude_unset=True)
+    # Only the owner's change versions are bumped, so ownership can't change here
+    if update_data.pop("farmer_id", db_animal.farmer_id) != db_animal.farmer_id:
+        raise HTTPException(status_code=400, detail="An animal cannot be transferred to another farmer")
     for key, value in update_data.items():
         setattr(db_animal, key, value)
     
+    await bump_versions(db, current_user.farmer_id, ANIMALS)
     await db.commit()
     await db.refresh(db_animal)
     return db_animal
 
-@router.get("/{animal_id}", response_model=schemas.Animal)
-async def read_animal(animal_id: int, current_user: models.Farmer = Depends(get_current_user), db: AsyncSession = Depends(get_db)):
+@router.get("/{animal_id}", response_model=schemas.Animal, dependencies=[Depends(conditional_get(ANIMALS))])
+async def read_animal(animal_id: int, current_user: Principal = Depends(get_current_principal), db: AsyncSession = Depends(get_db)):
     result = await db.execute(select(models.Animal).where(models.Animal.animal_id == animal_id))
     animal = result.scalars().first()
     if animal is None:
@@ -0,0 +1,131 @@
+from dataclasses import dataclass
+from typing import Awaitable, Callable, List, Type
+
+from fastapi import APIRouter, Depends
+from pydantic import BaseModel, ValidationError
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from database import get_db
+import schemas
+from auth import get_current_principal, Principal
+from change_versions import bump_versions, FEED, FINANCE, HEALTH, LABOR, MILK, WEIGHT
+from ownership import unowned_animal_ids, unowned_pen_ids
+from routers.feed import add_individual_feed_log, add_pen_feed_log
+from routers.health import add_health_record
+from routers.labor import add_labor_activity
+from routers.production import add_milk_production, add_weight_record
+
+router = APIRouter(
+    prefix="/batch",
+    tags=["Batch"]
+)
+
+
+@dataclass(frozen=True)
+class BatchOperationType:
+    schema: Type[BaseModel]
+    add: Callable[..., Awaitable]
+    dataset: str
+
+
+# Operation type -> the single-create endpoint's payload schema and non-committing helper
+BATCH_OPERATION_TYPES = {
+    "milk": BatchOperationType(schemas.MilkProductionCreate, add_milk_production, MILK),
+    "weight": BatchOperationType(schemas.WeightRecordCreate, add_weight_record, WEIGHT),
+    "pen_feed": BatchOperationType(schemas.FeedLogCreate, add_pen_feed_log, FEED),
+    "individual_feed": BatchOperationType(schemas.IndividualFeedLogCreate, add_individual_feed_log, FEED),
+    "labor": BatchOperationType(schemas.LaborActivityCreate, add_labor_activity, LABOR),
+    "health": BatchOperationType(schemas.HealthRecordCreate, add_health_record, HEALTH),
+}
+
+
+def _validation_detail(exc: ValidationError) -> str:
+    return "; ".join(f"{'.'.join(str(part) for part in error['loc'])}: {error['msg']}" for error in exc.errors())
+
+
+# Stable client-facing reasons by SQLSTATE; the raw error only goes to the log
+DATABASE_REJECTIONS = {
+    "23502": "A required field is missing",
+    "23503": "Refers to a record that does not exist",
+    "23505": "Conflicts with an existing record",
+    "23514": "A value is outside the allowed range",
+    "22003": "A value is too large",
+}
+DATABASE_REJECTION_DEFAULT = "Rejected by the database"
+
+
+def _database_detail(exc: DBAPIError) -> str:
+    return DATABASE_REJECTIONS.get(getattr(exc.orig, "sqlstate", None), DATABASE_REJECTION_DEFAULT)
+
+
+@router.post("/", response_model=List[schemas.BatchOperationResult])
+async def run_batch(
+    batch: schemas.BatchRequest,
+    db: AsyncSession = Depends(get_db),
+    current_user: Principal = Depends(get_current_principal)
+):
+    """
+    Replays entries queued while offline in one round trip and one
+    transaction. Each operation runs in its own savepoint, so a bad entry is
+    rejected on its own; results come back in order, keyed by client_id.
+    """
+    farmer_id = current_user.farmer_id
+    results = [None] * len(batch.operations)
+    pending = []  # (position, operation type, payload)
+    seen_client_ids = set()
+
+    for i, operation in enumerate(batch.operations):
+        operation_type = BATCH_OPERATION_TYPES.get(operation.type)
+        detail = None
+        if operation.client_id in seen_client_ids:
+            detail = "Duplicate client_id in batch"
+        elif operation_type is None:
+            detail = f"Unknown operation type '{operation.type}'"
+        else:
+            try:
+                payload = operation_type.schema.model_validate(operation.data)
+            except ValidationError as exc:
+                detail = _validation_detail(exc)
+        seen_client_ids.add(operation.client_id)
+        if detail:
+            results[i] = schemas.BatchOperationResult(client_id=operation.client_id, status="rejected", detail=detail)
+        else:
+            pending.append((i, operation_type, payload))
+
+    # One ownership lookup per kind of reference for the whole batch
+    unowned_animals = await unowned_animal_ids(
+        db, farmer_id, {payload.animal_id for _, _, payload in pending if hasattr(payload, "animal_id")}
+    )
+    unowned_pens = await unowned_pen_ids(
+        db, farmer_id, {payload.pen_id for _, _, payload in pending if hasattr(payload, "pen_id")}
+    )
+
+    datasets = set()
+    for i, operation_type, payload in pending:
+        client_id = batch.operations[i].client_id
+        if (
+            getattr(payload, "animal_id", None) in unowned_animals
+            or getattr(payload, "pen_id", None) in unowned_pens
+            or getattr(payload, "farmer_id", farmer_id) != farmer_id
+        ):
+            results[i] = schemas.BatchOperationResult(client_id=client_id, status="rejected", detail="Not authorized")
+            continue
+        try:
+            async with db.begin_nested():
+                created = await operation_type.add(db, farmer_id, payload)
+        except DBAPIError as exc:
+            print(f"Batch operation {client_id} of farmer {farmer_id} rejected by the database: {exc.orig}")
+            results[i] = schemas.BatchOperationResult(client_id=client_id, status="rejected", detail=_database_detail(exc))
+            continue
+        datasets.add(operation_type.dataset)
+        if operation_type.dataset == HEALTH and created.cost and created.cost > 0:
+            datasets.add(FINANCE)
+        primary_key = type(created).__mapper__.primary_key[0].key
+        results[i] = schemas.BatchOperationResult(client_id=client_id, status="created", id=getattr(created, primary_key))
+
+    if datasets:
+        await bump_versions(db, farmer_id, *datasets)
+        await db.commit()
+
+    return results
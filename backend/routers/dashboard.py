@@ -0,0 +1,119 @@
+import asyncio
+import os
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+from database import SessionLocal, get_read_session
+import models
+import schemas
+from auth import get_current_principal, Principal
+from routers.alerts import active_alerts
+from routers.health import health_status_counts
+from routers.production import breeding_counts, pregnancies, pregnancy_entry, is_due_soon
+from routers.reports import financial_summary, mortality_summary
+
+router = APIRouter(
+    prefix="/dashboard",
+    tags=["Dashboard"]
+)
+
+DASHBOARD_SECTIONS = (
+    "breeding_summary", "health_summary", "mortality", "financial_summary",
+    "pens", "animals", "due_soon", "pregnant", "alerts",
+)
+# Pooled connections one dashboard request may hold at once
+DASHBOARD_MAX_CONNECTIONS = int(os.getenv("DASHBOARD_MAX_CONNECTIONS", "4"))
+
+
+async def _breeding_summary(db: AsyncSession, farmer_id: int, wanted: set) -> dict:
+    return {"breeding_summary": await breeding_counts(db, farmer_id)}
+
+async def _pregnancy_lists(db: AsyncSession, farmer_id: int, wanted: set) -> dict:
+    # Due-soon animals are a subset of the pregnant ones: one query serves both
+    rows = await pregnancies(db, farmer_id)
+    sections = {}
+    if "pregnant" in wanted:
+        sections["pregnant"] = [pregnancy_entry(a, br) for a, br in rows]
+    if "due_soon" in wanted:
+        sections["due_soon"] = [pregnancy_entry(a, br) for a, br in rows if is_due_soon(br)]
+    return sections
+
+async def _health_summary(db: AsyncSession, farmer_id: int, wanted: set) -> dict:
+    return {"health_summary": await health_status_counts(db, farmer_id)}
+
+async def _mortality(db: AsyncSession, farmer_id: int, wanted: set) -> dict:
+    return {"mortality": await mortality_summary(db, farmer_id)}
+
+async def _financial_summary(db: AsyncSession, farmer_id: int, wanted: set) -> dict:
+    return {"financial_summary": await financial_summary(db, farmer_id)}
+
+async def _pens(db: AsyncSession, farmer_id: int, wanted: set) -> dict:
+    result = await db.execute(select(models.AnimalPen).where(models.AnimalPen.farmer_id == farmer_id))
+    return {"pens": [schemas.AnimalPen.model_validate(pen) for pen in result.scalars().all()]}
+
+async def _animals(db: AsyncSession, farmer_id: int, wanted: set) -> dict:
+    result = await db.execute(select(models.Animal).where(models.Animal.farmer_id == farmer_id))
+    return {"animals": [schemas.Animal.model_validate(animal) for animal in result.scalars().all()]}
+
+async def _alerts(db: AsyncSession, farmer_id: int, wanted: set) -> dict:
+    return {"alerts": await active_alerts(farmer_id, db)}
+
+# (sections served, loader, needs the primary). Each part runs concurrently
+# on its own pooled session; alerts writes newly generated alerts.
+DASHBOARD_PARTS = (
+    ({"breeding_summary"}, _breeding_summary, False),
+    ({"pregnant", "due_soon"}, _pregnancy_lists, False),
+    ({"health_summary"}, _health_summary, False),
+    ({"mortality"}, _mortality, False),
+    ({"financial_summary"}, _financial_summary, False),
+    ({"pens"}, _pens, False),
+    ({"animals"}, _animals, False),
+    ({"alerts"}, _alerts, True),
+)
+
+
+async def _run_part(loader, farmer_id: int, wanted: set, on_primary: bool, slots: asyncio.Semaphore) -> dict:
+    async with slots:
+        session = SessionLocal() if on_primary else await get_read_session(farmer_id)
+        async with session:
+            return await loader(session, farmer_id, wanted)
+
+
+@router.get("")
+async def get_dashboard(
+    farmer_id: int,
+    sections: Optional[str] = None,
+    current_user: Principal = Depends(get_current_principal)
+):
+    """
+    Everything the home screen loads, in one call: the same payloads as
+    breeding-summary, health status-summary, mortality, financial-summary,
+    pens, animals, due-soon, pregnant and alerts, keyed by section.
+    ?sections=pens,alerts limits the response to those sections.
+    """
+    if current_user.farmer_id != farmer_id:
+        raise HTTPException(status_code=403, detail="Not authorized")
+
+    wanted = set(DASHBOARD_SECTIONS)
+    if sections:
+        wanted = {section.strip() for section in sections.split(",") if section.strip()}
+        unknown = wanted.difference(DASHBOARD_SECTIONS)
+        if unknown:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Unknown sections: {', '.join(sorted(unknown))}. Valid sections: {', '.join(DASHBOARD_SECTIONS)}"
+            )
+
+    slots = asyncio.Semaphore(DASHBOARD_MAX_CONNECTIONS)
+    results = await asyncio.gather(*(
+        _run_part(loader, farmer_id, wanted & served, on_primary, slots)
+        for served, loader, on_primary in DASHBOARD_PARTS
+        if wanted & served
+    ))
+    payload = {}
+    for result in results:
+        payload.update(result)
+    return {section: payload[section] for section in DASHBOARD_SECTIONS if section in payload}
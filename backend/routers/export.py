@@ -0,0 +1,111 @@
+import csv
+import io
+import json
+import os
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from sqlalchemy.future import select
+
+from database import get_read_session
+import models
+from auth import get_current_principal, Principal
+
+router = APIRouter(
+    prefix="/export",
+    tags=["Export"]
+)
+
+# Rows fetched per round trip from the server-side cursor
+EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", "2000"))
+
+# dataset -> (model, date column, how rows are scoped to a farmer)
+EXPORT_DATASETS = {
+    "milk": (models.MilkProduction, models.MilkProduction.date, "animal"),
+    "weight": (models.WeightRecord, models.WeightRecord.date, "animal"),
+    "feed": (models.FeedLog, models.FeedLog.date, "pen"),
+    "individual_feed": (models.IndividualFeedLog, models.IndividualFeedLog.date, "animal"),
+    "health": (models.HealthRecord, models.HealthRecord.date, "animal"),
+    "labor": (models.LaborActivity, models.LaborActivity.date, "farmer"),
+    "transactions": (models.FinancialTransaction, models.FinancialTransaction.date, "farmer"),
+}
+
+MEDIA_TYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+
+
+def _export_query(dataset: str, farmer_id: int, date_from: Optional[date], date_to: Optional[date]):
+    model, date_column, scope = EXPORT_DATASETS[dataset]
+    columns = list(model.__table__.columns)
+    query = select(*columns)
+    if scope == "animal":
+        query = query.join(models.Animal, model.animal_id == models.Animal.animal_id).where(models.Animal.farmer_id == farmer_id)
+    elif scope == "pen":
+        query = query.join(models.AnimalPen, model.pen_id == models.AnimalPen.pen_id).where(models.AnimalPen.farmer_id == farmer_id)
+    else:
+        query = query.where(model.farmer_id == farmer_id)
+    if date_from:
+        query = query.where(date_column >= date_from)
+    if date_to:
+        query = query.where(date_column <= date_to)
+    primary_key = model.__mapper__.primary_key[0]
+    return query.order_by(date_column, primary_key), [c.name for c in columns]
+
+
+def _json_default(value):
+    if isinstance(value, Decimal):
+        return str(value)
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    raise TypeError(f"Cannot serialize {type(value).__name__}")
+
+
+async def _stream_rows(farmer_id: int, query, column_names, fmt: str):
+    # The session lives inside the generator: it must outlast the endpoint
+    # and only close once the last chunk has been sent
+    session = await get_read_session(farmer_id)
+    async with session:
+        result = await session.stream(query.execution_options(yield_per=EXPORT_BATCH_SIZE))
+        if fmt == "csv":
+            buffer = io.StringIO()
+            writer = csv.writer(buffer)
+            writer.writerow(column_names)
+            async for rows in result.partitions():
+                writer.writerows(rows)
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+            if buffer.tell():
+                yield buffer.getvalue()
+        else:
+            async for rows in result.partitions():
+                yield "".join(
+                    json.dumps(dict(zip(column_names, row)), default=_json_default) + "\n"
+                    for row in rows
+                )
+
+
+@router.get("/{dataset}")
+async def export_dataset(
+    dataset: str,
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$"),
+    date_from: Optional[date] = Query(None, alias="from"),
+    date_to: Optional[date] = Query(None, alias="to"),
+    current_user: Principal = Depends(get_current_principal)
+):
+    """
+    Streams the caller's full history for one dataset, oldest first, as
+    NDJSON or CSV. Memory use is bounded by EXPORT_BATCH_SIZE, not history length.
+    """
+    if dataset not in EXPORT_DATASETS:
+        raise HTTPException(status_code=404, detail=f"Unknown dataset. Choose from: {', '.join(EXPORT_DATASETS)}")
+
+    query, column_names = _export_query(dataset, current_user.farmer_id, date_from, date_to)
+    filename = f"{dataset}-{date.today().isoformat()}.{format}"
+    return StreamingResponse(
+        _stream_rows(current_user.farmer_id, query, column_names, format),
+        media_type=MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
@@ -7,7 +7,10 @@ from fastapi.security import OAuth2PasswordRequestForm
 from database import get_db
 import models
 import schemas
-from auth import get_password_hash, verify_password, create_access_token, get_current_user
+from auth import (
+    get_password_hash_async, verify_password_async, create_access_token, get_current_user,
+    get_current_principal, get_token_version, revoke_tokens, Principal
+)
 
 router = APIRouter(
     prefix="/farmers",
@@ -22,7 +25,7 @@ async def create_farmer(farmer: schemas.FarmerCreate, db: AsyncSession = Depends
         raise HTTPException(status_code=400, detail="Username already registered")
     
     # Securely hash the password
-    hashed_password = get_password_hash(farmer.password)
+    hashed_password = await get_password_hash_async(farmer.password)
     new_farmer = models.Farmer(
         username=farmer.username,
         password_hash=hashed_password,
@@ -41,21 +44,28 @@ async def create_farmer(farmer: schemas.FarmerCreate, db: AsyncSession = Depends
 async def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(), db: AsyncSession = Depends(get_db)):
     result = await db.execute(select(models.Farmer).where(models.Farmer.username == form_data.username))
     user = result.scalars().first()
-    if not user or not verify_password(form_data.password, user.password_hash):
+    if not user or not await verify_password_async(form_data.password, user.password_hash):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect username or password",
             headers={"WWW-Authenticate": "Bearer"},
         )
-    access_token = create_access_token(data={"sub": user.username})
+    token_version = await get_token_version(db, user.farmer_id)
+    access_token = create_access_token(data={"sub": user.username, "fid": user.farmer_id, "ver": token_version})
     return {"access_token": access_token, "token_type": "bearer", "farmer_id": user.farmer_id}
 
 @router.get("/me", response_model=schemas.Farmer)
 async def read_farmer_me(current_user: models.Farmer = Depends(get_current_user)):
     return current_user
 
+@router.post("/me/revoke-tokens")
+async def revoke_farmer_tokens(current_user: Principal = Depends(get_current_principal), db: AsyncSession = Depends(get_db)):
+    # Signs the farmer out everywhere; clients must log in again
+    token_version = await revoke_tokens(db, current_user.farmer_id)
+    return {"status": "revoked", "token_version": token_version}
+
 @router.get("/{farmer_id}", response_model=schemas.Farmer)
-async def read_farmer(farmer_id: int, current_user: models.Farmer = Depends(get_current_user), db: AsyncSession = Depends(get_db)):
+async def read_farmer(farmer_id: int, current_user: Principal = Depends(get_current_principal), db: AsyncSession = Depends(get_db)):
     if current_user.farmer_id != farmer_id:
          raise HTTPException(status_code=403, detail="Not authorized to view other farmer records")
     result = await db.execute(select(models.Farmer).where(models.Farmer.farmer_id == farmer_id))
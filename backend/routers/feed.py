@@ -1,4 +1,4 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Response, status
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 from typing import List
@@ -6,27 +6,43 @@ from typing import List
 from database import get_db
 import models
 import schemas
-from auth import get_current_user
+from auth import get_current_principal, Principal
+from change_versions import conditional_get, bump_versions, FEED
+from pagination import PageParams, page_params, fetch_page
+from fast_json import ListSerializer
+from ownership import require_animal, require_pen
 
 router = APIRouter(
     prefix="/feed",
     tags=["Feed"]
 )
 
+feed_serializer = ListSerializer(schemas.FeedLog, models.FeedLog)
+individual_feed_serializer = ListSerializer(schemas.IndividualFeedLog, models.IndividualFeedLog)
+
+async def add_pen_feed_log(db: AsyncSession, farmer_id: int, log: schemas.FeedLogCreate) -> models.FeedLog:
+    new_log = models.FeedLog(**log.dict())
+    db.add(new_log)
+    await db.flush()
+    return new_log
+
+async def add_individual_feed_log(db: AsyncSession, farmer_id: int, log: schemas.IndividualFeedLogCreate) -> models.IndividualFeedLog:
+    new_log = models.IndividualFeedLog(**log.dict())
+    db.add(new_log)
+    await db.flush()
+    return new_log
+
 @router.post("/pen", response_model=schemas.FeedLog, status_code=status.HTTP_201_CREATED)
 async def create_pen_feed_log(
     log: schemas.FeedLogCreate, 
     db: AsyncSession = Depends(get_db),
-    current_user: models.Farmer = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_principal)
 ):
     # Verify pen ownership
-    pen_res = await db.execute(select(models.AnimalPen).where(models.AnimalPen.pen_id == log.pen_id))
-    pen = pen_res.scalars().first()
-    if not pen or pen.farmer_id != current_user.farmer_id:
-        raise HTTPException(status_code=403, detail="Not authorized to log feed for this pen")
+    await require_pen(db, current_user.farmer_id, log.pen_id, detail="Not authorized to log feed for this pen")
 
-    new_log = models.FeedLog(**log.dict())
-    db.add(new_log)
+    new_log = await add_pen_feed_log(db, current_user.farmer_id, log)
+    await bump_versions(db, current_user.farmer_id, FEED)
     await db.commit()
     await db.refresh(new_log)
     return new_log
@@ -35,65 +51,63 @@ async def create_pen_feed_log(
 async def create_individual_feed_log(
     log: schemas.IndividualFeedLogCreate, 
     db: AsyncSession = Depends(get_db),
-    current_user: models.Farmer = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_principal)
 ):
     # Verify animal ownership
-    anim_res = await db.execute(select(models.Animal).where(models.Animal.animal_id == log.animal_id))
-    animal = anim_res.scalars().first()
-    if not animal or animal.farmer_id != current_user.farmer_id:
-        raise HTTPException(status_code=403, detail="Not authorized to log feed for this animal")
+    await require_animal(db, current_user.farmer_id, log.animal_id, detail="Not authorized to log feed for this animal")
 
-    new_log = models.IndividualFeedLog(**log.dict())
-    db.add(new_log)
+    new_log = await add_individual_feed_log(db, current_user.farmer_id, log)
+    await bump_versions(db, current_user.farmer_id, FEED)
     await db.commit()
     await db.refresh(new_log)
     return new_log
 
-@router.get("/farmer/{farmer_id}/pen", response_model=List[schemas.FeedLog])
+@router.get("/farmer/{farmer_id}/pen", response_model=List[schemas.FeedLog], dependencies=[Depends(conditional_get(FEED))])
 async def read_farmer_pen_feed_logs(
     farmer_id: int, 
+    response: Response,
     db: AsyncSession = Depends(get_db),
-    current_user: models.Farmer = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_principal),
+    page: PageParams = Depends(page_params)
 ):
     if current_user.farmer_id != farmer_id:
         raise HTTPException(status_code=403, detail="Not authorized")
 
-    result = await db.execute(
-        select(models.FeedLog)
+    query = (
+        feed_serializer.select()
         .join(models.AnimalPen)
         .where(models.AnimalPen.farmer_id == current_user.farmer_id)
-        .order_by(models.FeedLog.date.desc())
     )
-    return result.scalars().all()
+    rows = await fetch_page(db, query, models.FeedLog.date, models.FeedLog.log_id, page, response)
+    return feed_serializer.response(rows, response)
 
-@router.get("/farmer/{farmer_id}/individual", response_model=List[schemas.IndividualFeedLog])
+@router.get("/farmer/{farmer_id}/individual", response_model=List[schemas.IndividualFeedLog], dependencies=[Depends(conditional_get(FEED))])
 async def read_farmer_individual_feed_logs(
     farmer_id: int, 
+    response: Response,
     db: AsyncSession = Depends(get_db),
-    current_user: models.Farmer = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_principal),
+    page: PageParams = Depends(page_params)
 ):
     if current_user.farmer_id != farmer_id:
         raise HTTPException(status_code=403, detail="Not authorized")
 
-    result = await db.execute(
-        select(models.IndividualFeedLog)
+    query = (
+        individual_feed_serializer.select()
         .join(models.Animal)
         .where(models.Animal.farmer_id == current_user.farmer_id)
-        .order_by(models.IndividualFeedLog.date.desc())
     )
-    return result.scalars().all()
+    rows = await fetch_page(db, query, models.IndividualFeedLog.date, models.IndividualFeedLog.individual_feed_id, page, response)
+    return individual_feed_serializer.response(rows, response)
 
-@router.get("/individual/animal/{animal_id}", response_model=List[schemas.IndividualFeedLog])
+@router.get("/individual/animal/{animal_id}", response_model=List[schemas.IndividualFeedLog], dependencies=[Depends(conditional_get(FEED))])
 async def read_animal_individual_feed_logs(
     animal_id: int, 
     db: AsyncSession = Depends(get_db),
-    current_user: models.Farmer = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_principal)
 ):
     # Verify animal ownership
-    anim_res = await db.execute(select(models.Animal).where(models.Animal.animal_id == animal_id))
-    animal = anim_res.scalars().first()
-    if not animal or animal.farmer_id != current_user.farmer_id:
-        raise HTTPException(status_code=403, detail="Not authorized")
+    await require_animal(db, current_user.farmer_id, animal_id)
 
     result = await db.execute(
         select(models.IndividualFeedLog)
@@ -1,45 +1,54 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Response, status
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 from typing import List
 
 from database import get_db
+from read_routing import get_read_db
 import models
 import schemas
-from auth import get_current_user
+from auth import get_current_principal, Principal
+from change_versions import conditional_get, bump_versions, FINANCE
+from pagination import PageParams, page_params, fetch_page
+from fast_json import ListSerializer
 
 router = APIRouter(
     prefix="/finance",
     tags=["Finance"]
 )
 
+transaction_serializer = ListSerializer(schemas.FinancialTransaction, models.FinancialTransaction)
+
 @router.post("/", response_model=schemas.FinancialTransaction, status_code=status.HTTP_201_CREATED)
 async def create_transaction(
     transaction: schemas.FinancialTransactionCreate, 
     db: AsyncSession = Depends(get_db),
-    current_user: models.Farmer = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_principal)
 ):
     if transaction.farmer_id != current_user.farmer_id:
         raise HTTPException(status_code=403, detail="Not authorized to create transactions for other farmers")
         
     new_transaction = models.FinancialTransaction(**transaction.dict())
     db.add(new_transaction)
+    await bump_versions(db, current_user.farmer_id, FINANCE)
     await db.commit()
     await db.refresh(new_transaction)
     return new_transaction
 
-@router.get("/farmer/{farmer_id}", response_model=List[schemas.FinancialTransaction])
+@router.get("/farmer/{farmer_id}", response_model=List[schemas.FinancialTransaction], dependencies=[Depends(conditional_get(FINANCE, db_dependency=get_read_db))])
 async def read_transactions(
     farmer_id: int, 
-    db: AsyncSession = Depends(get_db),
-    current_user: models.Farmer = Depends(get_current_user)
+    response: Response,
+    db: AsyncSession = Depends(get_read_db),
+    current_user: Principal = Depends(get_current_principal),
+    page: PageParams = Depends(page_params)
 ):
     if current_user.farmer_id != farmer_id:
         raise HTTPException(status_code=403, detail="Not authorized")
         
-    result = await db.execute(
-        select(models.FinancialTransaction)
+    query = (
+        transaction_serializer.select()
         .where(models.FinancialTransaction.farmer_id == current_user.farmer_id)
-        .order_by(models.FinancialTransaction.date.desc())
     )
-    return result.scalars().all()
+    rows = await fetch_page(db, query, models.FinancialTransaction.date, models.FinancialTransaction.transaction_id, page, response)
+    return transaction_serializer.response(rows, response)
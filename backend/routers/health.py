@@ -1,126 +1,143 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Response, status
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, and_, or_, func, desc
 from typing import List
 from datetime import date, timedelta
 
 from database import get_db
+from read_routing import get_read_db
 import models
 import schemas
 from models import HealthRecord, Animal
 from schemas import HealthRecordCreate
 from ledger_sync import sync_operation_to_ledger
-from auth import get_current_user
+from auth import get_current_principal, Principal
+from change_versions import conditional_get, bump_versions, ANIMALS, FINANCE, HEALTH
+from pagination import PageParams, page_params, fetch_page
+from fast_json import ListSerializer
+from ownership import require_animal
 
 router = APIRouter(
     prefix="/health",
     tags=["Health"]
 )
 
+health_serializer = ListSerializer(schemas.HealthRecord, models.HealthRecord)
+
+async def add_health_record(db: AsyncSession, farmer_id: int, record: schemas.HealthRecordCreate) -> models.HealthRecord:
+    """
+    Adds the record and its ledger entry (when costed) without committing.
+    """
+    new_record = models.HealthRecord(**record.dict())
+    db.add(new_record)
+    await db.flush()
+    
+    # Only costed treatments reach the ledger, so only they need the animal's label
+    if new_record.cost and new_record.cost > 0:
+        label_res = await db.execute(select(Animal.name, Animal.tag_number).where(Animal.animal_id == record.animal_id))
+        name, tag_number = label_res.one()
+        await sync_operation_to_ledger(
+            db=db,
+            farmer_id=farmer_id,
+            amount=new_record.cost,
+            category="Veterinary",
+            description=f"Health treatment for {name or tag_number}: {new_record.condition}",
+            source_table="health_record",
+            source_id=new_record.record_id,
+            transaction_date=new_record.date,
+            related_animal_id=new_record.animal_id
+        )
+    return new_record
+
 @router.post("/", response_model=schemas.HealthRecord, status_code=status.HTTP_201_CREATED)
 async def create_health_record(
     record: schemas.HealthRecordCreate, 
     db: AsyncSession = Depends(get_db),
-    current_user: models.Farmer = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_principal)
 ):
-    # Fetch farmer_id from animal to verify ownership
-    result = await db.execute(select(models.Animal).where(models.Animal.animal_id == record.animal_id))
-    animal = result.scalars().first()
-    
-    if not animal or animal.farmer_id != current_user.farmer_id:
-        raise HTTPException(status_code=403, detail="Not authorized to create health records for this animal")
+    await require_animal(db, current_user.farmer_id, record.animal_id, detail="Not authorized to create health records for this animal")
 
-    new_record = models.HealthRecord(**record.dict())
-    db.add(new_record)
-    await db.flush()
-    
-    await sync_operation_to_ledger(
-        db=db,
-        farmer_id=current_user.farmer_id,
-        amount=new_record.cost,
-        category="Veterinary",
-        description=f"Health treatment for {animal.name or animal.tag_number}: {new_record.condition}",
-        source_table="health_record",
-        source_id=new_record.record_id,
-        transaction_date=new_record.date,
-        related_animal_id=new_record.animal_id
-    )
-    
+    new_record = await add_health_record(db, current_user.farmer_id, record)
+    if new_record.cost and new_record.cost > 0:
+        await bump_versions(db, current_user.farmer_id, FINANCE)
+    await bump_versions(db, current_user.farmer_id, HEALTH)
     await db.commit()
     await db.refresh(new_record)
     return new_record
 
-@router.get("/animal/{animal_id}", response_model=List[schemas.HealthRecord])
+@router.get("/animal/{animal_id}", response_model=List[schemas.HealthRecord], dependencies=[Depends(conditional_get(HEALTH, db_dependency=get_read_db))])
 async def read_health_records(
     animal_id: int, 
-    db: AsyncSession = Depends(get_db),
-    current_user: models.Farmer = Depends(get_current_user)
+    db: AsyncSession = Depends(get_read_db),
+    current_user: Principal = Depends(get_current_principal)
 ):
     # Verify animal ownership
-    anim_res = await db.execute(select(models.Animal).where(models.Animal.animal_id == animal_id))
-    animal = anim_res.scalars().first()
-    if not animal or animal.farmer_id != current_user.farmer_id:
-        raise HTTPException(status_code=403, detail="Not authorized")
+    await require_animal(db, current_user.farmer_id, animal_id)
 
     result = await db.execute(select(models.HealthRecord).where(models.HealthRecord.animal_id == animal_id))
     return result.scalars().all()
 
-@router.get("/farmer/{farmer_id}", response_model=List[schemas.HealthRecord])
+@router.get("/farmer/{farmer_id}", response_model=List[schemas.HealthRecord], dependencies=[Depends(conditional_get(HEALTH, db_dependency=get_read_db))])
 async def read_farmer_health_records(
     farmer_id: int, 
-    db: AsyncSession = Depends(get_db),
-    current_user: models.Farmer = Depends(get_current_user)
+    response: Response,
+    db: AsyncSession = Depends(get_read_db),
+    current_user: Principal = Depends(get_current_principal),
+    page: PageParams = Depends(page_params)
 ):
     if current_user.farmer_id != farmer_id:
         raise HTTPException(status_code=403, detail="Not authorized")
 
-    result = await db.execute(
-        select(models.HealthRecord)
+    query = (
+        health_serializer.select()
         .join(models.Animal, models.HealthRecord.animal_id == models.Animal.animal_id)
         .where(models.Animal.farmer_id == current_user.farmer_id)
     )
-    return result.scalars().all()
+    rows = await fetch_page(db, query, models.HealthRecord.date, models.HealthRecord.record_id, page, response)
+    return health_serializer.response(rows, response)
 
 # --- HEALTH INTELLIGENCE ENDPOINTS ---
 
-@router.get("/status-summary")
+async def health_status_counts(db: AsyncSession, farmer_id: int) -> dict:
+    """
+    Sick (open case recorded in the last 7 days) and under-treatment
+    (follow-up still ahead) counts in one query.
+    """
+    today = date.today()
+    result = await db.execute(
+        select(
+            func.count().filter(
+                HealthRecord.next_checkup_date == None,
+                HealthRecord.date >= today - timedelta(days=7)
+            ).label("sick"),
+            func.count().filter(HealthRecord.next_checkup_date >= today).label("under_treatment"),
+        )
+        .select_from(HealthRecord)
+        .join(Animal)
+        .where(Animal.farmer_id == farmer_id)
+    )
+    row = result.one()
+    return {
+        "sick": row.sick,
+        "under_treatment": row.under_treatment
+    }
+
+@router.get("/status-summary", dependencies=[Depends(conditional_get(HEALTH, ANIMALS, db_dependency=get_read_db))])
 async def get_health_summary(
     farmer_id: int, 
-    db: AsyncSession = Depends(get_db),
-    current_user: models.Farmer = Depends(get_current_user)
+    db: AsyncSession = Depends(get_read_db),
+    current_user: Principal = Depends(get_current_principal)
 ):
     if current_user.farmer_id != farmer_id:
         raise HTTPException(status_code=403, detail="Not authorized")
 
-    sick_query = select(func.count(HealthRecord.record_id)).join(Animal).where(
-        and_(
-            Animal.farmer_id == current_user.farmer_id,
-            HealthRecord.next_checkup_date == None,
-            HealthRecord.date >= date.today() - timedelta(days=7)
-        )
-    )
-    sick_result = await db.execute(sick_query)
-    sick_count = sick_result.scalar_one()
+    return await health_status_counts(db, current_user.farmer_id)
 
-    under_treatment_query = select(func.count(HealthRecord.record_id)).join(Animal).where(
-        and_(
-            Animal.farmer_id == current_user.farmer_id,
-            HealthRecord.next_checkup_date >= date.today()
-        )
-    )
-    under_treatment_result = await db.execute(under_treatment_query)
-    under_treatment_count = under_treatment_result.scalar_one()
-
-    return {
-        "sick": sick_count,
-        "under_treatment": under_treatment_count
-    }
-
-@router.get("/sick")
+@router.get("/sick", dependencies=[Depends(conditional_get(HEALTH, ANIMALS, db_dependency=get_read_db))])
 async def get_sick_animals(
     farmer_id: int, 
-    db: AsyncSession = Depends(get_db),
-    current_user: models.Farmer = Depends(get_current_user)
+    db: AsyncSession = Depends(get_read_db),
+    current_user: Principal = Depends(get_current_principal)
 ):
     if current_user.farmer_id != farmer_id:
         raise HTTPException(status_code=403, detail="Not authorized")
@@ -152,7 +169,7 @@ async def get_sick_animals(
 async def resolve_health_record(
     record_id: int, 
     db: AsyncSession = Depends(get_db),
-    current_user: models.Farmer = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_principal)
 ):
     result = await db.execute(
         select(models.HealthRecord)
@@ -170,15 +187,16 @@ async def resolve_health_record(
     
     # Resolves the condition by scheduling a checkup today
     record.next_checkup_date = date.today()
+    await bump_versions(db, current_user.farmer_id, HEALTH)
     await db.commit()
     await db.refresh(record)
     return {"status": "resolved"}
 
-@router.get("/under-treatment")
+@router.get("/under-treatment", dependencies=[Depends(conditional_get(HEALTH, ANIMALS, db_dependency=get_read_db))])
 async def get_under_treatment_animals(
     farmer_id: int, 
-    db: AsyncSession = Depends(get_db),
-    current_user: models.Farmer = Depends(get_current_user)
+    db: AsyncSession = Depends(get_read_db),
+    current_user: Principal = Depends(get_current_principal)
 ):
     if current_user.farmer_id != farmer_id:
         raise HTTPException(status_code=403, detail="Not authorized")
@@ -204,11 +222,11 @@ async def get_under_treatment_animals(
         } for a, hr in result.all()
     ]
 
-@router.get("/recovered")
+@router.get("/recovered", dependencies=[Depends(conditional_get(HEALTH, ANIMALS, db_dependency=get_read_db))])
 async def get_recovered_animals(
     farmer_id: int, 
-    db: AsyncSession = Depends(get_db),
-    current_user: models.Farmer = Depends(get_current_user)
+    db: AsyncSession = Depends(get_read_db),
+    current_user: Principal = Depends(get_current_principal)
 ):
     if current_user.farmer_id != farmer_id:
         raise HTTPException(status_code=403, detail="Not authorized")
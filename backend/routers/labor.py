@@ -1,4 +1,4 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Response, status
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 from typing import List
@@ -6,40 +6,53 @@ from typing import List
 from database import get_db
 import models
 import schemas
-from auth import get_current_user
+from auth import get_current_principal, Principal
+from change_versions import conditional_get, bump_versions, LABOR
+from pagination import PageParams, page_params, fetch_page
+from fast_json import ListSerializer
 
 router = APIRouter(
     prefix="/labor",
     tags=["Labor & Activities"]
 )
 
+labor_serializer = ListSerializer(schemas.LaborActivity, models.LaborActivity)
+
+async def add_labor_activity(db: AsyncSession, farmer_id: int, activity: schemas.LaborActivityCreate) -> models.LaborActivity:
+    new_activity = models.LaborActivity(**activity.dict())
+    db.add(new_activity)
+    await db.flush()
+    return new_activity
+
 @router.post("/", response_model=schemas.LaborActivity, status_code=status.HTTP_201_CREATED)
 async def create_labor_activity(
     activity: schemas.LaborActivityCreate, 
     db: AsyncSession = Depends(get_db),
-    current_user: models.Farmer = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_principal)
 ):
     if activity.farmer_id != current_user.farmer_id:
         raise HTTPException(status_code=403, detail="Not authorized to log activities for other farmers")
         
-    new_activity = models.LaborActivity(**activity.dict())
-    db.add(new_activity)
+    new_activity = await add_labor_activity(db, current_user.farmer_id, activity)
+    await bump_versions(db, current_user.farmer_id, LABOR)
     await db.commit()
     await db.refresh(new_activity)
     return new_activity
 
-@router.get("/farmer/{farmer_id}", response_model=List[schemas.LaborActivity])
+@router.get("/farmer/{farmer_id}", response_model=List[schemas.LaborActivity], dependencies=[Depends(conditional_get(LABOR))])
 async def read_labor_activities(
     farmer_id: int, 
+    response: Response,
     db: AsyncSession = Depends(get_db),
-    current_user: models.Farmer = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_principal),
+    page: PageParams = Depends(page_params)
 ):
     if current_user.farmer_id != farmer_id:
         raise HTTPException(status_code=403, detail="Not authorized")
         
-    result = await db.execute(
-        select(models.LaborActivity)
+    query = (
+        labor_serializer.select()
         .where(models.LaborActivity.farmer_id == current_user.farmer_id)
-        .order_by(models.LaborActivity.date.desc())
     )
-    return result.scalars().all()
+    rows = await fetch_page(db, query, models.LaborActivity.date, models.LaborActivity.activity_id, page, response)
+    return labor_serializer.response(rows, response)
@@ -5,18 +5,19 @@ from typing import List
 from database import get_db
 import models
 import schemas
-from auth import get_current_user
+from auth import get_current_principal, Principal
+from change_versions import conditional_get, bump_versions, PENS
 
 router = APIRouter(
     prefix="/pens",
     tags=["Pens"]
 )
 
-@router.get("/", response_model=List[schemas.AnimalPen])
+@router.get("/", response_model=List[schemas.AnimalPen], dependencies=[Depends(conditional_get(PENS))])
 async def get_pens(
     farmer_id: int, 
     db: AsyncSession = Depends(get_db),
-    current_user: models.Farmer = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_principal)
 ):
     if current_user.farmer_id != farmer_id:
         raise HTTPException(status_code=403, detail="Not authorized")
@@ -31,13 +32,14 @@ async def get_pens(
 async def create_pen(
     pen: schemas.AnimalPenCreate, 
     db: AsyncSession = Depends(get_db),
-    current_user: models.Farmer = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_principal)
 ):
     if pen.farmer_id != current_user.farmer_id:
         raise HTTPException(status_code=403, detail="Not authorized to create pens for other farmers")
         
     new_pen = models.AnimalPen(**pen.dict())
     db.add(new_pen)
+    await bump_versions(db, current_user.farmer_id, PENS)
     await db.commit()
     await db.refresh(new_pen)
     return new_pen
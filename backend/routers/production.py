@@ -1,127 +1,394 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
-from sqlalchemy import func, and_
-from typing import List
+from sqlalchemy import func, and_, any_, bindparam, insert, literal_column, String
+from sqlalchemy.dialects.postgresql import ARRAY, insert as pg_insert
+from typing import List, Optional
 from datetime import date, timedelta
+from decimal import Decimal, InvalidOperation
+import csv
+import io
+import json
+import os
 
 from database import get_db
+from read_routing import get_read_db
 import models
 import schemas
-from auth import get_current_user
+from auth import get_current_principal, Principal
+from change_versions import conditional_get, bump_versions, ANIMALS, BREEDING, MILK, WEIGHT
+from pagination import PageParams, page_params, fetch_page
+from fast_json import ListSerializer
+from ownership import require_animal, unowned_animal_ids
 
 router = APIRouter(
     prefix="/production",
     tags=["Production (Milk & Breeding)"]
 )
 
+milk_serializer = ListSerializer(schemas.MilkProduction, models.MilkProduction)
+weight_serializer = ListSerializer(schemas.WeightRecord, models.WeightRecord)
+breeding_serializer = ListSerializer(schemas.BreedingRecord, models.BreedingRecord)
+
 # --- MILK PRODUCTION ---
 
+MILK_UPSERT_FIELDS = ("morning_yield", "evening_yield", "fat_content", "protein_content", "somatic_cell_count", "quality_notes")
+
+# Mirrors the milk_production CHECK constraints and column precision, so one
+# bad entry is rejected on its own instead of failing the whole batch
+MILK_FIELD_LIMITS = {
+    "morning_yield": (0, Decimal("999.99")),
+    "evening_yield": (0, Decimal("999.99")),
+    "fat_content": (0, 10),
+    "protein_content": (0, 10),
+    "somatic_cell_count": (0, None),
+}
+
+def _milk_range_error(entry: schemas.MilkSessionEntry):
+    for field, (low, high) in MILK_FIELD_LIMITS.items():
+        value = getattr(entry, field)
+        if value is not None and (value < low or (high is not None and value > high)):
+            return f"{field} must be between {low} and {high}" if high is not None else f"{field} must be at least {low}"
+    return None
+
+def _milk_upsert(rows):
+    """
+    INSERT ... ON CONFLICT (animal_id, date) that only overwrites the fields
+    a row actually provides.
+    """
+    stmt = pg_insert(models.MilkProduction).values(rows)
+    return stmt.on_conflict_do_update(
+        constraint="uq_milk_production_animal_date",
+        set_={field: func.coalesce(getattr(stmt.excluded, field), getattr(models.MilkProduction, field)) for field in MILK_UPSERT_FIELDS}
+    )
+
+async def upsert_milk_production(db: AsyncSession, production: schemas.MilkProductionCreate):
+    """
+    Upserts the day's milk row without committing and returns (row, inserted);
+    inserted is False when the entry merged into an existing row.
+    """
+    # A second session on the same day merges into the existing row; xmax is
+    # 0 only on a freshly inserted tuple
+    result = await db.execute(
+        _milk_upsert([production.dict()]).returning(models.MilkProduction, literal_column("xmax = 0").label("inserted")),
+        execution_options={"populate_existing": True}
+    )
+    row = result.one()
+    return row[0], row.inserted
+
+async def add_milk_production(db: AsyncSession, farmer_id: int, production: schemas.MilkProductionCreate) -> models.MilkProduction:
+    """
+    Upserts the day's milk row without committing. Ownership is the caller's job.
+    """
+    milk, _ = await upsert_milk_production(db, production)
+    return milk
+
 @router.post("/milk", response_model=schemas.MilkProduction, status_code=status.HTTP_201_CREATED)
 async def create_milk_production(
     production: schemas.MilkProductionCreate, 
+    response: Response,
     db: AsyncSession = Depends(get_db),
-    current_user: models.Farmer = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_principal)
 ):
+    """
+    201 when the day's row is created, 200 when the entry merged into it.
+    """
     # Verify animal ownership
-    anim_res = await db.execute(select(models.Animal).where(models.Animal.animal_id == production.animal_id))
-    animal = anim_res.scalars().first()
-    if not animal or animal.farmer_id != current_user.farmer_id:
-        raise HTTPException(status_code=403, detail="Not authorized to log production for this animal")
+    await require_animal(db, current_user.farmer_id, production.animal_id, detail="Not authorized to log production for this animal")
 
-    new_production = models.MilkProduction(**production.dict())
-    db.add(new_production)
+    new_production, inserted = await upsert_milk_production(db, production)
+    if not inserted:
+        response.status_code = status.HTTP_200_OK
+    await bump_versions(db, current_user.farmer_id, MILK)
     await db.commit()
     await db.refresh(new_production)
     return new_production
 
-@router.get("/milk/animal/{animal_id}", response_model=List[schemas.MilkProduction])
+@router.post("/milk/batch", response_model=List[schemas.MilkBatchResult])
+async def create_milk_batch(
+    batch: schemas.MilkSessionBatch,
+    db: AsyncSession = Depends(get_db),
+    current_user: Principal = Depends(get_current_principal)
+):
+    """
+    Records a whole milking session in one round trip. Each animal's entry is
+    upserted into its row for `date`, so the evening batch fills in the
+    morning row. Returns one result per submitted entry, in order.
+    """
+    results = [None] * len(batch.records)
+    merged = {}     # animal_id -> values for that animal's row
+    positions = {}  # animal_id -> indexes of its entries in the batch
+
+    for i, entry in enumerate(batch.records):
+        problem = _milk_range_error(entry)
+        if problem:
+            results[i] = schemas.MilkBatchResult(animal_id=entry.animal_id, status="rejected", detail=problem)
+            continue
+        values = merged.setdefault(entry.animal_id, {"animal_id": entry.animal_id, "date": batch.date, **dict.fromkeys(MILK_UPSERT_FIELDS)})
+        for field in MILK_UPSERT_FIELDS:
+            value = getattr(entry, field)
+            if value is not None:
+                values[field] = value
+        positions.setdefault(entry.animal_id, []).append(i)
+
+    # One ownership query for the whole session
+    for animal_id in await unowned_animal_ids(db, current_user.farmer_id, merged.keys()):
+        del merged[animal_id]
+        for i in positions.pop(animal_id):
+            results[i] = schemas.MilkBatchResult(animal_id=animal_id, status="rejected", detail="Animal not found or not authorized")
+
+    if merged:
+        # Sorted so concurrent sessions lock rows in the same order
+        rows = [merged[animal_id] for animal_id in sorted(merged)]
+        upserted = await db.execute(
+            _milk_upsert(rows).returning(
+                models.MilkProduction.animal_id,
+                models.MilkProduction.production_id,
+                literal_column("xmax = 0").label("inserted")
+            )
+        )
+        for row in upserted.all():
+            for i in positions[row.animal_id]:
+                results[i] = schemas.MilkBatchResult(
+                    animal_id=row.animal_id,
+                    status="created" if row.inserted else "updated",
+                    production_id=row.production_id
+                )
+        await bump_versions(db, current_user.farmer_id, MILK)
+        await db.commit()
+
+    return results
+
+@router.get("/milk/animal/{animal_id}", response_model=List[schemas.MilkProduction], dependencies=[Depends(conditional_get(MILK, db_dependency=get_read_db))])
 async def read_animal_milk_production(
     animal_id: int, 
-    db: AsyncSession = Depends(get_db),
-    current_user: models.Farmer = Depends(get_current_user)
+    response: Response,
+    db: AsyncSession = Depends(get_read_db),
+    current_user: Principal = Depends(get_current_principal)
 ):
     # Verify animal ownership
-    anim_res = await db.execute(select(models.Animal).where(models.Animal.animal_id == animal_id))
-    animal = anim_res.scalars().first()
-    if not animal or animal.farmer_id != current_user.farmer_id:
-        raise HTTPException(status_code=403, detail="Not authorized")
+    await require_animal(db, current_user.farmer_id, animal_id)
 
-    result = await db.execute(select(models.MilkProduction).where(models.MilkProduction.animal_id == animal_id))
-    return result.scalars().all()
+    result = await db.execute(milk_serializer.select().where(models.MilkProduction.animal_id == animal_id))
+    return milk_serializer.response(result.all(), response)
 
-@router.get("/milk/farmer/{farmer_id}", response_model=List[schemas.MilkProduction])
+@router.get("/milk/farmer/{farmer_id}", response_model=List[schemas.MilkProduction], dependencies=[Depends(conditional_get(MILK, db_dependency=get_read_db))])
 async def read_farmer_milk_production(
     farmer_id: int, 
-    db: AsyncSession = Depends(get_db),
-    current_user: models.Farmer = Depends(get_current_user)
+    response: Response,
+    db: AsyncSession = Depends(get_read_db),
+    current_user: Principal = Depends(get_current_principal),
+    page: PageParams = Depends(page_params)
 ):
     if current_user.farmer_id != farmer_id:
         raise HTTPException(status_code=403, detail="Not authorized")
 
-    result = await db.execute(
-        select(models.MilkProduction)
+    query = (
+        milk_serializer.select()
         .join(models.Animal)
         .where(models.Animal.farmer_id == current_user.farmer_id)
-        .order_by(models.MilkProduction.date.desc())
     )
-    return result.scalars().all()
+    rows = await fetch_page(db, query, models.MilkProduction.date, models.MilkProduction.production_id, page, response)
+    return milk_serializer.response(rows, response)
 
 # --- WEIGHT RECORDS ---
 
+# Weigh-day imports: plausibility bounds for a live weight, and accepted column names
+WEIGHT_IMPORT_MAX_ROWS = int(os.getenv("WEIGHT_IMPORT_MAX_ROWS", "5000"))
+WEIGHT_IMPORT_MIN_KG = Decimal(os.getenv("WEIGHT_IMPORT_MIN_KG", "1"))
+WEIGHT_IMPORT_MAX_KG = Decimal(os.getenv("WEIGHT_IMPORT_MAX_KG", "2000"))
+
+WEIGHT_IMPORT_COLUMNS = {
+    "tag": "tag_number",
+    "tag_number": "tag_number",
+    "weight": "weight_kg",
+    "weight_kg": "weight_kg",
+    "date": "date",
+    "bcs": "body_condition_score",
+    "body_condition_score": "body_condition_score",
+    "notes": "notes",
+}
+
+def _parse_weight_import(body: bytes, content_type: str):
+    try:
+        if "csv" in content_type:
+            reader = csv.DictReader(io.StringIO(body.decode("utf-8-sig")))
+            return [
+                {WEIGHT_IMPORT_COLUMNS.get(key.strip().lower(), key): (value or "").strip() for key, value in row.items() if key}
+                for row in reader
+            ]
+        data = json.loads(body)
+    except (UnicodeDecodeError, ValueError, csv.Error):
+        raise HTTPException(status_code=400, detail="Could not parse import body as CSV or JSON")
+
+    if isinstance(data, dict):
+        data = data.get("records")
+    if not isinstance(data, list):
+        raise HTTPException(status_code=400, detail="Expected a JSON array of weight rows")
+    return [
+        {WEIGHT_IMPORT_COLUMNS.get(str(key).lower(), key): value for key, value in item.items()} if isinstance(item, dict) else item
+        for item in data
+    ]
+
+def _weight_import_values(raw, default_date):
+    """
+    Validated column values for one import row, or (None, reason).
+    """
+    if not isinstance(raw, dict):
+        return None, "Row must be an object"
+    if raw.get("tag_number") in (None, ""):
+        return None, "Missing tag number"
+    try:
+        weight_kg = Decimal(str(raw.get("weight_kg"))).quantize(Decimal("0.01"))
+    except (InvalidOperation, ValueError):
+        return None, "Missing or invalid weight"
+    if not weight_kg.is_finite():
+        return None, "Missing or invalid weight"
+    if not WEIGHT_IMPORT_MIN_KG <= weight_kg <= WEIGHT_IMPORT_MAX_KG:
+        return None, f"Weight {weight_kg} kg is outside {WEIGHT_IMPORT_MIN_KG}-{WEIGHT_IMPORT_MAX_KG} kg"
+
+    weigh_date = default_date
+    if raw.get("date") not in (None, ""):
+        try:
+            weigh_date = date.fromisoformat(str(raw["date"]))
+        except ValueError:
+            return None, "Invalid date, expected YYYY-MM-DD"
+
+    body_condition_score = None
+    if raw.get("body_condition_score") not in (None, ""):
+        try:
+            body_condition_score = int(raw["body_condition_score"])
+        except (TypeError, ValueError):
+            return None, "Invalid body condition score"
+        if not 1 <= body_condition_score <= 5:
+            return None, "Body condition score must be between 1 and 5"
+
+    return {
+        "date": weigh_date,
+        "weight_kg": weight_kg,
+        "body_condition_score": body_condition_score,
+        "notes": raw.get("notes") or None,
+    }, None
+
+
+async def add_weight_record(db: AsyncSession, farmer_id: int, weight: schemas.WeightRecordCreate) -> models.WeightRecord:
+    new_weight = models.WeightRecord(**weight.dict())
+    db.add(new_weight)
+    await db.flush()
+    return new_weight
+
 @router.post("/weight", response_model=schemas.WeightRecord, status_code=status.HTTP_201_CREATED)
 async def create_weight_record(
     weight: schemas.WeightRecordCreate, 
     db: AsyncSession = Depends(get_db),
-    current_user: models.Farmer = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_principal)
 ):
     # Verify animal ownership
-    anim_res = await db.execute(select(models.Animal).where(models.Animal.animal_id == weight.animal_id))
-    animal = anim_res.scalars().first()
-    if not animal or animal.farmer_id != current_user.farmer_id:
-        raise HTTPException(status_code=403, detail="Not authorized")
+    await require_animal(db, current_user.farmer_id, weight.animal_id)
 
-    new_weight = models.WeightRecord(**weight.dict())
-    db.add(new_weight)
+    new_weight = await add_weight_record(db, current_user.farmer_id, weight)
+    await bump_versions(db, current_user.farmer_id, WEIGHT)
     await db.commit()
     await db.refresh(new_weight)
     return new_weight
 
-@router.get("/weight/farmer/{farmer_id}", response_model=List[schemas.WeightRecord])
+@router.post("/weight/import", response_model=schemas.WeightImportResult)
+async def import_weight_records(
+    request: Request,
+    weigh_date: Optional[date] = Query(None, alias="date", description="weigh date for rows without a date column (default today)"),
+    db: AsyncSession = Depends(get_db),
+    current_user: Principal = Depends(get_current_principal)
+):
+    """
+    Bulk weigh-day import keyed by tag number. Send the scale's CSV export
+    (Content-Type: text/csv, columns tag_number/tag, weight_kg/weight and
+    optional date, body_condition_score, notes) or a JSON array of the same
+    fields. Bad rows and unknown tags are reported; the rest are imported.
+    """
+    raw_rows = _parse_weight_import(await request.body(), request.headers.get("content-type", ""))
+    if len(raw_rows) > WEIGHT_IMPORT_MAX_ROWS:
+        raise HTTPException(status_code=413, detail=f"At most {WEIGHT_IMPORT_MAX_ROWS} rows per import")
+
+    default_date = weigh_date or date.today()
+    rejected = []
+    valid = []  # (row number, tag, values)
+    seen_tags = set()
+    for row_number, raw in enumerate(raw_rows, start=1):
+        values, problem = _weight_import_values(raw, default_date)
+        tag = raw.get("tag_number") if isinstance(raw, dict) else None
+        tag = str(tag).strip() if tag not in (None, "") else None
+        if not problem and tag in seen_tags:
+            problem = "Duplicate tag in import"
+        if problem:
+            rejected.append(schemas.WeightImportRejection(row=row_number, tag_number=tag, detail=problem))
+            continue
+        seen_tags.add(tag)
+        valid.append((row_number, tag, values))
+
+    # Set-based tag -> animal_id resolution on the (farmer_id, tag_number) unique index
+    animal_ids = {}
+    if seen_tags:
+        result = await db.execute(
+            select(models.Animal.tag_number, models.Animal.animal_id).where(
+                models.Animal.farmer_id == current_user.farmer_id,
+                models.Animal.tag_number == any_(bindparam("tags", list(seen_tags), type_=ARRAY(String)))
+            )
+        )
+        animal_ids = dict(result.all())
+
+    rows, unmatched_tags = [], []
+    for row_number, tag, values in valid:
+        animal_id = animal_ids.get(tag)
+        if animal_id is None:
+            unmatched_tags.append(tag)
+            rejected.append(schemas.WeightImportRejection(row=row_number, tag_number=tag, detail="Unknown tag number"))
+            continue
+        rows.append({"animal_id": animal_id, **values})
+
+    if rows:
+        # Batched into multi-row INSERTs by SQLAlchemy's insertmanyvalues
+        await db.execute(insert(models.WeightRecord), rows)
+        await bump_versions(db, current_user.farmer_id, WEIGHT)
+        await db.commit()
+
+    rejected.sort(key=lambda r: r.row)
+    return schemas.WeightImportResult(imported=len(rows), unmatched_tags=unmatched_tags, rejected=rejected)
+
+@router.get("/weight/farmer/{farmer_id}", response_model=List[schemas.WeightRecord], dependencies=[Depends(conditional_get(WEIGHT, db_dependency=get_read_db))])
 async def read_farmer_weight_records(
     farmer_id: int, 
-    db: AsyncSession = Depends(get_db),
-    current_user: models.Farmer = Depends(get_current_user)
+    response: Response,
+    db: AsyncSession = Depends(get_read_db),
+    current_user: Principal = Depends(get_current_principal),
+    page: PageParams = Depends(page_params)
 ):
     if current_user.farmer_id != farmer_id:
         raise HTTPException(status_code=403, detail="Not authorized")
 
-    result = await db.execute(
-        select(models.WeightRecord)
+    query = (
+        weight_serializer.select()
         .join(models.Animal)
         .where(models.Animal.farmer_id == current_user.farmer_id)
-        .order_by(models.WeightRecord.date.desc())
     )
-    return result.scalars().all()
+    rows = await fetch_page(db, query, models.WeightRecord.date, models.WeightRecord.weight_id, page, response)
+    return weight_serializer.response(rows, response)
 
-@router.get("/weight/animal/{animal_id}", response_model=List[schemas.WeightRecord])
+@router.get("/weight/animal/{animal_id}", response_model=List[schemas.WeightRecord], dependencies=[Depends(conditional_get(WEIGHT, db_dependency=get_read_db))])
 async def read_animal_weight_records(
     animal_id: int, 
-    db: AsyncSession = Depends(get_db),
-    current_user: models.Farmer = Depends(get_current_user)
+    response: Response,
+    db: AsyncSession = Depends(get_read_db),
+    current_user: Principal = Depends(get_current_principal)
 ):
     # Verify animal ownership
-    anim_res = await db.execute(select(models.Animal).where(models.Animal.animal_id == animal_id))
-    animal = anim_res.scalars().first()
-    if not animal or animal.farmer_id != current_user.farmer_id:
-        raise HTTPException(status_code=403, detail="Not authorized")
+    await require_animal(db, current_user.farmer_id, animal_id)
 
     result = await db.execute(
-        select(models.WeightRecord)
+        weight_serializer.select()
         .where(models.WeightRecord.animal_id == animal_id)
         .order_by(models.WeightRecord.date.desc())
     )
-    return result.scalars().all()
+    return weight_serializer.response(result.all(), response)
 
 # --- BREEDING RECORDS ---
 
@@ -129,48 +396,45 @@ async def read_animal_weight_records(
 async def create_breeding_record(
     breeding: schemas.BreedingRecordCreate, 
     db: AsyncSession = Depends(get_db),
-    current_user: models.Farmer = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_principal)
 ):
     # Verify female animal ownership
-    anim_res = await db.execute(select(models.Animal).where(models.Animal.animal_id == breeding.female_id))
-    animal = anim_res.scalars().first()
-    if not animal or animal.farmer_id != current_user.farmer_id:
-        raise HTTPException(status_code=403, detail="Not authorized")
+    await require_animal(db, current_user.farmer_id, breeding.female_id)
 
     new_breeding = models.BreedingRecord(**breeding.dict())
     db.add(new_breeding)
+    await bump_versions(db, current_user.farmer_id, BREEDING)
     await db.commit()
     await db.refresh(new_breeding)
     return new_breeding
 
-@router.get("/breeding/farmer/{farmer_id}", response_model=List[schemas.BreedingRecord])
+@router.get("/breeding/farmer/{farmer_id}", response_model=List[schemas.BreedingRecord], dependencies=[Depends(conditional_get(BREEDING, db_dependency=get_read_db))])
 async def read_farmer_breeding_records(
     farmer_id: int, 
-    db: AsyncSession = Depends(get_db),
-    current_user: models.Farmer = Depends(get_current_user)
+    response: Response,
+    db: AsyncSession = Depends(get_read_db),
+    current_user: Principal = Depends(get_current_principal),
+    page: PageParams = Depends(page_params)
 ):
     if current_user.farmer_id != farmer_id:
         raise HTTPException(status_code=403, detail="Not authorized")
 
-    result = await db.execute(
-        select(models.BreedingRecord)
+    query = (
+        breeding_serializer.select()
         .join(models.Animal, models.BreedingRecord.female_id == models.Animal.animal_id)
         .where(models.Animal.farmer_id == current_user.farmer_id)
-        .order_by(models.BreedingRecord.breeding_date.desc())
     )
-    return result.scalars().all()
+    rows = await fetch_page(db, query, models.BreedingRecord.breeding_date, models.BreedingRecord.breeding_id, page, response)
+    return breeding_serializer.response(rows, response)
 
-@router.get("/breeding/animal/{animal_id}/", response_model=List[schemas.BreedingRecord])
+@router.get("/breeding/animal/{animal_id}/", response_model=List[schemas.BreedingRecord], dependencies=[Depends(conditional_get(BREEDING, db_dependency=get_read_db))])
 async def read_animal_breeding_records(
     animal_id: int, 
-    db: AsyncSession = Depends(get_db),
-    current_user: models.Farmer = Depends(get_current_user)
+    db: AsyncSession = Depends(get_read_db),
+    current_user: Principal = Depends(get_current_principal)
 ):
     # Verify animal ownership
-    anim_res = await db.execute(select(models.Animal).where(models.Animal.animal_id == animal_id))
-    animal = anim_res.scalars().first()
-    if not animal or animal.farmer_id != current_user.farmer_id:
-        raise HTTPException(status_code=403, detail="Not authorized")
+    await require_animal(db, current_user.farmer_id, animal_id)
 
     result = await db.execute(
         select(models.BreedingRecord)
@@ -181,93 +445,87 @@ async def read_animal_breeding_records(
 
 # --- BREEDING TOOLS ---
 
-@router.get("/breeding-summary")
-async def get_breeding_summary(
-    farmer_id: int, 
-    db: AsyncSession = Depends(get_db),
-    current_user: models.Farmer = Depends(get_current_user)
-):
-    if current_user.farmer_id != farmer_id:
-        raise HTTPException(status_code=403, detail="Not authorized")
+# Pregnant animals expected to calve within this many days are "due soon"
+DUE_SOON_DAYS = 14
 
-    preg_res = await db.execute(
-        select(func.count(models.BreedingRecord.breeding_id))
-        .join(models.Animal, models.BreedingRecord.female_id == models.Animal.animal_id)
-        .where(
-            and_(
-                models.Animal.farmer_id == current_user.farmer_id,
-                models.BreedingRecord.pregnancy_status == "Pregnant"
-            )
+async def breeding_counts(db: AsyncSession, farmer_id: int) -> dict:
+    """Pregnant, due (expected calving today or later) and failed counts in one query."""
+    pregnancy_status = models.BreedingRecord.pregnancy_status
+    result = await db.execute(
+        select(
+            func.count().filter(pregnancy_status == "Pregnant").label("pregnant"),
+            func.count().filter(pregnancy_status == "Pregnant", models.BreedingRecord.expected_calving_date >= date.today()).label("due_soon"),
+            func.count().filter(pregnancy_status == "Failed").label("failed"),
         )
+        .select_from(models.BreedingRecord)
+        .join(models.Animal, models.BreedingRecord.female_id == models.Animal.animal_id)
+        .where(models.Animal.farmer_id == farmer_id, pregnancy_status.in_(("Pregnant", "Failed")))
     )
-    pregnant_count = preg_res.scalar_one()
+    row = result.one()
+    return {
+        "pregnant": row.pregnant,
+        "due_soon": row.due_soon,
+        "failed": row.failed
+    }
 
-    due_res = await db.execute(
-        select(func.count(models.BreedingRecord.breeding_id))
-        .join(models.Animal, models.BreedingRecord.female_id == models.Animal.animal_id)
-        .where(
+async def pregnancies(db: AsyncSession, farmer_id: int):
+    """(Animal, BreedingRecord) pairs for every pregnancy of the farmer."""
+    result = await db.execute(
+        select(models.Animal, models.BreedingRecord).join(
+            models.BreedingRecord, models.Animal.animal_id == models.BreedingRecord.female_id
+        ).where(
             and_(
-                models.Animal.farmer_id == current_user.farmer_id,
-                models.BreedingRecord.pregnancy_status == "Pregnant",
-                models.BreedingRecord.expected_calving_date >= date.today()
+                models.Animal.farmer_id == farmer_id,
+                models.BreedingRecord.pregnancy_status == "Pregnant"
             )
         )
     )
-    due_count = due_res.scalar_one()
+    return result.all()
 
-    failed_res = await db.execute(
-        select(func.count(models.BreedingRecord.breeding_id))
-        .join(models.Animal, models.BreedingRecord.female_id == models.Animal.animal_id)
-        .where(
-            and_(
-                models.Animal.farmer_id == current_user.farmer_id,
-                models.BreedingRecord.pregnancy_status == "Failed"
-            )
-        )
+def is_due_soon(record: models.BreedingRecord) -> bool:
+    return (
+        record.actual_calving_date is None
+        and record.expected_calving_date is not None
+        and record.expected_calving_date <= date.today() + timedelta(days=DUE_SOON_DAYS)
     )
-    failed_count = failed_res.scalar_one()
 
+def pregnancy_entry(a: models.Animal, br: models.BreedingRecord) -> dict:
     return {
-        "pregnant": pregnant_count,
-        "due_soon": due_count,
-        "failed": failed_count
+        "animal_id": a.animal_id,
+        "tag_number": a.tag_number,
+        "name": a.name,
+        "breeding_id": br.breeding_id,
+        "expected_calving_date": br.expected_calving_date,
+        "breeding_date": br.breeding_date
     }
 
-@router.get("/breeding/pregnant")
+@router.get("/breeding-summary", dependencies=[Depends(conditional_get(BREEDING, ANIMALS, db_dependency=get_read_db))])
+async def get_breeding_summary(
+    farmer_id: int, 
+    db: AsyncSession = Depends(get_read_db),
+    current_user: Principal = Depends(get_current_principal)
+):
+    if current_user.farmer_id != farmer_id:
+        raise HTTPException(status_code=403, detail="Not authorized")
+
+    return await breeding_counts(db, current_user.farmer_id)
+
+@router.get("/breeding/pregnant", dependencies=[Depends(conditional_get(BREEDING, ANIMALS, db_dependency=get_read_db))])
 async def get_pregnant_animals(
     farmer_id: int, 
-    db: AsyncSession = Depends(get_db),
-    current_user: models.Farmer = Depends(get_current_user)
+    db: AsyncSession = Depends(get_read_db),
+    current_user: Principal = Depends(get_current_principal)
 ):
     if current_user.farmer_id != farmer_id:
         raise HTTPException(status_code=403, detail="Not authorized")
 
-    query = select(models.Animal, models.BreedingRecord).join(
-        models.BreedingRecord, models.Animal.animal_id == models.BreedingRecord.female_id
-    ).where(
-        and_(
-            models.Animal.farmer_id == current_user.farmer_id,
-            models.BreedingRecord.pregnancy_status == "Pregnant"
-        )
-    )
-    result = await db.execute(query)
-    
-    return [
-        {
-            "animal_id": a.animal_id,
-            "tag_number": a.tag_number,
-            "name": a.name,
-            "breeding_id": br.breeding_id,
-            "expected_calving_date": br.expected_calving_date,
-            "breeding_date": br.breeding_date
-        } for a, br in result.all()
-    ]
+    return [pregnancy_entry(a, br) for a, br in await pregnancies(db, current_user.farmer_id)]
 
-@router.get("/breeding/pending")
+@router.get("/breeding/pending", dependencies=[Depends(conditional_get(BREEDING, ANIMALS, db_dependency=get_read_db))])
 async def get_pending_breeding(
     farmer_id: int, 
-    db: AsyncSession = Depends(get_db),
-    current_user: models.Farmer = Depends(get_current_user)
+    db: AsyncSession = Depends(get_read_db),
+    current_user: Principal = Depends(get_current_principal)
 ):
     if current_user.farmer_id != farmer_id:
         raise HTTPException(status_code=403, detail="Not authorized")
@@ -298,7 +556,7 @@ async def get_pending_breeding(
 async def mark_breeding_failed(
     breeding_id: int, 
     db: AsyncSession = Depends(get_db),
-    current_user: models.Farmer = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_principal)
 ):
     result = await db.execute(
         select(models.BreedingRecord)
@@ -315,48 +573,27 @@ async def mark_breeding_failed(
         raise HTTPException(status_code=404, detail="Breeding record not found")
     
     record.pregnancy_status = "Failed"
+    await bump_versions(db, current_user.farmer_id, BREEDING)
     await db.commit()
     await db.refresh(record)
     return {"status": "success"}
 
-@router.get("/breeding/due-soon")
+@router.get("/breeding/due-soon", dependencies=[Depends(conditional_get(BREEDING, ANIMALS, db_dependency=get_read_db))])
 async def get_due_soon_animals(
     farmer_id: int, 
-    db: AsyncSession = Depends(get_db),
-    current_user: models.Farmer = Depends(get_current_user)
+    db: AsyncSession = Depends(get_read_db),
+    current_user: Principal = Depends(get_current_principal)
 ):
     if current_user.farmer_id != farmer_id:
         raise HTTPException(status_code=403, detail="Not authorized")
 
-    due_soon_date = date.today() + timedelta(days=14) # Check next 2 weeks
-    query = select(models.Animal, models.BreedingRecord).join(
-        models.BreedingRecord, models.Animal.animal_id == models.BreedingRecord.female_id
-    ).where(
-        and_(
-            models.Animal.farmer_id == current_user.farmer_id,
-            models.BreedingRecord.pregnancy_status == "Pregnant",
-            models.BreedingRecord.actual_calving_date == None,
-            models.BreedingRecord.expected_calving_date <= due_soon_date
-        )
-    )
-    result = await db.execute(query)
-    
-    return [
-        {
-            "animal_id": a.animal_id,
-            "tag_number": a.tag_number,
-            "name": a.name,
-            "breeding_id": br.breeding_id,
-            "expected_calving_date": br.expected_calving_date,
-            "breeding_date": br.breeding_date
-        } for a, br in result.all()
-    ]
+    return [pregnancy_entry(a, br) for a, br in await pregnancies(db, current_user.farmer_id) if is_due_soon(br)]
 
 @router.post("/breeding/{breeding_id}/pregnant/")
 async def mark_breeding_pregnant(
     breeding_id: int, 
     db: AsyncSession = Depends(get_db),
-    current_user: models.Farmer = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_principal)
 ):
     result = await db.execute(
         select(models.BreedingRecord)
@@ -376,6 +613,7 @@ async def mark_breeding_pregnant(
     # Estimate calving date (e.g. 283 days for cows)
     record.expected_calving_date = record.breeding_date + timedelta(days=283)
     
+    await bump_versions(db, current_user.farmer_id, BREEDING)
     await db.commit()
     await db.refresh(record)
     return {"status": "success", "expected_calving_date": record.expected_calving_date}
@@ -384,7 +622,7 @@ async def mark_breeding_pregnant(
 async def mark_breeding_calved(
     breeding_id: int, 
     db: AsyncSession = Depends(get_db),
-    current_user: models.Farmer = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_principal)
 ):
     result = await db.execute(
         select(models.BreedingRecord)
@@ -403,6 +641,7 @@ async def mark_breeding_calved(
     record.actual_calving_date = date.today()
     record.pregnancy_status = "Calved"
     
+    await bump_versions(db, current_user.farmer_id, BREEDING)
     await db.commit()
     await db.refresh(record)
     return {"status": "success"}
@@ -1,60 +1,205 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query, Response, status
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
-from sqlalchemy import func, and_, desc, cast, Float
-from typing import List, Dict
+from sqlalchemy import func, and_, case, desc, cast, literal_column, or_, true, tuple_, Date, Float
+from typing import List, Dict, Optional
 from datetime import date, timedelta
 from decimal import Decimal
 
-from database import get_db
+from read_routing import get_read_db
 import models
 import schemas
-from auth import get_current_user
+from auth import get_current_principal, Principal
+from ownership import require_pen
+from change_versions import conditional_get, ANIMALS, BREEDING, PENS, MILK, WEIGHT, FEED, HEALTH, LABOR, FINANCE
+from metrics import (
+    METRIC_NAMES, INCOME_PREFIX, EXPENSE_PREFIX, METRICS_STALE_HEADER, GAIN_PERIOD_TYPES,
+    metrics_are_fresh, money_entries, period_end, period_start, refresh_metrics_in_background
+)
+from lactation import herd_lactations
 
 router = APIRouter(
     prefix="/reports",
     tags=["Reports"]
 )
 
+def _pen_fcr_query(farmer_id: int, date_from: Optional[date] = None, date_to: Optional[date] = None, pen_id: Optional[int] = None):
+    """
+    Feed eaten, weight gain and average daily gain per pen in one statement.
+    An animal's gain is its last minus its first weighing (within the
+    window) and only counts when positive.
+    """
+    weigh_order = {
+        "partition_by": models.WeightRecord.animal_id,
+        "order_by": (models.WeightRecord.date, models.WeightRecord.weight_id),
+        "rows": (None, None),
+    }
+    weighings = (
+        select(
+            models.Animal.pen_id,
+            models.WeightRecord.animal_id,
+            func.first_value(models.WeightRecord.weight_kg).over(**weigh_order).label("first_kg"),
+            func.last_value(models.WeightRecord.weight_kg).over(**weigh_order).label("last_kg"),
+            func.first_value(models.WeightRecord.date).over(**weigh_order).label("first_date"),
+            func.last_value(models.WeightRecord.date).over(**weigh_order).label("last_date"),
+        )
+        .join(models.Animal, models.Animal.animal_id == models.WeightRecord.animal_id)
+        .where(models.Animal.farmer_id == farmer_id)
+    )
+    feed = (
+        select(models.FeedLog.pen_id, func.sum(models.FeedLog.quantity_kg).label("total_feed_kg"))
+        .join(models.AnimalPen)
+        .where(models.AnimalPen.farmer_id == farmer_id)
+    )
+    pens = select(models.AnimalPen.pen_id, models.AnimalPen.pen_name).where(models.AnimalPen.farmer_id == farmer_id)
+    if pen_id is not None:
+        weighings = weighings.where(models.Animal.pen_id == pen_id)
+        feed = feed.where(models.FeedLog.pen_id == pen_id)
+        pens = pens.where(models.AnimalPen.pen_id == pen_id)
+    if date_from:
+        weighings = weighings.where(models.WeightRecord.date >= date_from)
+        feed = feed.where(models.FeedLog.date >= date_from)
+    if date_to:
+        weighings = weighings.where(models.WeightRecord.date <= date_to)
+        feed = feed.where(models.FeedLog.date <= date_to)
+
+    # One row per animal carrying its first and last weighing
+    per_animal = weighings.distinct().subquery()
+    gaining = per_animal.c.last_kg > per_animal.c.first_kg
+    gains = (
+        select(
+            per_animal.c.pen_id,
+            func.sum(per_animal.c.last_kg - per_animal.c.first_kg).filter(gaining).label("total_gain_kg"),
+            func.sum(per_animal.c.last_date - per_animal.c.first_date).filter(gaining).label("gain_days"),
+            func.count().filter(gaining).label("animals_gaining"),
+        )
+        .group_by(per_animal.c.pen_id)
+        .subquery()
+    )
+    feed = feed.group_by(models.FeedLog.pen_id).subquery()
+    pens = pens.subquery()
+
+    return (
+        select(
+            pens.c.pen_id,
+            pens.c.pen_name,
+            func.coalesce(feed.c.total_feed_kg, 0).label("total_feed_kg"),
+            func.coalesce(gains.c.total_gain_kg, 0).label("total_gain_kg"),
+            gains.c.gain_days,
+            func.coalesce(gains.c.animals_gaining, 0).label("animals_gaining"),
+        )
+        .outerjoin(feed, feed.c.pen_id == pens.c.pen_id)
+        .outerjoin(gains, gains.c.pen_id == pens.c.pen_id)
+        .order_by(pens.c.pen_id)
+    )
+
+def _fcr_entry(pen_id, pen_name, total_feed_kg, total_gain_kg, gain_days, animals_gaining) -> dict:
+    total_feed = float(total_feed_kg)
+    total_gain = float(total_gain_kg)
+    return {
+        "pen_id": pen_id,
+        "pen_name": pen_name,
+        "total_feed_kg": total_feed,
+        "total_gain_kg": total_gain,
+        "fcr": round(total_feed / total_gain, 2) if total_gain else None,
+        # gain_days sums each animal's days between weighings, so this is gain per head per day
+        "adg_kg": round(total_gain / int(gain_days), 3) if gain_days else None,
+        "animals_gaining": int(animals_gaining),
+    }
+
+def _cached_fcr_period(date_from: Optional[date], date_to: Optional[date]) -> Optional[str]:
+    """
+    The cached period type whose single period is exactly [from, to], if any.
+    FCR isn't additive across periods, so only such windows come from the cache.
+    """
+    if date_from is None or date_to is None:
+        return None
+    for period_type in GAIN_PERIOD_TYPES:
+        if period_start(period_type, date_from) == date_from and period_end(period_type, date_from) == date_to:
+            return period_type
+    return None
+
+async def _cached_pen_fcr(db: AsyncSession, farmer_id: int, period_type: str, start: date) -> List[dict]:
+    Cache = models.PerformanceCache
+    result = await db.execute(
+        select(Cache.related_pen_id, Cache.metric_name, Cache.metric_value).where(
+            Cache.farmer_id == farmer_id,
+            Cache.period_type == period_type,
+            Cache.period_start == start,
+            Cache.related_pen_id.is_not(None),
+            Cache.metric_name.in_(("feed_kg", "gain_kg", "gain_days", "animals_gaining")),
+        )
+    )
+    inputs = {}
+    for row in result.all():
+        inputs.setdefault(row.related_pen_id, {})[row.metric_name] = row.metric_value
+    pens = await db.execute(
+        select(models.AnimalPen.pen_id, models.AnimalPen.pen_name)
+        .where(models.AnimalPen.farmer_id == farmer_id)
+        .order_by(models.AnimalPen.pen_id)
+    )
+    entries = []
+    for pen in pens.all():
+        values = inputs.get(pen.pen_id, {})
+        entries.append(_fcr_entry(
+            pen.pen_id, pen.pen_name, values.get("feed_kg", 0), values.get("gain_kg", 0),
+            values.get("gain_days"), values.get("animals_gaining", 0)
+        ))
+    return entries
+
+@router.get("/fcr")
+async def get_farm_fcr(
+    farmer_id: int,
+    background_tasks: BackgroundTasks,
+    date_from: Optional[date] = Query(None, alias="from"),
+    date_to: Optional[date] = Query(None, alias="to"),
+    db: AsyncSession = Depends(get_read_db),
+    current_user: Principal = Depends(get_current_principal)
+):
+    """
+    FCR, total feed, weight gain and ADG for every pen of the farmer, with an
+    optional ?from=&to= window on feed logs and weighings. fcr and adg_kg are
+    null for pens without measurable gain. A window that is exactly one
+    calendar week or month is read from performance_cache when it is fresh.
+    """
+    if current_user.farmer_id != farmer_id:
+        raise HTTPException(status_code=403, detail="Not authorized")
+    if date_from and date_to and date_from > date_to:
+        raise HTTPException(status_code=400, detail="'from' must not be after 'to'")
+
+    period_type = _cached_fcr_period(date_from, date_to)
+    if period_type is not None:
+        if await metrics_are_fresh(db, farmer_id):
+            return {"from": date_from, "to": date_to, "pens": await _cached_pen_fcr(db, farmer_id, period_type, date_from)}
+        background_tasks.add_task(refresh_metrics_in_background, farmer_id)
+
+    result = await db.execute(_pen_fcr_query(farmer_id, date_from, date_to))
+    pens = [
+        _fcr_entry(row.pen_id, row.pen_name, row.total_feed_kg, row.total_gain_kg, row.gain_days, row.animals_gaining)
+        for row in result.all()
+    ]
+    return {"from": date_from, "to": date_to, "pens": pens}
+
 @router.get("/fcr/{pen_id}")
 async def get_pen_fcr(
     pen_id: int, 
-    db: AsyncSession = Depends(get_db), 
-    current_user: models.Farmer = Depends(get_current_user)
+    db: AsyncSession = Depends(get_read_db), 
+    current_user: Principal = Depends(get_current_principal)
 ):
     """
     Calculates Feed Conversion Ratio (FCR) for a specific pen.
     """
     # Verify pen ownership
-    pen_res = await db.execute(select(models.AnimalPen).where(models.AnimalPen.pen_id == pen_id))
-    pen = pen_res.scalars().first()
-    if not pen or pen.farmer_id != current_user.farmer_id:
-        raise HTTPException(status_code=403, detail="Not authorized")
+    await require_pen(db, current_user.farmer_id, pen_id)
 
-    # 1. Total Feed Consumed in this Pen
-    feed_query = select(func.sum(models.FeedLog.quantity_kg)).where(models.FeedLog.pen_id == pen_id)
-    feed_result = await db.execute(feed_query)
-    total_feed = feed_result.scalar() or 0
+    result = await db.execute(_pen_fcr_query(current_user.farmer_id, pen_id=pen_id))
+    row = result.one()
+    total_feed = row.total_feed_kg
+    total_gain = row.total_gain_kg
     
     if total_feed == 0:
         return {"fcr": 0, "message": "No feed records found for this pen."}
 
-    # 2. Total Weight Gain
-    animals_query = select(models.Animal.animal_id).where(models.Animal.pen_id == pen_id)
-    animals_result = await db.execute(animals_query)
-    animal_ids = animals_result.scalars().all()
-    
-    total_gain = 0
-    for a_id in animal_ids:
-        first_w = await db.execute(select(models.WeightRecord.weight_kg).where(models.WeightRecord.animal_id == a_id).order_by(models.WeightRecord.date.asc()).limit(1))
-        last_w = await db.execute(select(models.WeightRecord.weight_kg).where(models.WeightRecord.animal_id == a_id).order_by(models.WeightRecord.date.desc()).limit(1))
-        
-        start = first_w.scalar()
-        end = last_w.scalar()
-        
-        if start and end and end > start:
-            total_gain += (end - start)
-
     if total_gain == 0:
         return {"fcr": 0, "message": "Insufficient weight gain data for calculation."}
     
@@ -66,101 +211,370 @@ async def get_pen_fcr(
         "fcr": round(fcr, 2)
     }
 
+async def mortality_summary(db: AsyncSession, farmer_id: int) -> dict:
+    """Herd size, deaths and mortality rate in one query."""
+    result = await db.execute(
+        select(
+            func.count(models.Animal.animal_id).label("total"),
+            func.count(models.Animal.animal_id).filter(
+                models.Animal.status == "Disposed",
+                models.Animal.disposal_reason == "Deceased"
+            ).label("deceased"),
+        ).where(models.Animal.farmer_id == farmer_id)
+    )
+    row = result.one()
+    if row.total == 0:
+        return {"mortality_rate": 0}
+
+    rate = (row.deceased / row.total) * 100
+    return {
+        "total_animals": row.total,
+        "deceased_count": row.deceased,
+        "mortality_rate": round(rate, 2)
+    }
+
 @router.get("/mortality")
 async def get_mortality_rate(
     farmer_id: int, 
-    db: AsyncSession = Depends(get_db), 
-    current_user: models.Farmer = Depends(get_current_user)
+    db: AsyncSession = Depends(get_read_db), 
+    current_user: Principal = Depends(get_current_principal)
 ):
     if current_user.farmer_id != farmer_id:
         raise HTTPException(status_code=403, detail="Not authorized")
 
-    total_query = select(func.count(models.Animal.animal_id)).where(models.Animal.farmer_id == current_user.farmer_id)
-    total_result = await db.execute(total_query)
-    total_count = total_result.scalar() or 0
-    
-    if total_count == 0:
-        return {"mortality_rate": 0}
+    return await mortality_summary(db, current_user.farmer_id)
 
-    deceased_query = select(func.count(models.Animal.animal_id)).where(
-        and_(
-            models.Animal.farmer_id == current_user.farmer_id,
-            models.Animal.status == "Disposed",
-            models.Animal.disposal_reason == "Deceased"
-        )
+# Expense categories the summary has always reported, kept even when zero
+OPERATIONAL_EXPENSE_CATEGORIES = ("Feeding", "Labor", "Medical", "Breeding", "Acquisition")
+
+def _cached_money_query(farmer_id: int, date_from: Optional[date], date_to: Optional[date], group_by: Optional[str]):
+    """
+    The same (type, category[, period_start], amount) rows as the live
+    query, summed from the income:/expense: metrics in performance_cache.
+    """
+    Cache = models.PerformanceCache
+    # Whole months add up from the Monthly rows, any other window from the Daily ones
+    whole_months = (date_from is None or date_from.day == 1) and (
+        date_to is None or date_to == period_end("Monthly", date_to.replace(day=1))
     )
-    deceased_result = await db.execute(deceased_query)
-    deceased_count = deceased_result.scalar() or 0
-    
-    rate = (deceased_count / total_count) * 100
-    return {
-        "total_animals": total_count,
-        "deceased_count": deceased_count,
-        "mortality_rate": round(rate, 2)
+    keys = [
+        case((Cache.metric_name.startswith(INCOME_PREFIX), "Income"), else_="Expense").label("type"),
+        func.substr(Cache.metric_name, func.strpos(Cache.metric_name, ":") + 1).label("category"),
+    ]
+    if group_by:
+        keys.append(cast(func.date_trunc(group_by, Cache.period_start), Date).label("period_start"))
+    query = select(*keys, func.sum(Cache.metric_value).label("amount")).where(
+        Cache.farmer_id == farmer_id,
+        Cache.period_type == ("Monthly" if whole_months else "Daily"),
+        Cache.related_animal_id.is_(None),
+        Cache.related_pen_id.is_(None),
+        or_(Cache.metric_name.startswith(INCOME_PREFIX), Cache.metric_name.startswith(EXPENSE_PREFIX)),
+    )
+    if date_from:
+        query = query.where(Cache.period_start >= date_from)
+    if date_to:
+        query = query.where(Cache.period_start <= date_to)
+    return query.group_by(*keys)
+
+async def financial_summary(
+    db: AsyncSession,
+    farmer_id: int,
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    group_by: Optional[str] = None,
+    from_cache: Optional[bool] = None
+) -> dict:
+    """
+    Income and expenses by category in one query, optionally per
+    month/quarter/year period. Read from performance_cache when it is fresh
+    (from_cache=None checks), otherwise from the source tables.
+    """
+    if from_cache is None:
+        from_cache = await metrics_are_fresh(db, farmer_id)
+    if from_cache:
+        query = _cached_money_query(farmer_id, date_from, date_to, group_by)
+    else:
+        entries = money_entries(farmer_id, date_from, date_to)
+        keys = [entries.c.type, entries.c.category]
+        if group_by:
+            keys.append(cast(func.date_trunc(group_by, entries.c.date), Date).label("period_start"))
+        query = select(*keys, func.sum(entries.c.amount).label("amount")).group_by(*keys)
+    result = await db.execute(query)
+
+    expenses = dict.fromkeys(OPERATIONAL_EXPENSE_CATEGORIES, Decimal(0))
+    income = {}
+    periods = {}
+    for row in result.all():
+        if row.amount is None:
+            continue
+        side = "income" if row.type == "Income" else "expenses"
+        totals = income if side == "income" else expenses
+        totals[row.category] = totals.get(row.category, Decimal(0)) + row.amount
+        if group_by:
+            period = periods.setdefault(row.period_start, {"income": Decimal(0), "expenses": Decimal(0)})
+            period[side] += row.amount
+
+    total_income = sum(income.values(), Decimal(0))
+    total_expenses = sum(expenses.values(), Decimal(0))
+    summary = {
+        "from": date_from,
+        "to": date_to,
+        "categories": {category: float(amount) for category, amount in expenses.items()},
+        "income_categories": {category: float(amount) for category, amount in income.items()},
+        "total_expenses": float(total_expenses),
+        "total_income": float(total_income),
+        "net": float(total_income - total_expenses),
     }
+    if group_by:
+        summary["group_by"] = group_by
+        summary["periods"] = [
+            {
+                "period_start": period_start,
+                "income": float(totals["income"]),
+                "expenses": float(totals["expenses"]),
+                "net": float(totals["income"] - totals["expenses"]),
+            }
+            for period_start, totals in sorted(periods.items())
+        ]
+    return summary
 
 @router.get("/financial-summary")
 async def get_financial_summary(
     farmer_id: int, 
-    db: AsyncSession = Depends(get_db), 
-    current_user: models.Farmer = Depends(get_current_user)
+    background_tasks: BackgroundTasks,
+    date_from: Optional[date] = Query(None, alias="from"),
+    date_to: Optional[date] = Query(None, alias="to"),
+    group_by: Optional[str] = Query(None, pattern="^(month|quarter|year)$"),
+    db: AsyncSession = Depends(get_read_db), 
+    current_user: Principal = Depends(get_current_principal)
 ):
+    """
+    Income and expenses by category for ?from=&to= (default: all history),
+    in one query. With group_by=month|quarter|year, `periods` also lists
+    income, expenses and net per period.
+    """
     if current_user.farmer_id != farmer_id:
         raise HTTPException(status_code=403, detail="Not authorized")
+    if date_from and date_to and date_from > date_to:
+        raise HTTPException(status_code=400, detail="'from' must not be after 'to'")
+
+    fresh = await metrics_are_fresh(db, farmer_id)
+    if not fresh:
+        background_tasks.add_task(refresh_metrics_in_background, farmer_id)
+    return await financial_summary(db, farmer_id, date_from, date_to, group_by, from_cache=fresh)
 
-    summary = {}
+BREEDING_METHODS = ("Natural", "AI")
+# A service counts as a conception once the pregnancy is confirmed or the cow calved
+CONCEIVED_STATUSES = ("Pregnant", "Confirmed", "Calved")
 
-    # 1. Existing Expense Transactions from FinancialTransaction table
-    finance_query = select(
-        models.FinancialTransaction.category,
-        func.sum(models.FinancialTransaction.amount).label("total_amount")
-    ).where(
-        and_(
-            models.FinancialTransaction.farmer_id == current_user.farmer_id,
-            models.FinancialTransaction.type == "Expense"
+def _reproduction_query(farmer_id: int, date_from: Optional[date], date_to: Optional[date]):
+    """
+    Reproductive KPIs for the herd, each pen and each breed in one statement.
+    Window functions walk every cow's full breeding history once; the
+    ?from=&to= window then selects which events are counted (services and
+    days open by breeding date, calvings by calving date).
+    """
+    B, A = models.BreedingRecord, models.Animal
+    history = {
+        "partition_by": B.female_id,
+        "order_by": (B.breeding_date, B.breeding_id),
+    }
+    conceived = B.pregnancy_status.in_(CONCEIVED_STATUSES) | B.actual_calving_date.is_not(None)
+    services = (
+        select(
+            A.pen_id,
+            models.AnimalPen.pen_name,
+            A.breed,
+            B.breeding_method,
+            B.breeding_date,
+            B.actual_calving_date,
+            conceived.label("conceived"),
+            (conceived | (B.pregnancy_status == "Failed")).label("resolved"),
+            # Latest calving before this service; calving dates rise with breeding dates
+            func.max(B.actual_calving_date).over(**history, rows=(None, -1)).label("previous_calving"),
+            func.min(B.actual_calving_date).over(partition_by=B.female_id).label("first_calving"),
+            A.birth_date,
         )
-    ).group_by(models.FinancialTransaction.category)
-    
-    finance_res = await db.execute(finance_query)
-    for row in finance_res.all():
-        summary[row.category] = float(row.total_amount)
-
-    # 2. Feed Costs (Pen FeedLogs)
-    # Join with AnimalPen to filter by farmer_id
-    feed_query = select(func.sum(models.FeedLog.total_cost)).join(models.AnimalPen).where(models.AnimalPen.farmer_id == farmer_id)
-    feed_res = await db.execute(feed_query)
-    feed_total = feed_res.scalar() or 0
-    summary["Feeding"] = summary.get("Feeding", 0) + float(feed_total)
-
-    # 3. Labor Costs
-    labor_query = select(func.sum(models.LaborActivity.labor_cost)).where(models.LaborActivity.farmer_id == farmer_id)
-    labor_res = await db.execute(labor_query)
-    labor_total = labor_res.scalar() or 0
-    summary["Labor"] = summary.get("Labor", 0) + float(labor_total)
-
-    # 4. Health/Medical Costs
-    # Join with Animal to filter by farmer_id
-    health_query = select(func.sum(models.HealthRecord.cost)).join(models.Animal).where(models.Animal.farmer_id == farmer_id)
-    health_res = await db.execute(health_query)
-    health_total = health_res.scalar() or 0
-    summary["Medical"] = summary.get("Medical", 0) + float(health_total)
-
-    # 5. Breeding Costs
-    # Join with Animal to filter by farmer_id (using female animal)
-    breeding_query = select(func.sum(models.BreedingRecord.cost)).join(models.Animal, models.BreedingRecord.female_id == models.Animal.animal_id).where(models.Animal.farmer_id == farmer_id)
-    breeding_res = await db.execute(breeding_query)
-    breeding_total = breeding_res.scalar() or 0
-    summary["Breeding"] = summary.get("Breeding", 0) + float(breeding_total)
-
-    # 6. Animal Acquisition Costs
-    acquisition_query = select(func.sum(models.Animal.acquisition_cost)).where(models.Animal.farmer_id == farmer_id)
-    acquisition_res = await db.execute(acquisition_query)
-    acquisition_total = acquisition_res.scalar() or 0
-    summary["Acquisition"] = summary.get("Acquisition", 0) + float(acquisition_total)
-
-    total_expenses = sum(summary.values())
-    
+        .join(A, A.animal_id == B.female_id)
+        .join(models.AnimalPen, models.AnimalPen.pen_id == A.pen_id)
+        .where(A.farmer_id == farmer_id)
+        .subquery()
+    )
+
+    def in_window(column):
+        condition = true()
+        if date_from:
+            condition = condition & (column >= date_from)
+        if date_to:
+            condition = condition & (column <= date_to)
+        return condition
+
+    s = services.c
+    serviced = in_window(s.breeding_date)
+    calved = s.actual_calving_date.is_not(None) & in_window(s.actual_calving_date)
+    columns = [
+        func.count().filter(serviced).label("services"),
+        func.count().filter(serviced, s.resolved).label("resolved"),
+        func.count().filter(serviced, s.conceived).label("conceptions"),
+        func.count().filter(calved).label("calvings"),
+        func.avg(s.actual_calving_date - s.previous_calving).filter(calved).label("calving_interval_days"),
+        func.avg(s.breeding_date - s.previous_calving).filter(serviced, s.conceived).label("days_open"),
+        func.avg(s.actual_calving_date - s.birth_date).filter(calved, s.actual_calving_date == s.first_calving).label("age_at_first_calving_days"),
+    ]
+    for method in BREEDING_METHODS:
+        by_method = s.breeding_method == method
+        columns += [
+            func.count().filter(serviced, s.resolved, by_method).label(f"resolved_{method}"),
+            func.count().filter(serviced, s.conceived, by_method).label(f"conceptions_{method}"),
+        ]
+
+    return (
+        select(
+            func.grouping(s.pen_id, s.breed).label("grouping"),
+            s.pen_id,
+            s.pen_name,
+            s.breed,
+            *columns
+        )
+        .group_by(func.grouping_sets(literal_column("()"), tuple_(s.pen_id, s.pen_name), s.breed))
+    )
+
+def _reproduction_kpis(row) -> dict:
+    def rate(conceptions, resolved):
+        return round(conceptions / resolved * 100, 1) if resolved else None
+
+    def days(value):
+        return round(float(value), 1) if value is not None else None
+
+    return {
+        "services": row.services,
+        "conceptions": row.conceptions,
+        "pending_diagnosis": row.services - row.resolved,
+        "conception_rate": rate(row.conceptions, row.resolved),
+        "conception_rate_by_method": {
+            method: rate(getattr(row, f"conceptions_{method}"), getattr(row, f"resolved_{method}"))
+            for method in BREEDING_METHODS
+        },
+        "services_per_conception": round(row.resolved / row.conceptions, 2) if row.conceptions else None,
+        "calvings": row.calvings,
+        "calving_interval_days": days(row.calving_interval_days),
+        "days_open": days(row.days_open),
+        "age_at_first_calving_days": days(row.age_at_first_calving_days),
+    }
+
+@router.get("/reproduction", dependencies=[Depends(conditional_get(BREEDING, ANIMALS, db_dependency=get_read_db))])
+async def get_reproduction_kpis(
+    farmer_id: int,
+    date_from: Optional[date] = Query(None, alias="from"),
+    date_to: Optional[date] = Query(None, alias="to"),
+    db: AsyncSession = Depends(get_read_db),
+    current_user: Principal = Depends(get_current_principal)
+):
+    """
+    Conception rate (overall and by method), services per conception,
+    calving interval, days open and age at first calving for the herd,
+    per pen and per breed. Rates only count services with a known result;
+    pens are the cows' current pens.
+    """
+    if current_user.farmer_id != farmer_id:
+        raise HTTPException(status_code=403, detail="Not authorized")
+    if date_from and date_to and date_from > date_to:
+        raise HTTPException(status_code=400, detail="'from' must not be after 'to'")
+
+    result = await db.execute(_reproduction_query(farmer_id, date_from, date_to))
+    herd, pens, breeds = None, [], []
+    for row in result.all():
+        # grouping() sets a bit for each column rolled up in that row
+        if row.grouping == 3:
+            herd = _reproduction_kpis(row)
+        elif row.grouping == 1:
+            pens.append({"pen_id": row.pen_id, "pen_name": row.pen_name, **_reproduction_kpis(row)})
+        else:
+            breeds.append({"breed": row.breed, **_reproduction_kpis(row)})
+
     return {
-        "categories": summary,
-        "total_expenses": total_expenses
+        "from": date_from,
+        "to": date_to,
+        "herd": herd,
+        "pens": sorted(pens, key=lambda pen: pen["pen_id"]),
+        "breeds": sorted(breeds, key=lambda breed: breed["breed"]),
     }
+
+@router.get("/lactation", dependencies=[Depends(conditional_get(MILK, BREEDING, ANIMALS, db_dependency=get_read_db))])
+async def get_lactation_curves(
+    farmer_id: int,
+    animal_id: Optional[int] = None,
+    db: AsyncSession = Depends(get_read_db),
+    current_user: Principal = Depends(get_current_principal)
+):
+    """
+    Current-lactation analytics for each active cow with a recorded calving:
+    days in milk, observed peak, fitted Wood curve (a, b, c), fitted peak
+    day, persistency (yield 100 days after the peak as % of the peak) and
+    projected 305-day yield.
+    """
+    if current_user.farmer_id != farmer_id:
+        raise HTTPException(status_code=403, detail="Not authorized")
+
+    return {"as_of": date.today(), "animals": await herd_lactations(db, farmer_id, animal_id)}
+
+@router.get(
+    "/metrics",
+    response_model=List[schemas.PerformanceCache],
+    dependencies=[Depends(conditional_get(ANIMALS, PENS, MILK, WEIGHT, FEED, HEALTH, LABOR, FINANCE, BREEDING, db_dependency=get_read_db))]
+)
+async def get_metrics(
+    farmer_id: int,
+    response: Response,
+    background_tasks: BackgroundTasks,
+    metric: Optional[str] = Query(None, pattern="^(" + "|".join(METRIC_NAMES) + f"|{INCOME_PREFIX}.+|{EXPENSE_PREFIX}.+)$"),
+    period: str = Query("Monthly", pattern="^(Daily|Weekly|Monthly)$"),
+    scope: Optional[str] = Query(None, pattern="^(farm|pen|animal)$"),
+    animal_id: Optional[int] = None,
+    pen_id: Optional[int] = None,
+    date_from: Optional[date] = Query(None, alias="from"),
+    date_to: Optional[date] = Query(None, alias="to"),
+    db: AsyncSession = Depends(get_read_db),
+    current_user: Principal = Depends(get_current_principal)
+):
+    """
+    Precomputed daily/weekly/monthly metrics from performance_cache.
+    scope=farm returns farm totals only. When records changed since the
+    last refresh, the rows as last materialized are returned with
+    X-Metrics-Stale: true and a refresh runs after the response.
+    """
+    if current_user.farmer_id != farmer_id:
+        raise HTTPException(status_code=403, detail="Not authorized")
+    if date_from and date_to and date_from > date_to:
+        raise HTTPException(status_code=400, detail="'from' must not be after 'to'")
+
+    if not await metrics_are_fresh(db, farmer_id):
+        background_tasks.add_task(refresh_metrics_in_background, farmer_id)
+        response.headers[METRICS_STALE_HEADER] = "true"
+        # The ETag tracks the source records, not the refresh: stale rows must not be revalidated
+        del response.headers["ETag"]
+        response.headers["Cache-Control"] = "no-store"
+
+    Cache = models.PerformanceCache
+    query = select(Cache).where(Cache.farmer_id == farmer_id, Cache.period_type == period)
+    if metric:
+        query = query.where(Cache.metric_name == metric)
+    if scope == "farm":
+        query = query.where(Cache.related_animal_id.is_(None), Cache.related_pen_id.is_(None))
+    elif scope == "pen":
+        query = query.where(Cache.related_pen_id.is_not(None))
+    elif scope == "animal":
+        query = query.where(Cache.related_animal_id.is_not(None))
+    if animal_id is not None:
+        query = query.where(Cache.related_animal_id == animal_id)
+    if pen_id is not None:
+        query = query.where(Cache.related_pen_id == pen_id)
+    # A period is included when it overlaps the window
+    if date_from:
+        query = query.where(Cache.period_end >= date_from)
+    if date_to:
+        query = query.where(Cache.period_start <= date_to)
+    result = await db.execute(query.order_by(
+        Cache.period_start, Cache.metric_name, Cache.related_pen_id.nulls_first(), Cache.related_animal_id.nulls_first()
+    ))
+    return result.scalars().all()
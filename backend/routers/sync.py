@@ -0,0 +1,103 @@
+import os
+from typing import Dict, List, Optional
+
+from fastapi import APIRouter, Depends, Query
+from pydantic import BaseModel
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+from read_routing import get_read_db
+from change_log import START, decode_position, encode_position, settled_after
+import models
+import schemas
+from auth import get_current_principal, Principal
+
+router = APIRouter(
+    prefix="/sync",
+    tags=["Sync"]
+)
+
+MAX_SYNC_BATCH = int(os.getenv("MAX_SYNC_BATCH", "5000"))
+
+# change_log.table_name -> (model, response schema)
+SYNCED_TABLES = {
+    "animal_pen": (models.AnimalPen, schemas.AnimalPen),
+    "animal": (models.Animal, schemas.Animal),
+    "milk_production": (models.MilkProduction, schemas.MilkProduction),
+    "weight_record": (models.WeightRecord, schemas.WeightRecord),
+    "breeding_record": (models.BreedingRecord, schemas.BreedingRecord),
+    "health_record": (models.HealthRecord, schemas.HealthRecord),
+    "feed_log": (models.FeedLog, schemas.FeedLog),
+    "individual_feed_log": (models.IndividualFeedLog, schemas.IndividualFeedLog),
+    "labor_activity": (models.LaborActivity, schemas.LaborActivity),
+    "financial_transaction": (models.FinancialTransaction, schemas.FinancialTransaction),
+}
+
+
+class TableChanges(BaseModel):
+    upserts: List[dict] = []
+    deleted: List[int] = []
+
+
+class SyncChanges(BaseModel):
+    cursor: str
+    has_more: bool
+    changes: Dict[str, TableChanges]
+
+
+@router.get("/changes", response_model=SyncChanges)
+async def get_changes(
+    since: Optional[str] = Query(None, description="cursor from the previous response; omit for a full sync"),
+    limit: int = Query(1000, ge=1, le=MAX_SYNC_BATCH),
+    db: AsyncSession = Depends(get_read_db),
+    current_user: Principal = Depends(get_current_principal)
+):
+    """
+    Rows created, updated or deleted since `since`, newest state only.
+    Keep calling with the returned cursor while has_more is true. A deleted
+    animal or pen implies its dependent records are gone as well. Changes
+    from transactions still in flight are left for the next call.
+    """
+    Log = models.ChangeLog
+    after = decode_position(since) if since else START
+    log = await db.execute(
+        select(Log.txid, Log.seq, Log.table_name, Log.row_id, Log.op)
+        .where(*settled_after(current_user.farmer_id, after))
+        .order_by(Log.txid, Log.seq)
+        .limit(limit + 1)
+    )
+    entries = log.all()
+    has_more = len(entries) > limit
+    entries = entries[:limit]
+
+    # Several changes to one row collapse into its last operation
+    latest_op = {}
+    for entry in entries:
+        latest_op[(entry.table_name, entry.row_id)] = entry.op
+
+    live_ids, deleted_ids = {}, {}
+    for (table_name, row_id), op in latest_op.items():
+        target = deleted_ids if op == "D" else live_ids
+        target.setdefault(table_name, set()).add(row_id)
+
+    changes = {}
+    for table_name, (model, schema) in SYNCED_TABLES.items():
+        ids = live_ids.get(table_name, set())
+        deleted = deleted_ids.get(table_name, set())
+        upserts = []
+        if ids:
+            primary_key = model.__mapper__.primary_key[0]
+            result = await db.execute(select(model).where(primary_key.in_(list(ids))))
+            for row in result.scalars().all():
+                upserts.append(schema.model_validate(row).model_dump(mode="json"))
+                ids.discard(getattr(row, primary_key.key))
+            # Rows logged in this batch but deleted since are sent as tombstones now
+            deleted |= ids
+        if upserts or deleted:
+            changes[table_name] = TableChanges(upserts=upserts, deleted=sorted(deleted))
+
+    return SyncChanges(
+        cursor=encode_position((entries[-1].txid, entries[-1].seq) if entries else after),
+        has_more=has_more,
+        changes=changes
+    )
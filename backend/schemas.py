@@ -1,4 +1,4 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from typing import Optional, List
 from datetime import date, datetime
 from decimal import Decimal
@@ -62,6 +62,16 @@ class AnimalBase(BaseModel):
 class AnimalCreate(AnimalBase):
     pass
 
+class AnimalImportRejection(BaseModel):
+    row: int # 1-based position in the CSV, excluding the header
+    tag_number: Optional[str] = None
+    detail: str
+
+class AnimalImportResult(BaseModel):
+    imported: int
+    ledger_entries: int
+    rejected: List[AnimalImportRejection]
+
 class AnimalUpdate(BaseModel):
     farmer_id: Optional[int] = None
     pen_id: Optional[int] = None
@@ -115,6 +125,25 @@ class MilkProduction(MilkProductionBase):
     class Config:
         from_attributes = True
 
+class MilkSessionEntry(BaseModel):
+    animal_id: int
+    morning_yield: Optional[Decimal] = None
+    evening_yield: Optional[Decimal] = None
+    fat_content: Optional[Decimal] = None
+    protein_content: Optional[Decimal] = None
+    somatic_cell_count: Optional[int] = None
+    quality_notes: Optional[str] = None
+
+class MilkSessionBatch(BaseModel):
+    date: date
+    records: List[MilkSessionEntry] = Field(..., min_length=1, max_length=2000)
+
+class MilkBatchResult(BaseModel):
+    animal_id: int
+    status: str # "created", "updated" or "rejected"
+    production_id: Optional[int] = None
+    detail: Optional[str] = None
+
 # --- WEIGHT RECORD SCHEMAS ---
 class WeightRecordBase(BaseModel):
     animal_id: int
@@ -133,6 +162,16 @@ class WeightRecord(WeightRecordBase):
     class Config:
         from_attributes = True
 
+class WeightImportRejection(BaseModel):
+    row: int # 1-based position in the import, excluding the CSV header
+    tag_number: Optional[str] = None
+    detail: str
+
+class WeightImportResult(BaseModel):
+    imported: int
+    unmatched_tags: List[str]
+    rejected: List[WeightImportRejection]
+
 # --- BREEDING RECORD SCHEMAS ---
 class BreedingRecordBase(BaseModel):
     female_id: int
@@ -320,3 +359,18 @@ class Alert(AlertBase):
 
     class Config:
         from_attributes = True
+
+# --- OFFLINE BATCH SCHEMAS ---
+class BatchOperation(BaseModel):
+    client_id: str = Field(..., min_length=1, max_length=100) # generated by the app when the entry was queued
+    type: str  # milk, weight, pen_feed, individual_feed, labor, health
+    data: dict # body of the matching single-create endpoint
+
+class BatchRequest(BaseModel):
+    operations: List[BatchOperation] = Field(..., min_length=1, max_length=500)
+
+class BatchOperationResult(BaseModel):
+    client_id: str
+    status: str  # created, rejected
+    id: Optional[int] = None
+    detail: Optional[str] = None
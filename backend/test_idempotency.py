@@ -0,0 +1,89 @@
+import asyncio
+import json
+import uuid
+from datetime import timedelta
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy import func, select
+
+import models
+from database import SessionLocal
+from idempotency import IDEMPOTENCY_KEY_HEADER, REPLAYED_HEADER, _request_hash
+
+pytestmark = pytest.mark.anyio
+
+
+async def _weight_count(animal_id: int) -> int:
+    async with SessionLocal() as db:
+        return await db.scalar(select(func.count()).where(models.WeightRecord.animal_id == animal_id))
+
+
+async def _pending_key(farmer_id: int, key: str, path: str, body: bytes, lease: timedelta):
+    """A key left pending by a request that never finished, e.g. a worker that died."""
+    request = SimpleNamespace(method="POST", url=SimpleNamespace(path=path, query=""))
+    async with SessionLocal() as db:
+        db.add(models.IdempotencyKey(
+            farmer_id=farmer_id, idempotency_key=key, request_hash=_request_hash(request, body),
+            expires_at=func.now() + timedelta(days=1), lease_expires_at=func.now() + lease,
+        ))
+        await db.commit()
+
+
+async def test_retry_replays_the_stored_response(client, farmer, make_animal):
+    animal_id = await make_animal(farmer)
+    headers = {**farmer.headers, IDEMPOTENCY_KEY_HEADER: str(uuid.uuid4())}
+    body = {"animal_id": animal_id, "date": "2026-05-01", "weight_kg": "410"}
+
+    first = await client.post("/production/weight", headers=headers, json=body)
+    retry = await client.post("/production/weight", headers=headers, json=body)
+    assert first.status_code == retry.status_code == 201
+    assert REPLAYED_HEADER.lower() not in first.headers and retry.headers[REPLAYED_HEADER] == "true"
+    assert retry.content == first.content
+    assert await _weight_count(animal_id) == 1
+
+    changed = await client.post("/production/weight", headers=headers, json={**body, "weight_kg": "420"})
+    assert changed.status_code == 422
+    assert await _weight_count(animal_id) == 1
+
+
+async def test_concurrent_retries_write_once(client, farmer, make_animal):
+    animal_id = await make_animal(farmer)
+    headers = {**farmer.headers, IDEMPOTENCY_KEY_HEADER: str(uuid.uuid4())}
+    body = {"animal_id": animal_id, "date": "2026-05-01", "weight_kg": "410"}
+
+    responses = await asyncio.gather(*(client.post("/production/weight", headers=headers, json=body) for _ in range(4)))
+    originals = [r for r in responses if r.status_code == 201 and REPLAYED_HEADER.lower() not in r.headers]
+    assert len(originals) == 1
+    for response in responses:
+        if response.status_code == 409:
+            assert int(response.headers["Retry-After"]) >= 1
+        else:
+            assert response.status_code == 201
+    assert await _weight_count(animal_id) == 1
+
+
+async def test_pending_key_is_taken_over_once_its_lease_runs_out(client, farmer, make_animal):
+    animal_id = await make_animal(farmer)
+    body = json.dumps({"animal_id": animal_id, "date": "2026-05-01", "weight_kg": "410"}).encode()
+    headers = {**farmer.headers, "Content-Type": "application/json"}
+
+    held = str(uuid.uuid4())
+    await _pending_key(farmer.farmer_id, held, "/production/weight", body, timedelta(minutes=1))
+    response = await client.post("/production/weight", headers={**headers, IDEMPOTENCY_KEY_HEADER: held}, content=body)
+    assert response.status_code == 409 and 1 <= int(response.headers["Retry-After"]) <= 60
+
+    abandoned = str(uuid.uuid4())
+    await _pending_key(farmer.farmer_id, abandoned, "/production/weight", body, timedelta(minutes=-1))
+    response = await client.post("/production/weight", headers={**headers, IDEMPOTENCY_KEY_HEADER: abandoned}, content=body)
+    assert response.status_code == 201
+    assert await _weight_count(animal_id) == 1
+
+
+async def test_keys_are_not_applied_to_login_or_anonymous_requests(client, farmer):
+    key = str(uuid.uuid4())
+    response = await client.post("/farmers/token", headers={IDEMPOTENCY_KEY_HEADER: key}, data={"username": "nobody", "password": "x"})
+    assert response.status_code == 401 and REPLAYED_HEADER.lower() not in response.headers
+
+    response = await client.post("/health/", headers={IDEMPOTENCY_KEY_HEADER: key}, json={})
+    assert response.status_code == 401 and REPLAYED_HEADER.lower() not in response.headers
@@ -0,0 +1,105 @@
+from datetime import date
+from decimal import Decimal
+
+import pytest
+from sqlalchemy import text
+from sqlalchemy.future import select
+
+import models
+from database import SessionLocal, engine
+from metrics import METRICS_STALE_HEADER, metrics_are_fresh, refresh_metrics
+from routers.reports import financial_summary
+
+pytestmark = pytest.mark.anyio
+
+INSERT_MILK = text("INSERT INTO milk_production (animal_id, date, morning_yield) VALUES (:animal_id, :day, :litres)")
+BUMP_MILK_VERSION = text("""
+    INSERT INTO change_version (farmer_id, dataset, version) VALUES (:farmer_id, 'milk', 1)
+    ON CONFLICT (farmer_id, dataset) DO UPDATE SET version = change_version.version + 1
+""")
+
+
+async def _refresh(farmer_id: int):
+    async with SessionLocal() as db:
+        if await refresh_metrics(db, farmer_id):
+            await db.commit()
+
+
+async def _fresh(farmer_id: int) -> bool:
+    async with SessionLocal() as db:
+        return await metrics_are_fresh(db, farmer_id)
+
+
+async def _daily_farm_milk(farmer_id: int) -> dict:
+    Cache = models.PerformanceCache
+    async with SessionLocal() as db:
+        rows = await db.execute(
+            select(Cache.period_start, Cache.metric_value).where(
+                Cache.farmer_id == farmer_id, Cache.metric_name == "milk_yield", Cache.period_type == "Daily",
+                Cache.related_animal_id.is_(None), Cache.related_pen_id.is_(None),
+            )
+        )
+        return {str(day): value for day, value in rows.all()}
+
+
+async def test_change_committing_behind_a_refresh_is_folded_in(client, farmer, make_animal):
+    animal_id = await make_animal(farmer)
+    await _refresh(farmer.farmer_id)
+    assert await _fresh(farmer.farmer_id)
+
+    async with engine.connect() as first_writer, engine.connect() as second_writer:
+        # The second writer takes its txid first but logs its entry last
+        await second_writer.execute(BUMP_MILK_VERSION, {"farmer_id": farmer.farmer_id})
+        await first_writer.execute(INSERT_MILK, {"animal_id": animal_id, "day": date(2026, 3, 1), "litres": 11})
+        await second_writer.execute(INSERT_MILK, {"animal_id": animal_id, "day": date(2026, 3, 2), "litres": 12})
+        await second_writer.commit()
+
+        await _refresh(farmer.farmer_id)
+        assert await _daily_farm_milk(farmer.farmer_id) == {"2026-03-02": Decimal("12.00")}
+
+        await first_writer.commit()
+
+    assert not await _fresh(farmer.farmer_id)
+    await _refresh(farmer.farmer_id)
+    assert await _fresh(farmer.farmer_id)
+    assert await _daily_farm_milk(farmer.farmer_id) == {"2026-03-01": Decimal("11.00"), "2026-03-02": Decimal("12.00")}
+
+
+async def test_new_transaction_changes_the_metrics_etag(client, farmer):
+    await _refresh(farmer.farmer_id)
+    url = f"/reports/metrics?farmer_id={farmer.farmer_id}&period=Monthly"
+    first = await client.get(url, headers=farmer.headers)
+    assert first.status_code == 200 and METRICS_STALE_HEADER not in first.headers
+    etag = first.headers["etag"]
+    assert (await client.get(url, headers={**farmer.headers, "If-None-Match": etag})).status_code == 304
+
+    response = await client.post("/finance/", headers=farmer.headers, json={
+        "farmer_id": farmer.farmer_id, "type": "Income", "category": "Milk Sales",
+        "description": "Milk cheque", "amount": "250.00", "date": "2026-03-05",
+    })
+    assert response.status_code == 201, response.text
+
+    # Served stale, with the refresh run after the response
+    stale = await client.get(url, headers={**farmer.headers, "If-None-Match": etag})
+    assert stale.status_code == 200 and stale.headers[METRICS_STALE_HEADER] == "true"
+    fresh = await client.get(url, headers={**farmer.headers, "If-None-Match": etag})
+    assert fresh.status_code == 200 and fresh.headers["etag"] != etag
+    income = {row["metric_name"]: Decimal(row["metric_value"]) for row in fresh.json() if row["period_start"] == "2026-03-01"}
+    assert income["income:Milk Sales"] == Decimal("250.00")
+
+
+async def test_cached_financial_summary_matches_the_ledger(client, farmer, make_animal):
+    await make_animal(farmer, acquisition_cost="900.00")
+    for category, kind, amount, day in (("Milk Sales", "Income", "300.00", "2026-01-10"), ("Transport", "Expense", "40.00", "2026-02-03")):
+        response = await client.post("/finance/", headers=farmer.headers, json={
+            "farmer_id": farmer.farmer_id, "type": kind, "category": category,
+            "description": category, "amount": amount, "date": day,
+        })
+        assert response.status_code == 201, response.text
+    await _refresh(farmer.farmer_id)
+
+    async with SessionLocal() as db:
+        for window in ({}, {"date_from": date(2026, 1, 1), "date_to": date(2026, 1, 31), "group_by": "month"}):
+            cached = await financial_summary(db, farmer.farmer_id, from_cache=True, **window)
+            live = await financial_summary(db, farmer.farmer_id, from_cache=False, **window)
+            assert cached == live
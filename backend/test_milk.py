@@ -0,0 +1,67 @@
+import asyncio
+from decimal import Decimal
+
+import pytest
+from sqlalchemy import select
+
+import models
+from database import SessionLocal
+
+pytestmark = pytest.mark.anyio
+
+
+async def _milk_rows(animal_id: int):
+    async with SessionLocal() as db:
+        result = await db.execute(select(models.MilkProduction).where(models.MilkProduction.animal_id == animal_id))
+        return result.scalars().all()
+
+
+async def test_second_session_merges_into_the_days_row(client, farmer, make_animal):
+    animal_id = await make_animal(farmer)
+    morning = await client.post("/production/milk", headers=farmer.headers, json={
+        "animal_id": animal_id, "date": "2026-05-01", "morning_yield": "10.5", "fat_content": "3.9",
+    })
+    evening = await client.post("/production/milk", headers=farmer.headers, json={
+        "animal_id": animal_id, "date": "2026-05-01", "evening_yield": "8",
+    })
+    assert (morning.status_code, evening.status_code) == (201, 200)
+    assert evening.json()["production_id"] == morning.json()["production_id"]
+
+    [row] = await _milk_rows(animal_id)
+    assert (row.morning_yield, row.evening_yield, row.fat_content) == (Decimal("10.50"), Decimal("8.00"), Decimal("3.90"))
+    assert row.total_yield == Decimal("18.50")
+
+
+async def test_concurrent_sessions_end_in_one_row(client, farmer, make_animal):
+    animal_id = await make_animal(farmer)
+    responses = await asyncio.gather(
+        client.post("/production/milk", headers=farmer.headers, json={"animal_id": animal_id, "date": "2026-05-02", "morning_yield": "11"}),
+        client.post("/production/milk", headers=farmer.headers, json={"animal_id": animal_id, "date": "2026-05-02", "evening_yield": "9"}),
+    )
+    assert sorted(r.status_code for r in responses) == [200, 201]
+
+    [row] = await _milk_rows(animal_id)
+    assert (row.morning_yield, row.evening_yield) == (Decimal("11.00"), Decimal("9.00"))
+
+
+async def test_session_batches_upsert_per_animal(client, farmer, make_animal):
+    first, second = await make_animal(farmer), await make_animal(farmer)
+    morning = await client.post("/production/milk/batch", headers=farmer.headers, json={"date": "2026-05-03", "records": [
+        {"animal_id": first, "morning_yield": "12"},
+        {"animal_id": second, "morning_yield": "7"},
+        {"animal_id": second, "fat_content": "4.1"},
+        {"animal_id": first, "fat_content": "11"},
+    ]})
+    assert morning.status_code == 200
+    assert [r["status"] for r in morning.json()] == ["created", "created", "created", "rejected"]
+
+    evening = await client.post("/production/milk/batch", headers=farmer.headers, json={"date": "2026-05-03", "records": [
+        {"animal_id": first, "evening_yield": "10"},
+        {"animal_id": 0, "evening_yield": "10"},
+    ]})
+    assert [r["status"] for r in evening.json()] == ["updated", "rejected"]
+
+    [row] = await _milk_rows(first)
+    assert (row.morning_yield, row.evening_yield, row.fat_content) == (Decimal("12.00"), Decimal("10.00"), None)
+    [row] = await _milk_rows(second)
+    assert (row.morning_yield, row.evening_yield, row.fat_content) == (Decimal("7.00"), None, Decimal("4.10"))
@@ -0,0 +1,58 @@
+import uuid
+
+import pytest
+
+from query_stats import assert_no_n_plus_one
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture
+def grow_herd(client, farmer, make_animal):
+    """seed(n) for assert_no_n_plus_one: n more cows in the farmer's pen, each with records."""
+    async def seed(n: int):
+        operations = [{
+            "client_id": uuid.uuid4().hex, "type": "pen_feed",
+            "data": {"pen_id": farmer.pen_id, "feed_type": "Hay", "quantity_kg": "50", "cost_per_kg": "1.20", "date": "2026-04-01"},
+        }]
+        for _ in range(n):
+            animal_id = await make_animal(farmer)
+            for day, kg in (("2026-04-01", "300"), ("2026-04-20", "315")):
+                operations.append({"client_id": uuid.uuid4().hex, "type": "weight", "data": {"animal_id": animal_id, "date": day, "weight_kg": kg}})
+            operations.append({"client_id": uuid.uuid4().hex, "type": "milk", "data": {"animal_id": animal_id, "date": "2026-04-02", "morning_yield": "9"}})
+            operations.append({"client_id": uuid.uuid4().hex, "type": "health", "data": {
+                "animal_id": animal_id, "date": "2026-04-03", "condition": "Mastitis", "symptoms": "Swelling",
+                "treatment": "Antibiotics", "cost": "15",
+            }})
+        response = await client.post("/batch/", headers=farmer.headers, json={"operations": operations})
+        assert response.status_code == 200 and all(r["status"] == "created" for r in response.json()), response.text
+    return seed
+
+
+def _get(client, farmer, url):
+    async def call():
+        response = await client.get(url, headers=farmer.headers)
+        assert response.status_code == 200, response.text
+    return call
+
+
+async def test_pen_fcr_query_count_is_flat(client, farmer, grow_herd):
+    await assert_no_n_plus_one(grow_herd, _get(client, farmer, f"/reports/fcr/{farmer.pen_id}"), label="pen FCR")
+
+
+async def test_farm_fcr_query_count_is_flat(client, farmer, grow_herd):
+    url = f"/reports/fcr?farmer_id={farmer.farmer_id}&from=2026-04-01&to=2026-04-30"
+    await assert_no_n_plus_one(grow_herd, _get(client, farmer, url), label="farm FCR")
+
+
+async def test_dashboard_query_count_is_flat(client, farmer, grow_herd):
+    await assert_no_n_plus_one(grow_herd, _get(client, farmer, f"/dashboard?farmer_id={farmer.farmer_id}"), label="dashboard")
+
+
+async def test_alerts_are_raised_once_per_sick_animal(client, farmer, grow_herd):
+    await grow_herd(3)
+    for _ in range(2):
+        response = await client.get(f"/alerts/?farmer_id={farmer.farmer_id}", headers=farmer.headers)
+        assert response.status_code == 200
+        untreated = [alert for alert in response.json() if alert["title"] == "Untreated Illness"]
+        assert len(untreated) == len({alert["related_animal_id"] for alert in untreated}) == 3
@@ -0,0 +1,91 @@
+import pytest
+from sqlalchemy import text
+
+from database import engine
+
+pytestmark = pytest.mark.anyio
+
+INSERT_WEIGHT = text(
+    "INSERT INTO weight_record (animal_id, date, weight_kg) VALUES (:animal_id, '2026-05-01', :kg) RETURNING weight_id"
+)
+# What bump_versions does first in every write request: it gives the
+# transaction its txid before any change_log row is written
+BUMP_WEIGHT_VERSION = text("""
+    INSERT INTO change_version (farmer_id, dataset, version) VALUES (:farmer_id, 'weight', 1)
+    ON CONFLICT (farmer_id, dataset) DO UPDATE SET version = change_version.version + 1
+""")
+LATEST_ENTRY = text("""
+    SELECT txid::text::bigint AS txid, seq FROM change_log
+    WHERE table_name = 'weight_record' AND row_id = :row_id ORDER BY seq DESC LIMIT 1
+""")
+
+
+async def _sync_all(client, farmer, cursor=None):
+    """Follows has_more to the end; returns (weight ids seen, final cursor)."""
+    seen = set()
+    while True:
+        params = {"limit": 50}
+        if cursor:
+            params["since"] = cursor
+        response = await client.get("/sync/changes", params=params, headers=farmer.headers)
+        assert response.status_code == 200, response.text
+        body = response.json()
+        seen.update(row["weight_id"] for row in body["changes"].get("weight_record", {}).get("upserts", []))
+        cursor = body["cursor"]
+        if not body["has_more"]:
+            return seen, cursor
+
+
+async def test_entry_committing_behind_a_later_seq_is_not_skipped(client, farmer, make_animal):
+    animal_id = await make_animal(farmer)
+    _, cursor = await _sync_all(client, farmer)
+
+    async with engine.connect() as first_writer, engine.connect() as second_writer:
+        # B takes its txid first, A logs the lower seq, B logs a higher one and commits
+        await second_writer.execute(BUMP_WEIGHT_VERSION, {"farmer_id": farmer.farmer_id})
+        first_id = (await first_writer.execute(INSERT_WEIGHT, {"animal_id": animal_id, "kg": 300})).scalar()
+        second_id = (await second_writer.execute(INSERT_WEIGHT, {"animal_id": animal_id, "kg": 310})).scalar()
+        await second_writer.commit()
+
+        async with engine.connect() as conn:
+            first = (await conn.execute(LATEST_ENTRY, {"row_id": first_id})).one_or_none()
+            second = (await conn.execute(LATEST_ENTRY, {"row_id": second_id})).one()
+        assert first is None  # still uncommitted
+        first_seq = (await first_writer.execute(LATEST_ENTRY, {"row_id": first_id})).one()
+        assert first_seq.seq < second.seq and second.txid < first_seq.txid
+
+        seen, cursor = await _sync_all(client, farmer, cursor)
+        assert seen == {second_id}
+
+        await first_writer.commit()
+
+    seen, cursor = await _sync_all(client, farmer, cursor)
+    assert seen == {first_id}
+    seen, _ = await _sync_all(client, farmer, cursor)
+    assert seen == set()
+
+
+async def test_entries_of_an_open_transaction_wait_for_its_commit(client, farmer, make_animal):
+    animal_id = await make_animal(farmer)
+    _, cursor = await _sync_all(client, farmer)
+
+    async with engine.connect() as writer:
+        weight_id = (await writer.execute(INSERT_WEIGHT, {"animal_id": animal_id, "kg": 280})).scalar()
+        seen, held_cursor = await _sync_all(client, farmer, cursor)
+        assert seen == set() and held_cursor == cursor
+        await writer.commit()
+
+    seen, _ = await _sync_all(client, farmer, cursor)
+    assert seen == {weight_id}
+
+
+async def test_full_sync_and_cursor_validation(client, farmer, make_animal):
+    animal_id = await make_animal(farmer)
+    response = await client.get("/sync/changes", headers=farmer.headers)
+    assert response.status_code == 200
+    animals = response.json()["changes"]["animal"]["upserts"]
+    assert [animal["animal_id"] for animal in animals] == [animal_id]
+
+    for cursor in ("not-a-cursor", "LTF8Mg"):  # garbage, "-1|2"
+        response = await client.get("/sync/changes", params={"since": cursor}, headers=farmer.headers)
+        assert response.status_code == 400